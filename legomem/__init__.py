@@ -0,0 +1,4 @@
+from dotenv import load_dotenv
+
+# The one place .env is read: every module and entry point imports the package first.
+load_dotenv()
@@ -0,0 +1,119 @@
+"""Recall@k vs latency report for the VectorStore index backends on synthetic banks."""
+import argparse
+import json
+import math
+import time
+from typing import Any
+
+import faiss
+import numpy as np
+
+from legomem.memory.embedding_cache import EmbeddingCache
+from legomem.memory.vector_store import VectorStore
+from legomem.providers import FakeProvider
+
+
+def synthetic_bank(
+    n: int, dimension: int, n_queries: int, seed: int = 0
+) -> tuple[np.ndarray, np.ndarray]:
+    """Clustered unit vectors, loosely shaped like sentence embeddings of related tasks."""
+    rng = np.random.default_rng(seed)
+    n_clusters = max(1, int(math.sqrt(n)))
+    centers = rng.standard_normal((n_clusters, dimension)).astype("float32")
+    assignments = rng.integers(0, n_clusters, n + n_queries)
+    noise = 0.5 * rng.standard_normal((n + n_queries, dimension)).astype("float32")
+    data = centers[assignments] + noise
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return np.ascontiguousarray(data[:n]), np.ascontiguousarray(data[n:])
+
+
+def backend_configs(n: int, dimension: int) -> list[dict[str, Any]]:
+    nlist = max(1, int(math.sqrt(n)))
+    pq_m = next(m for m in (16, 8, 4, 2, 1) if dimension % m == 0)
+    return [
+        {"index_type": "flat", "index_params": {}, "sweep": [{}]},
+        {
+            "index_type": "ivf_flat",
+            "index_params": {"nlist": nlist},
+            "sweep": [{"nprobe": p} for p in (1, 8, 32)],
+        },
+        {
+            "index_type": "ivf_pq",
+            "index_params": {"nlist": nlist, "pq_m": pq_m},
+            "sweep": [{"nprobe": p} for p in (1, 8, 32)],
+        },
+        {
+            "index_type": "hnsw",
+            "index_params": {"hnsw_m": 32},
+            "sweep": [{"ef_search": ef} for ef in (16, 64, 256)],
+        },
+    ]
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth, strict=True))
+    return hits / truth.size
+
+
+def run_report(
+    sizes: list[int], dimension: int = 128, n_queries: int = 200, k: int = 10
+) -> list[dict[str, Any]]:
+    rows: list[dict[str, Any]] = []
+    provider = FakeProvider()  # vectors are supplied directly, nothing is embedded
+    for n in sizes:
+        data, queries = synthetic_bank(n, dimension, n_queries)
+        _, truth = faiss.knn(queries, data, k)
+        contents = [{"id": i} for i in range(n)]
+
+        for config in backend_configs(n, dimension):
+            store = VectorStore(
+                dimension=dimension,
+                provider=provider,
+                cache=EmbeddingCache(None),
+                index_type=config["index_type"],
+                index_params=config["index_params"],
+                train_size=min(n, 39 * config["index_params"].get("nlist", 0)) or None,
+            )
+            start = time.perf_counter()
+            store.add_vectors(contents, data)
+            store.train()
+            build_s = time.perf_counter() - start
+
+            for params in config["sweep"]:
+                found = np.empty_like(truth)
+                start = time.perf_counter()
+                for i in range(n_queries):
+                    _, idx = store.search_vectors(queries[i:i + 1], k, **params)
+                    found[i] = idx[0]
+                latency_ms = (time.perf_counter() - start) / n_queries * 1000
+                row = {
+                    "n": n,
+                    "index_type": config["index_type"],
+                    **params,
+                    "build_s": round(build_s, 3),
+                    f"recall@{k}": round(recall_at_k(found, truth), 4),
+                    "latency_ms": round(latency_ms, 4),
+                }
+                rows.append(row)
+                knobs = ", ".join(f"{key}={v}" for key, v in params.items()) or "-"
+                print(
+                    f"n={n:>8} {config['index_type']:<9} {knobs:<14} "
+                    f"recall@{k}={row[f'recall@{k}']:.3f}  {latency_ms:8.3f} ms/query  "
+                    f"build {build_s:.1f}s"
+                )
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ANN backend recall/latency report")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dimension", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON output path")
+
+    args = parser.parse_args()
+    rows = run_report(args.sizes, dimension=args.dimension, n_queries=args.queries, k=args.k)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
@@ -0,0 +1,182 @@
+"""Concurrent graph runs on one event loop versus a thread pool, offline.
+
+Each task retrieves its memories and runs the LEGOMem graph against the fake
+provider's simulated latency. The async mode drives every task as a coroutine
+(`aretrieve_vanilla` / `arewrite_query` and `graph.ainvoke`) on a single loop;
+the thread mode runs the same tasks through the synchronous API on a pool of
+`--concurrency` threads. Reports tasks/s and the peak number of live threads.
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from legomem.bench.throughput import build_banks, synthetic_tasks
+from legomem.core.orchestrator import get_legomem_graph
+from legomem.memory.retrieval import MemoryRetriever
+from legomem.providers import FakeProvider, set_provider
+
+
+def _initial_state(task: dict[str, str], memories: list[dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "task_description": task["description"],
+        "memories": memories,
+        "messages": [],
+        "plan": [],
+        "current_step": 0,
+        "final_answer": None,
+    }
+
+
+def run_sync_task(
+    retriever: MemoryRetriever, task: dict[str, str], strategy: str, k: int
+) -> dict[str, Any]:
+    memories = retriever.retrieve_vanilla(task["description"], k=k)
+    if strategy == "QueryRewrite":
+        subtasks = retriever.rewrite_query(task["description"], memories)
+        hits = retriever.retrieve_dynamic_many(subtasks, k=1)
+        memories = memories + [memory for row in hits for memory, _ in row]
+    return get_legomem_graph().invoke(_initial_state(task, memories))
+
+
+async def run_async_task(
+    retriever: MemoryRetriever, task: dict[str, str], strategy: str, k: int
+) -> dict[str, Any]:
+    memories = await retriever.aretrieve_vanilla(task["description"], k=k)
+    if strategy == "QueryRewrite":
+        subtasks = await retriever.arewrite_query(task["description"], memories)
+        hits = await retriever.aretrieve_dynamic_many(subtasks, k=1)
+        memories = memories + [memory for row in hits for memory, _ in row]
+    return await get_legomem_graph().ainvoke(_initial_state(task, memories))
+
+
+class _ThreadSampler:
+    """Records the peak `threading.active_count()` while running."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self) -> "_ThreadSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _run_threads(
+    retriever: MemoryRetriever, tasks: list[dict[str, str]], strategy: str, k: int, workers: int
+) -> list[dict[str, Any]]:
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_sync_task, retriever, task, strategy, k) for task in tasks]
+        return [_outcome(future.result) for future in futures]
+
+
+async def _run_async(
+    retriever: MemoryRetriever, tasks: list[dict[str, str]], strategy: str, k: int, limit: int
+) -> list[dict[str, Any]]:
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(task: dict[str, str]) -> dict[str, Any]:
+        async with semaphore:
+            try:
+                return await run_async_task(retriever, task, strategy, k)
+            except Exception as e:
+                return {"error": str(e)}
+
+    return await asyncio.gather(*(bounded(task) for task in tasks))
+
+
+def _outcome(result: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+    try:
+        return result()
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def run_async_benchmark(
+    n_tasks: int = 2000,
+    n_memories: int = 1000,
+    dimension: int = 256,
+    concurrency: int = 500,
+    latency: float = 0.05,
+    strategy: str = "Vanilla",
+    k: int = 5,
+    modes: tuple[str, ...] = ("threads", "async")
+) -> list[dict[str, Any]]:
+    set_provider(FakeProvider(latency=latency, embedding_latency=latency / 5))
+    rows = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            task_path, subtask_path = build_banks(directory, n_memories, dimension)
+            retriever = MemoryRetriever(task_path, subtask_path)
+            tasks = synthetic_tasks(n_tasks)
+            for mode in modes:
+                with _ThreadSampler() as sampler:
+                    start = time.perf_counter()
+                    if mode == "async":
+                        results = asyncio.run(
+                            _run_async(retriever, tasks, strategy, k, concurrency)
+                        )
+                    else:
+                        results = _run_threads(retriever, tasks, strategy, k, concurrency)
+                    elapsed = time.perf_counter() - start
+                rows.append({
+                    "mode": mode,
+                    "tasks": n_tasks,
+                    "concurrency": concurrency,
+                    "seconds": elapsed,
+                    "tasks_per_sec": n_tasks / elapsed,
+                    "peak_threads": sampler.peak,
+                    "failures": sum(1 for r in results if "error" in r),
+                })
+    finally:
+        set_provider(None)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Async versus threaded graph throughput")
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--memories", type=int, default=1000)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=500,
+                        help="Tasks in flight (threads in the threaded mode)")
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Simulated seconds per chat call")
+    parser.add_argument("--strategy", type=str, default="Vanilla",
+                        choices=["Vanilla", "QueryRewrite"])
+    parser.add_argument("--modes", nargs="+", default=["threads", "async"],
+                        choices=["threads", "async"])
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON output path")
+
+    args = parser.parse_args()
+    rows = run_async_benchmark(
+        n_tasks=args.tasks,
+        n_memories=args.memories,
+        dimension=args.dimension,
+        concurrency=args.concurrency,
+        latency=args.latency,
+        strategy=args.strategy,
+        modes=tuple(args.modes),
+    )
+    for row in rows:
+        print(f"{row['mode']:<8} {row['tasks']} tasks in {row['seconds']:.1f}s "
+              f"({row['tasks_per_sec']:.1f} tasks/s, peak {row['peak_threads']} threads, "
+              f"{row['failures']} failures)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
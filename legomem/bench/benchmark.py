@@ -1,17 +1,15 @@
 import argparse
 
-from dotenv import load_dotenv
-
 from legomem.bench.datasets import OfficeBenchLoader
 from legomem.eval.evaluator import EvaluationPipeline
 
-load_dotenv()
 
 def run_benchmark(
     model: str = "gpt-4o", 
     k: int = 5, 
-    strategies: list[str] | None = None
-):
+    strategies: list[str] | None = None,
+    max_concurrency: int = 1
+) -> None:
     if strategies is None:
         strategies = ["Vanilla"]
     loader = OfficeBenchLoader()
@@ -30,7 +28,8 @@ def run_benchmark(
                 "model": model,
                 "K": k,
                 "retrieval_strategy": strategy,
-                "dataset_level": level
+                "dataset_level": level,
+                "max_concurrency": max_concurrency
             }
             success_rate = eval_pipeline.run_eval(tasks, config)
             print(f"{level} Success Rate: {success_rate * 100:.2f}%")
@@ -40,6 +39,13 @@ if __name__ == "__main__":
     parser.add_argument("--model", type=str, default="gpt-4o")
     parser.add_argument("--k", type=int, default=5)
     parser.add_argument("--strategies", nargs="+", default=["Vanilla", "Dynamic"])
+    parser.add_argument("--max-concurrency", type=int, default=1,
+                        help="Number of tasks evaluated concurrently")
     
     args = parser.parse_args()
-    run_benchmark(model=args.model, k=args.k, strategies=args.strategies)
+    run_benchmark(
+        model=args.model,
+        k=args.k,
+        strategies=args.strategies,
+        max_concurrency=args.max_concurrency
+    )
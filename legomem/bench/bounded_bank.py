@@ -0,0 +1,104 @@
+"""Recall and footprint of a capacity-bounded bank under a skewed query stream.
+
+Memories stream in while queries keep coming back to a small hot set among the
+early ones (the recurring tasks) and otherwise ask about recent arrivals. Each
+eviction policy caps the bank at `--capacity`; the unbounded bank is the
+baseline. A query hits when its target memory is still the nearest neighbour,
+and tasks succeed when the memory they retrieved is from the hot set, which is
+what the "success" policy learns from.
+"""
+import argparse
+import json
+import time
+from typing import Any
+
+import numpy as np
+
+from legomem.memory.embedding_cache import EmbeddingCache
+from legomem.memory.vector_store import VectorStore
+from legomem.providers import FakeProvider
+
+POLICIES = [None, "lru", "lfu", "success"]
+
+
+def run_policy(
+    policy: str | None,
+    data: np.ndarray,
+    capacity: int,
+    hot: np.ndarray,
+    batch: int = 100,
+    queries_per_batch: int = 50,
+    hot_share: float = 0.8,
+    seed: int = 0
+) -> dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    store = VectorStore(
+        dimension=data.shape[1],
+        provider=FakeProvider(),  # vectors are supplied directly, nothing is embedded
+        cache=EmbeddingCache(None),
+        index_type="hnsw",
+        capacity=capacity if policy else None,
+        eviction=policy or "lru",
+    )
+    hot_set = set(hot.tolist())
+    hits = queries = 0
+    max_rows = 0
+    search_seconds = 0.0
+    for start in range(0, len(data), batch):
+        end = min(start + batch, len(data))
+        store.add_vectors([{"n": i} for i in range(start, end)], data[start:end])
+        max_rows = max(max_rows, store.ntotal)
+        targets = rng.integers(max(0, end - 10 * batch), end, queries_per_batch)
+        available_hot = hot[hot < end]
+        if len(available_hot):
+            from_hot = rng.random(queries_per_batch) < hot_share
+            targets = np.where(
+                from_hot, rng.choice(available_hot, queries_per_batch), targets
+            )
+        noisy = data[targets] + rng.normal(0, 0.01, data[targets].shape).astype("float32")
+        begin = time.perf_counter()
+        results = store.search_memories(noisy, 1)
+        search_seconds += time.perf_counter() - begin
+        for target, found in zip(targets, results, strict=True):
+            queries += 1
+            if not found:
+                continue
+            memory = found[0][0]
+            hits += memory["n"] == target
+            store.record_outcome([memory["memory_id"]], memory["n"] in hot_set)
+    store.close()
+    return {
+        "policy": policy or "unbounded",
+        "hit_rate": hits / queries,
+        "hot_kept": int(np.isin(hot, store.usage.ids[store.usage.live]).sum()),
+        "live": store.size,
+        "max_rows": max_rows,
+        "search_ms": search_seconds / queries * 1000,
+        "evictions": store.evictions,
+        "compactions": store.compactions,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bounded-capacity eviction policies")
+    parser.add_argument("--n", type=int, default=20_000)
+    parser.add_argument("--capacity", type=int, default=5_000)
+    parser.add_argument("--hot", type=int, default=500, help="Recurring memories")
+    parser.add_argument("--dimension", type=int, default=64)
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON output path")
+
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    data = rng.random((args.n, args.dimension)).astype("float32")
+    hot = np.sort(rng.choice(min(args.n, 4 * args.hot), args.hot, replace=False))
+    rows = []
+    for policy in POLICIES:
+        row = run_policy(policy, data, args.capacity, hot)
+        rows.append(row)
+        print(f"{row['policy']:<10} hit rate {row['hit_rate']:.3f}  hot kept "
+              f"{row['hot_kept']}/{args.hot}  live {row['live']}  peak rows {row['max_rows']}  "
+              f"{row['search_ms']:.3f} ms/query  evicted {row['evictions']}  "
+              f"compactions {row['compactions']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
@@ -0,0 +1,116 @@
+"""Memory footprint vs recall for compact vector storage.
+
+Compares float32 storage against shortened embeddings, fp16/int8 scalar
+quantization and product quantization, each with and without full-precision
+re-ranking. Recall@k is measured on held-out queries against exact float32
+search at the full dimension.
+
+Shortened embeddings are simulated by truncating and renormalizing the synthetic
+vectors. Real text-embedding-3 vectors put most of their information in the leading
+components, so expect them to lose less recall than the synthetic numbers show.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Any
+
+import faiss
+
+from legomem.bench.ann_report import recall_at_k, synthetic_bank
+from legomem.memory.embedding_cache import EmbeddingCache
+from legomem.memory.vector_store import VectorStore
+from legomem.providers import FakeProvider, shorten_embeddings
+
+
+def storage_configs(dimension: int) -> list[dict[str, Any]]:
+    pq_m = next(m for m in (dimension // 8, 64, 32, 16, 8) if m and dimension % m == 0)
+    configs: list[dict[str, Any]] = [
+        {"name": "float32", "index_type": "flat", "dimension": dimension},
+        {"name": f"float32 d={dimension // 2}", "index_type": "flat",
+         "dimension": dimension // 2},
+        {"name": f"float32 d={dimension // 4}", "index_type": "flat",
+         "dimension": dimension // 4},
+    ]
+    for index_type, params in (
+        ("sq_fp16", {}), ("sq_int8", {}), ("pq", {"pq_m": pq_m, "pq_bits": 8})
+    ):
+        for rerank in (0, 4):
+            name = index_type + (f" +rerank x{rerank}" if rerank else "")
+            configs.append({
+                "name": name,
+                "index_type": index_type,
+                "index_params": params,
+                "dimension": dimension,
+                "rerank": rerank,
+            })
+    return configs
+
+
+def run_report(
+    n: int = 100_000, dimension: int = 768, n_queries: int = 500, k: int = 10
+) -> list[dict[str, Any]]:
+    data, queries = synthetic_bank(n, dimension, n_queries)
+    _, truth = faiss.knn(queries, data, k)
+    contents = [{"id": i} for i in range(n)]
+    rows = []
+    for config in storage_configs(dimension):
+        dim = config["dimension"]
+        bank_vectors = data if dim == dimension else shorten_embeddings(data, dim)
+        query_vectors = queries if dim == dimension else shorten_embeddings(queries, dim)
+        store = VectorStore(
+            dimension=dim,
+            provider=FakeProvider(),  # vectors are supplied directly, nothing is embedded
+            cache=EmbeddingCache(None),
+            index_type=config["index_type"],
+            index_params=config.get("index_params"),
+            rerank=config.get("rerank", 0),
+        )
+        store.add_vectors(contents, bank_vectors)
+        store.train()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bank")
+            store.save(path)
+            store.close()
+            index_bytes = os.path.getsize(f"{path}.g1.index")
+            vectors_path = f"{path}.g1.vectors.npy"
+            rerank_bytes = os.path.getsize(vectors_path) if os.path.exists(vectors_path) else 0
+            # Searched the way evaluation uses banks: index in RAM, full vectors mapped.
+            loaded = VectorStore(provider=FakeProvider(), cache=EmbeddingCache(None))
+            loaded.load(path, mmap=True)
+            start = time.perf_counter()
+            _, found = loaded.search_vectors(query_vectors, k)
+            latency_ms = (time.perf_counter() - start) / n_queries * 1000
+
+        row = {
+            "config": config["name"],
+            "n": n,
+            "index_bytes_per_vector": round(index_bytes / n, 1),
+            "rerank_bytes_per_vector": round(rerank_bytes / n, 1),
+            f"recall@{k}": round(recall_at_k(found, truth), 4),
+            "latency_ms": round(latency_ms, 4),
+        }
+        rows.append(row)
+        print(
+            f"{config['name']:<22} index {row['index_bytes_per_vector']:>8.1f} B/vec  "
+            f"rerank {row['rerank_bytes_per_vector']:>8.1f} B/vec (mmap)  "
+            f"recall@{k}={row[f'recall@{k}']:.3f}  {latency_ms:.3f} ms/query"
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact vector storage footprint vs recall")
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON output path")
+
+    args = parser.parse_args()
+    rows = run_report(n=args.n, dimension=args.dimension, n_queries=args.queries, k=args.k)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
@@ -0,0 +1,185 @@
+"""Hybrid (BM25 + dense) retrieval vs dense-only search on identifier-heavy banks.
+
+Memories mention exact identifiers ("activation code X-4711") inside a handful of
+procedural topics. Embeddings are simulated to capture the topic but not the
+identifier, which is how real sentence embeddings treat tokens like `B-99`:
+each text embeds to its topic centre plus text-specific noise. Two query sets:
+
+- exact: names one memory's identifier; recall@k of that memory.
+- paraphrase: describes a topic without identifiers; precision@k of on-topic hits.
+
+Each query's embedding call pays `--embedding-latency`, so the lexical fast path's
+savings show up in the latencies.
+"""
+import argparse
+import json
+import time
+from typing import Any
+
+import numpy as np
+
+from legomem.memory.embedding_cache import EmbeddingCache
+from legomem.memory.vector_store import VectorStore
+from legomem.providers import FakeProvider, fake_embedding
+
+TOPICS = {
+    "calendar": "Look up the calendar activation code {code} for {person}",
+    "finance": "Find the expense auditor assigned budget code {code} for {person}",
+    "security": "Locate the server room badge {code} issued to {person}",
+    "compliance": "Check the retention rule {code} for {person}'s project files",
+    "personnel": "Retrieve the internal personnel ID {code} for {person}",
+}
+PARAPHRASES = {
+    "calendar": "how do I activate someone's calendar protocol",
+    "finance": "who audits the travel budget expenses",
+    "security": "emergency access to the server room",
+    "compliance": "how long must project documentation be retained",
+    "personnel": "find an employee's staff identifier",
+}
+TOPIC_KEYWORDS = {
+    "calendar": {"calendar"},
+    "finance": {"expense", "expenses", "budget"},
+    "security": {"server", "badge"},
+    "compliance": {"retention", "retained"},
+    "personnel": {"personnel", "employee's", "staff"},
+}
+PEOPLE = ["Bob", "Alice", "Sarah Jenkins", "Mike Miller", "Priya", "Chen"]
+
+
+class TopicProvider(FakeProvider):
+    """Fake embeddings that encode a text's topic but none of its identifiers."""
+
+    def __init__(self, dimension: int, embedding_latency: float, seed: int = 0):
+        super().__init__(embedding_latency=embedding_latency)
+        rng = np.random.default_rng(seed)
+        self.centers = {
+            topic: rng.standard_normal(dimension).astype("float32") for topic in TOPICS
+        }
+        self.calls = 0
+
+    def topic_of(self, text: str) -> str | None:
+        words = set(text.lower().split())
+        for topic, keywords in TOPIC_KEYWORDS.items():
+            if words & keywords:
+                return topic
+        return None
+
+    def embed(self, texts: list[str], model: str, dimension: int) -> np.ndarray:
+        self.calls += 1
+        if self.embedding_latency:
+            time.sleep(self.embedding_latency)
+        vectors = []
+        for text in texts:
+            topic = self.topic_of(text)
+            center = self.centers[topic] if topic else np.zeros(dimension, dtype="float32")
+            vector = center / np.sqrt(dimension) + 0.6 * fake_embedding(text, dimension)
+            vectors.append(vector / np.linalg.norm(vector))
+        return np.stack(vectors).astype("float32")
+
+
+def synthetic_identifier_bank(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    topics = list(TOPICS)
+    memories = []
+    for i in range(n):
+        topic = topics[i % len(topics)]
+        code = f"{topic[0].upper()}-{1000 + i}"
+        person = PEOPLE[rng.integers(len(PEOPLE))]
+        memories.append({
+            "topic": topic,
+            "code": code,
+            "task_description": TOPICS[topic].format(code=code, person=person),
+        })
+    return memories
+
+
+def run_report(
+    n: int = 20_000,
+    dimension: int = 256,
+    n_queries: int = 200,
+    k: int = 5,
+    embedding_latency: float = 0.02
+) -> list[dict[str, Any]]:
+    memories = synthetic_identifier_bank(n)
+    provider = TopicProvider(dimension, embedding_latency=0.0)
+    store = VectorStore(
+        dimension=dimension,
+        provider=provider,
+        cache=EmbeddingCache(None),
+        lexical_key="task_description",
+    )
+    store.add_memories(memories, [m["task_description"] for m in memories], show_progress=False)
+    provider.embedding_latency = embedding_latency
+
+    rng = np.random.default_rng(1)
+    targets = rng.choice(n, n_queries, replace=False)
+    exact: list[tuple[str, Any]] = [
+        (f"What is the procedure for {memories[t]['code']}?", int(t)) for t in targets
+    ]
+    topics = list(PARAPHRASES)
+    paraphrase: list[tuple[str, Any]] = [
+        (PARAPHRASES[topics[i % len(topics)]], topics[i % len(topics)])
+        for i in range(n_queries)
+    ]
+
+    modes: dict[str, dict[str, Any]] = {
+        "dense": {"hybrid": False},
+        "hybrid (fused)": {"hybrid": True, "lexical_margin": None},
+        "hybrid + fast path": {"hybrid": True},
+    }
+    rows = []
+    for name, kwargs in modes.items():
+        for query_set, queries in (("exact", exact), ("paraphrase", paraphrase)):
+            # Fresh cache per run; repeated paraphrases are then served from it, as in use.
+            store.cache = EmbeddingCache(None)
+            provider.calls = 0
+            hits = 0.0
+            latencies = []
+            for query, target in queries:
+                start = time.perf_counter()
+                results = store.search(query, k=k, **kwargs)
+                latencies.append(time.perf_counter() - start)
+                if query_set == "exact":
+                    hits += any(m["code"] == memories[target]["code"] for m in results)
+                else:
+                    hits += sum(m["topic"] == target for m in results) / k
+            latencies_ms = np.array(latencies) * 1000
+            row = {
+                "mode": name,
+                "queries": query_set,
+                "metric": f"recall@{k}" if query_set == "exact" else f"precision@{k}",
+                "score": round(hits / len(queries), 4),
+                "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+                "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+                "embedding_calls": provider.calls,
+            }
+            rows.append(row)
+            print(
+                f"{name:<19} {query_set:<10} {row['metric']}={row['score']:.3f}  "
+                f"p50 {row['p50_ms']:.2f}ms  p99 {row['p99_ms']:.2f}ms  "
+                f"embedding calls {row['embedding_calls']}/{len(queries)}"
+            )
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hybrid vs dense-only retrieval report")
+    parser.add_argument("--n", type=int, default=20_000)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--embedding-latency", type=float, default=0.02,
+                        help="Simulated seconds per embedding request")
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON output path")
+
+    args = parser.parse_args()
+    rows = run_report(
+        n=args.n,
+        dimension=args.dimension,
+        n_queries=args.queries,
+        k=args.k,
+        embedding_latency=args.embedding_latency,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
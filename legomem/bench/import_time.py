@@ -0,0 +1,75 @@
+"""Cold import time of the package's entry points.
+
+Each module is imported in a fresh interpreter (best of `--repeats`), which is
+what a worker start or a studio reload pays. Also lists which heavy
+dependencies the import dragged in, since those should load on first use only.
+Pass `--budget` to exit non-zero when any module is slower, e.g. in CI.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any
+
+ENTRY_POINTS = [
+    "legomem",
+    "legomem.providers",
+    "legomem.memory.vector_store",
+    "legomem.memory.bank_server",
+    "legomem.memory.batch_curation",
+    "legomem.core.orchestrator",
+    "legomem.studio.studio",
+    "legomem.eval.evaluator",
+]
+HEAVY_MODULES = ["faiss", "openai", "langchain_openai", "wandb", "tiktoken", "langgraph"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, repeats: int = 3) -> dict[str, Any]:
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True,
+            text=True,
+            cwd=root,
+            check=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "module": module,
+        "seconds": min(run["seconds"] for run in runs),
+        "heavy_loaded": runs[0]["loaded"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold import time of entry points")
+    parser.add_argument("--modules", nargs="+", default=ENTRY_POINTS)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Fail if any module takes longer than this many seconds")
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON output path")
+
+    args = parser.parse_args()
+    rows = []
+    for module in args.modules:
+        row = measure_import(module, repeats=args.repeats)
+        rows.append(row)
+        print(f"{module:<32} {row['seconds'] * 1000:>8.0f}ms  "
+              f"loads: {', '.join(row['heavy_loaded']) or '-'}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+    slow = [row["module"] for row in rows if args.budget and row["seconds"] > args.budget]
+    if slow:
+        sys.exit(f"Over the {args.budget}s import budget: {', '.join(slow)}")
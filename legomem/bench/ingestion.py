@@ -0,0 +1,130 @@
+"""Ingestion throughput benchmark for VectorStore against a local fake embedding server."""
+import argparse
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from openai import OpenAI
+
+from legomem.memory.embedding_cache import EmbeddingCache
+from legomem.memory.vector_store import VectorStore
+from legomem.providers import OpenAIProvider, fake_embedding
+
+
+class FakeEmbeddingServer:
+    """Minimal OpenAI-compatible `/v1/embeddings` endpoint served from a local thread."""
+
+    def __init__(self, dimension: int = 3072, latency: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+        self.requests = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.socket.getsockname()[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length))
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                texts = body["input"]
+                if isinstance(texts, str):
+                    texts = [texts]
+                dimension = body.get("dimensions") or server.dimension
+                data: list[dict[str, Any]] = []
+                for i, text in enumerate(texts):
+                    vector = fake_embedding(text, dimension)
+                    if body.get("encoding_format") == "base64":
+                        embedding: Any = base64.b64encode(vector.tobytes()).decode()
+                    else:
+                        embedding = vector.tolist()
+                    data.append({"object": "embedding", "index": i, "embedding": embedding})
+                payload = json.dumps({
+                    "object": "list",
+                    "data": data,
+                    "model": body.get("model"),
+                    "usage": {"prompt_tokens": 0, "total_tokens": 0}
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "FakeEmbeddingServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def run_ingestion_benchmark(
+    n: int = 2000,
+    dimension: int = 3072,
+    batch_size: int = 256,
+    latency: float = 0.005
+) -> dict[str, float]:
+    contents = [{"task_description": f"Synthetic task #{i}"} for i in range(n)]
+    texts = [c["task_description"] for c in contents]
+    results: dict[str, float] = {}
+
+    with FakeEmbeddingServer(dimension=dimension, latency=latency) as server:
+        provider = OpenAIProvider(OpenAI(api_key="fake", base_url=server.base_url))
+
+        # A fresh in-memory cache per run so both paths really hit the server.
+        store = VectorStore(dimension=dimension, provider=provider, cache=EmbeddingCache(None))
+        start = time.perf_counter()
+        for content, text in zip(contents, texts, strict=True):
+            store.add_memory(content, text)
+        elapsed = time.perf_counter() - start
+        results["add_memory_per_sec"] = n / elapsed
+        results["add_memory_requests"] = server.requests
+
+        server.requests = 0
+        store = VectorStore(dimension=dimension, provider=provider, cache=EmbeddingCache(None))
+        start = time.perf_counter()
+        store.add_memories(contents, texts, batch_size=batch_size, show_progress=False)
+        elapsed = time.perf_counter() - start
+        results["add_memories_per_sec"] = n / elapsed
+        results["add_memories_requests"] = server.requests
+
+    results["speedup"] = results["add_memories_per_sec"] / results["add_memory_per_sec"]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark VectorStore ingestion throughput")
+    parser.add_argument("--n", type=int, default=2000)
+    parser.add_argument("--dimension", type=int, default=3072)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.005,
+                        help="Simulated per-request server latency in seconds")
+
+    args = parser.parse_args()
+    results = run_ingestion_benchmark(
+        n=args.n, dimension=args.dimension, batch_size=args.batch_size, latency=args.latency
+    )
+    print(f"add_memory:   {results['add_memory_per_sec']:>10.1f} memories/s "
+          f"({int(results['add_memory_requests'])} requests)")
+    print(f"add_memories: {results['add_memories_per_sec']:>10.1f} memories/s "
+          f"({int(results['add_memories_requests'])} requests)")
+    print(f"Speedup: {results['speedup']:.1f}x")
@@ -0,0 +1,65 @@
+"""Latency of role-partitioned subtask search versus scanning the whole bank."""
+import argparse
+import time
+
+import numpy as np
+
+from legomem.bench.ann_report import synthetic_bank
+from legomem.memory.embedding_cache import EmbeddingCache
+from legomem.memory.vector_store import VectorStore
+from legomem.providers import FakeProvider
+
+
+def run_partition_benchmark(
+    n: int = 200_000, n_roles: int = 100, dimension: int = 256, n_queries: int = 200, k: int = 3
+) -> dict[str, float]:
+    data, queries = synthetic_bank(n, dimension, n_queries)
+    rng = np.random.default_rng(1)
+    roles = [f"agent_{r}" for r in rng.integers(0, n_roles, n)]
+    contents = [{"agent": role, "description": f"subtask {i}"} for i, role in enumerate(roles)]
+
+    store = VectorStore(
+        dimension=dimension,
+        provider=FakeProvider(),  # vectors are supplied directly, nothing is embedded
+        cache=EmbeddingCache(None),
+        partition_key="agent",
+    )
+    store.add_vectors(contents, data)
+    query_roles = [f"agent_{r}" for r in rng.integers(0, n_roles, n_queries)]
+
+    start = time.perf_counter()
+    for i in range(n_queries):
+        store.search_vectors(queries[i:i + 1], k)
+    full_ms = (time.perf_counter() - start) / n_queries * 1000
+
+    start = time.perf_counter()
+    for i, role in enumerate(query_roles):
+        store.search_vectors(queries[i:i + 1], k, partition=role)
+    partition_ms = (time.perf_counter() - start) / n_queries * 1000
+
+    return {
+        "n": n,
+        "roles": n_roles,
+        "mean_partition_size": n / n_roles,
+        "full_scan_ms": full_ms,
+        "partition_ms": partition_ms,
+        "speedup": full_ms / partition_ms,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark role-partitioned retrieval")
+    parser.add_argument("--n", type=int, default=200_000)
+    parser.add_argument("--roles", type=int, default=100)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+
+    args = parser.parse_args()
+    results = run_partition_benchmark(
+        n=args.n, n_roles=args.roles, dimension=args.dimension, n_queries=args.queries
+    )
+    print(f"Bank: {results['n']} subtasks across {results['roles']} roles "
+          f"(~{results['mean_partition_size']:.0f} per role)")
+    print(f"Whole-bank search:  {results['full_scan_ms']:.3f} ms/query")
+    print(f"Partition search:   {results['partition_ms']:.3f} ms/query")
+    print(f"Speedup: {results['speedup']:.1f}x")
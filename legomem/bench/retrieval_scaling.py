@@ -0,0 +1,219 @@
+"""Retrieval scaling suite for the memory banks.
+
+For each bank size and VectorStore configuration this measures ingestion rate,
+single-query `search` p50/p99 latency, `search_many` throughput, resident memory,
+on-disk size and load time, using the offline fake provider. Results are written
+as JSON (tagged with the git commit) so runs can be compared across commits:
+
+    python -m legomem.bench.retrieval_scaling --output before.json
+    python -m legomem.bench.retrieval_scaling --output after.json --compare before.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import Any
+
+import numpy as np
+
+from legomem.memory.embedding_cache import EmbeddingCache
+from legomem.memory.vector_store import VectorStore
+from legomem.providers import FakeProvider
+
+VERBS = ["Schedule", "Audit", "Archive", "Email", "Summarize", "Approve", "Retrieve", "Update"]
+OBJECTS = ["meeting", "expense report", "policy", "calendar entry", "ticket", "contract"]
+PEOPLE = ["Bob", "Alice", "Sarah Jenkins", "Mike Miller", "the finance team"]
+
+CONFIGS: dict[str, dict[str, Any]] = {
+    "flat": {"index_type": "flat"},
+    "ivf_flat": {"index_type": "ivf_flat"},
+    "ivf_pq": {"index_type": "ivf_pq"},
+    "hnsw": {"index_type": "hnsw"},
+}
+
+
+def synthetic_memories(n: int, seed: int = 0) -> tuple[list[dict[str, Any]], list[str]]:
+    rng = np.random.default_rng(seed)
+    contents, texts = [], []
+    for i in range(n):
+        verb, obj, person = (
+            VERBS[rng.integers(len(VERBS))],
+            OBJECTS[rng.integers(len(OBJECTS))],
+            PEOPLE[rng.integers(len(PEOPLE))],
+        )
+        text = f"{verb} the {obj} #{i} for {person}"
+        contents.append({
+            "task_description": text,
+            "high_level_plan": f"1. Locate {obj} #{i}. 2. {verb} it. 3. Notify {person}.",
+        })
+        texts.append(text)
+    return contents, texts
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux), falling back to the peak where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def disk_bytes(directory: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+    )
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def index_params_for(config: dict[str, Any], n: int, dimension: int) -> dict[str, Any]:
+    nlist = max(1, int(np.sqrt(n)))
+    if config["index_type"] == "ivf_flat":
+        return {"nlist": nlist}
+    if config["index_type"] == "ivf_pq":
+        return {"nlist": nlist, "pq_m": next(m for m in (32, 16, 8, 4) if dimension % m == 0)}
+    return {}
+
+
+def measure(
+    name: str,
+    config: dict[str, Any],
+    n: int,
+    dimension: int,
+    n_queries: int,
+    batch_size: int,
+    k: int
+) -> dict[str, Any]:
+    provider = FakeProvider()
+    contents, texts = synthetic_memories(n)
+    queries = [f"{t} (follow-up)" for t in synthetic_memories(n_queries, seed=1)[1]]
+    index_params = index_params_for(config, n, dimension)
+
+    gc.collect()
+    rss_before = rss_bytes()
+    store = VectorStore(
+        dimension=dimension,
+        provider=provider,
+        cache=EmbeddingCache(None),
+        index_type=config["index_type"],
+        index_params=index_params,
+        train_size=min(n, 39 * index_params["nlist"]) if "nlist" in index_params else None,
+    )
+    start = time.perf_counter()
+    store.add_memories(contents, texts, batch_size=1024, show_progress=False)
+    store.train()
+    ingest_s = time.perf_counter() - start
+    rss_after = rss_bytes()
+
+    # Embed queries up front so search timings measure retrieval, not the fake embedder.
+    store.cache = EmbeddingCache(None, max_memory_entries=n_queries)
+    store._get_embeddings(queries)
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        store.search(query, k=k)
+        latencies.append(time.perf_counter() - start)
+    latencies_ms = np.array(latencies) * 1000
+
+    start = time.perf_counter()
+    for i in range(0, n_queries, batch_size):
+        store.search_many(queries[i:i + batch_size], k=k)
+    batch_qps = n_queries / (time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bank")
+        store.save(path)
+        store.close()
+        size = disk_bytes(directory)
+        load_times = {}
+        for mode, mmap in (("load_s", False), ("mmap_load_s", True)):
+            loaded = VectorStore(provider=provider, cache=EmbeddingCache(None))
+            start = time.perf_counter()
+            loaded.load(path, mmap=mmap)
+            load_times[mode] = time.perf_counter() - start
+            loaded.close()
+
+    return {
+        "config": name,
+        "n": n,
+        "dimension": dimension,
+        "ingest_per_sec": n / ingest_s,
+        "search_p50_ms": float(np.percentile(latencies_ms, 50)),
+        "search_p99_ms": float(np.percentile(latencies_ms, 99)),
+        "batch_search_qps": batch_qps,
+        "rss_delta_mb": (rss_after - rss_before) / 2**20,
+        "disk_mb": size / 2**20,
+        **load_times,
+    }
+
+
+def compare(rows: list[dict[str, Any]], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = {(r["config"], r["n"]): r for r in json.load(f)["results"]}
+    print(f"\nChange vs {baseline_path}:")
+    for row in rows:
+        base = baseline.get((row["config"], row["n"]))
+        if not base:
+            continue
+        deltas = []
+        for metric in ("ingest_per_sec", "search_p50_ms", "search_p99_ms", "batch_search_qps",
+                       "rss_delta_mb", "disk_mb", "load_s", "mmap_load_s"):
+            if base.get(metric):
+                change = (row[metric] - base[metric]) / base[metric] * 100
+                deltas.append(f"{metric} {change:+.1f}%")
+        print(f"  {row['config']:<9} n={row['n']:<8} " + ", ".join(deltas))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory bank retrieval scaling suite")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS), choices=list(CONFIGS))
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--output", type=str, default="retrieval_scaling.json")
+    parser.add_argument("--compare", type=str, default=None,
+                        help="Earlier results file to report changes against")
+
+    args = parser.parse_args()
+    rows = []
+    for n in args.sizes:
+        for name in args.configs:
+            row = measure(
+                name, CONFIGS[name], n, args.dimension, args.queries, args.batch_size, args.k
+            )
+            rows.append(row)
+            print(
+                f"{name:<9} n={n:<8} ingest {row['ingest_per_sec']:>9.0f}/s  "
+                f"p50 {row['search_p50_ms']:.3f}ms  p99 {row['search_p99_ms']:.3f}ms  "
+                f"batch {row['batch_search_qps']:>8.0f} q/s  rss +{row['rss_delta_mb']:.0f}MB  "
+                f"disk {row['disk_mb']:.0f}MB  load {row['load_s']:.2f}s "
+                f"(mmap {row['mmap_load_s']:.2f}s)"
+            )
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "commit": git_commit(),
+            "timestamp": time.time(),
+            "platform": platform.platform(),
+            "params": vars(args),
+            "results": rows,
+        }, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(rows, args.compare)
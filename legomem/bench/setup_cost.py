@@ -0,0 +1,42 @@
+"""Per-task setup cost: building clients and compiling the graph vs reusing pooled ones."""
+import argparse
+import os
+import time
+
+from legomem.clients import clear_client_cache
+from legomem.core.orchestrator import clear_graph_cache, get_legomem_graph
+from legomem.providers import get_provider
+
+
+def per_task_setup(model: str, worker_model: str | None) -> None:
+    """Everything EvaluationPipeline needs before its first LLM call for a task."""
+    get_legomem_graph(model, worker_model)
+    get_provider().chat_model(model)  # judge
+
+
+def measure(n: int, model: str, worker_model: str | None, pooled: bool) -> float:
+    """Mean setup time per task in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(n):
+        if not pooled:
+            # Reproduce constructing every client and graph from scratch per task.
+            clear_client_cache()
+            clear_graph_cache()
+        per_task_setup(model, worker_model)
+    return (time.perf_counter() - start) / n * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure per-task setup overhead")
+    parser.add_argument("--n", type=int, default=50)
+    parser.add_argument("--model", type=str, default="gpt-4o")
+    parser.add_argument("--worker-model", type=str, default="gpt-4o-mini")
+
+    args = parser.parse_args()
+    # Nothing is sent over the network; the clients only need a key to be constructed.
+    os.environ.setdefault("OPENAI_API_KEY", "unused")
+    fresh_ms = measure(args.n, args.model, args.worker_model, pooled=False)
+    pooled_ms = measure(args.n, args.model, args.worker_model, pooled=True)
+    print(f"Fresh clients + graph per task: {fresh_ms:8.3f} ms")
+    print(f"Pooled clients + cached graph:  {pooled_ms:8.3f} ms")
+    print(f"Speedup: {fresh_ms / pooled_ms:.0f}x")
@@ -0,0 +1,138 @@
+"""Search throughput of a bank split across 1..N local `BankServer` processes.
+
+The total bank size stays fixed while shards are added, so each shard scans a
+smaller slice in parallel with the others. Queries are pre-embedded; the numbers
+cover the HTTP scatter, shard search and client-side merge.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+
+from legomem.bench.ann_report import synthetic_bank
+from legomem.memory.embedding_cache import EmbeddingCache
+from legomem.memory.sharded_store import ShardedVectorStore
+from legomem.providers import FakeProvider
+
+
+def start_shards(
+    directory: str, n_shards: int, dimension: int
+) -> tuple[list[subprocess.Popen[str]], list[str]]:
+    threads = max(1, (os.cpu_count() or 1) // n_shards)
+    env = {**os.environ, "LEGOMEM_EMBEDDING_CACHE": "off", "OMP_NUM_THREADS": str(threads)}
+    processes, urls = [], []
+    for i in range(n_shards):
+        process = subprocess.Popen(
+            [
+                sys.executable, "-m", "legomem.memory.bank_server",
+                "--bank", f"task={os.path.join(directory, f'task_{i}')}",
+                "--port", "0",
+                "--dimension", str(dimension),
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+            env=env,
+        )
+        processes.append(process)
+    for process in processes:
+        assert process.stdout is not None
+        # The server announces its URL once its banks are loaded.
+        urls.append(process.stdout.readline().strip().rsplit(" ", 1)[-1])
+    return processes, urls
+
+
+def measure(
+    store: ShardedVectorStore,
+    queries: np.ndarray,
+    k: int,
+    batch_size: int,
+    concurrency: int
+) -> dict[str, float]:
+    batches = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+
+    def timed(batch: np.ndarray) -> float:
+        start = time.perf_counter()
+        store.search_with_distances(batch, k)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(timed, batches))) * 1000
+    elapsed = time.perf_counter() - start
+    return {
+        "qps": len(queries) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def run_shard_benchmark(
+    shard_counts: list[int],
+    n: int = 200_000,
+    dimension: int = 256,
+    n_queries: int = 2000,
+    k: int = 5,
+    batch_size: int = 1,
+    concurrency: int = 16
+) -> list[dict[str, Any]]:
+    data, queries = synthetic_bank(n, dimension, n_queries)
+    contents = [{"id": i} for i in range(n)]
+    rows = []
+    for n_shards in shard_counts:
+        with tempfile.TemporaryDirectory() as directory:
+            processes, urls = start_shards(directory, n_shards, dimension)
+            store = ShardedVectorStore(
+                urls, "task", dimension=dimension,
+                provider=FakeProvider(), cache=EmbeddingCache(None)
+            )
+            try:
+                for start in range(0, n, 10_000):
+                    store.add_vectors(contents[start:start + 10_000], data[start:start + 10_000])
+                measure(store, queries[:100], k, batch_size, concurrency)  # warm-up
+                row = {
+                    "shards": n_shards,
+                    "n": store.ntotal,
+                    **measure(store, queries, k, batch_size, concurrency),
+                }
+            finally:
+                store.close()
+                for process in processes:
+                    process.terminate()
+                    process.wait()
+        rows.append(row)
+        print(f"{n_shards:>2} shards  {row['qps']:>8.0f} queries/s  "
+              f"p50 {row['p50_ms']:.2f}ms  p99 {row['p99_ms']:.2f}ms")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded bank search throughput")
+    parser.add_argument("--shards", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--n", type=int, default=200_000)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=1, help="Queries per request")
+    parser.add_argument("--concurrency", type=int, default=16, help="Client threads")
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON output path")
+
+    args = parser.parse_args()
+    rows = run_shard_benchmark(
+        args.shards,
+        n=args.n,
+        dimension=args.dimension,
+        n_queries=args.queries,
+        k=args.k,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
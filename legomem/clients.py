@@ -0,0 +1,107 @@
+"""Process-wide pool of API clients.
+
+Every component asks this module for its OpenAI / chat-model clients instead of
+constructing its own, so HTTP connections are kept alive and reused across tasks.
+The SDKs are imported when the first client is built, not when the package is.
+"""
+import os
+from functools import cache
+from typing import TYPE_CHECKING
+
+from .monitoring.tracing import arecord_request, record_request
+
+if TYPE_CHECKING:
+    import httpx
+    from langchain_openai import ChatOpenAI
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+POOL_LIMITS = {"max_connections": 100, "max_keepalive_connections": 20}
+
+
+@cache
+def get_http_client() -> "DefaultHttpxClient":
+    """One keep-alive connection pool shared by all synchronous model clients.
+
+    Built from the SDK's own client class, which wraps whichever httpx the
+    installed `openai` is built on.
+    """
+    import openai
+
+    return openai.DefaultHttpxClient(
+        limits=type(openai.DEFAULT_CONNECTION_LIMITS)(**POOL_LIMITS),
+        timeout=openai.Timeout(600.0, connect=5.0),
+        # Lets traced API calls count their retried requests.
+        event_hooks={"request": [record_request]},
+    )
+
+
+@cache
+def get_async_http_client() -> "DefaultAsyncHttpxClient":
+    """The connection pool shared by all async model clients.
+
+    Its connections belong to the event loop that opened them, so drive every
+    async call in a process from one loop (or `clear_client_cache` between loops).
+    """
+    import openai
+
+    return openai.DefaultAsyncHttpxClient(
+        limits=type(openai.DEFAULT_CONNECTION_LIMITS)(**POOL_LIMITS),
+        timeout=openai.Timeout(600.0, connect=5.0),
+        event_hooks={"request": [arecord_request]},
+    )
+
+
+@cache
+def get_bank_http_client() -> "httpx.Client":
+    """Keep-alive pool for requests to bank servers, which need no SDK."""
+    import httpx
+
+    return httpx.Client(
+        limits=httpx.Limits(**POOL_LIMITS),
+        timeout=httpx.Timeout(600.0, connect=5.0),
+        event_hooks={"request": [record_request]},
+    )
+
+
+@cache
+def get_openai_client(base_url: str | None = None) -> "OpenAI":
+    from openai import OpenAI
+
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        base_url=base_url,
+        http_client=get_http_client(),
+    )
+
+
+@cache
+def get_async_openai_client(base_url: str | None = None) -> "AsyncOpenAI":
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        base_url=base_url,
+        http_client=get_async_http_client(),
+    )
+
+
+@cache
+def get_chat_model(model: str, temperature: float = 0) -> "ChatOpenAI":
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+    )
+
+
+def clear_client_cache() -> None:
+    """Drops every pooled client; the next request builds fresh ones."""
+    get_chat_model.cache_clear()
+    get_openai_client.cache_clear()
+    get_async_openai_client.cache_clear()
+    get_http_client.cache_clear()
+    get_async_http_client.cache_clear()
+    get_bank_http_client.cache_clear()
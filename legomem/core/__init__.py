@@ -1,4 +1,12 @@
 from .agents import AgentFactory, TaskAgent
-from .orchestrator import Orchestrator, create_legomem_graph
+from .orchestrator import Orchestrator, create_legomem_graph, get_legomem_graph
+from .plan_cache import PlanCache
 
-__all__ = ["AgentFactory", "Orchestrator", "TaskAgent", "create_legomem_graph"]
+__all__ = [
+    "AgentFactory",
+    "Orchestrator",
+    "PlanCache",
+    "TaskAgent",
+    "create_legomem_graph",
+    "get_legomem_graph",
+]
@@ -1,15 +1,15 @@
 from typing import Any
 
-from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
 
-load_dotenv()
+from ..llm_cache import cached_invoke
+from ..providers import get_provider
+
 
 class TaskAgent:
     def __init__(self, name: str, model: str = "gpt-4o"):
         self.name = name
-        self.llm = ChatOpenAI(model=model, temperature=0)
+        self.llm = get_provider().chat_model(model)
 
     def execute(self, subtask: str, memories: list[dict[str, Any]]) -> dict[str, Any]:
         prompt = f"""You are a specialized agent: {self.name}.
@@ -18,10 +18,10 @@ class TaskAgent:
         
         Execute the subtask and return a summary of your actions and observations.
         """
-        response = self.llm.invoke([HumanMessage(content=prompt)])
+        response = cached_invoke(self.llm, [HumanMessage(content=prompt)])
         return {
             "agent": self.name,
-            "observations": response.content,
+            "observations": response,
             "status": "success"
         }
 
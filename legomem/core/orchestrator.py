@@ -1,32 +1,139 @@
-from typing import Annotated, Any, TypedDict
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from functools import cached_property
+from typing import TYPE_CHECKING, Annotated, Any, TypedDict
 
-from dotenv import load_dotenv
+from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import BaseMessage, HumanMessage
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import END, StateGraph
+from langgraph.graph.state import CompiledStateGraph
+from langgraph.types import Send
 
-load_dotenv()
+from ..llm_cache import acached_invoke, cached_invoke
+from ..memory.context_packer import pack_memories
+from ..monitoring.tracing import traced
+from ..providers import Provider, get_provider
+from .replay import SubtaskReplayer
+
+if TYPE_CHECKING:
+    from ..memory.retrieval import MemoryRetriever
+
+# Planner steps may end with "[after: 1, 3]" (or "[after: none]") to declare which
+# earlier steps they need; unannotated steps wait for the step before them.
+DEPENDENCY_PATTERN = re.compile(r"\[\s*after\s*:\s*([^\]]*)\]\s*$", re.IGNORECASE)
+
+# Token budget for the memories in a planner prompt; None includes every memory.
+DEFAULT_CONTEXT_BUDGET = 2000
+
+# Compiled graphs cached by `get_legomem_graph`; the least recently used is evicted first.
+GRAPH_CACHE_SIZE = 8
+
+Graph = CompiledStateGraph[Any, Any, Any, Any]
 
 class AgentState(TypedDict):
     task_description: str
     plan: list[str]
+    dependencies: list[list[int]]
     current_step: int
+    step_outcomes: Annotated[dict[int, str], lambda x, y: {**x, **y}]
+    reported_steps: list[int]
     messages: Annotated[list[BaseMessage], lambda x, y: x + y]
     memories: list[dict[str, Any]]
     final_answer: str | None
+    plan_seconds: float
+    replayed_steps: Annotated[list[int], lambda x, y: x + y]
+
+class StepInput(TypedDict):
+    """What a single delegator branch receives when the graph fans out."""
+    task_description: str
+    plan: list[str]
+    dependencies: list[list[int]]
+    step_outcomes: dict[int, str]
+    step: int
+
+def parse_plan_step(line: str, position: int) -> tuple[str, list[int]]:
+    """Splits a numbered plan line into its text and the 0-based steps it depends on."""
+    text = re.sub(r"^\d+[.)]\s*", "", line.strip())
+    match = DEPENDENCY_PATTERN.search(text)
+    if not match:
+        return text, [position - 1] if position > 0 else []
+    text = text[:match.start()].rstrip()
+    # Only earlier steps count, which also rules out cycles.
+    deps = sorted({
+        int(n) - 1 for n in re.findall(r"\d+", match.group(1)) if 0 < int(n) <= position
+    })
+    return text, deps
 
 class Orchestrator:
-    def __init__(self, model: str = "gpt-4o", worker_model: str = None):
-        self.llm = ChatOpenAI(model=model, temperature=0)
-        self.worker_llm = ChatOpenAI(model=worker_model or model, temperature=0)
+    def __init__(
+        self,
+        model: str = "gpt-4o",
+        worker_model: str | None = None,
+        provider: Provider | None = None,
+        context_budget: int | None = DEFAULT_CONTEXT_BUDGET,
+        replayer: SubtaskReplayer | None = None,
+        retriever: "MemoryRetriever | None" = None,
+        retrieval_k: int = 5
+    ):
+        self.provider = provider or get_provider()
+        self.model = model
+        self.worker_model = worker_model or model
+        self.context_budget = context_budget
+        self.replayer = replayer
+        # Fetches memories for runs that start from a bare task description (Studio).
+        self.retriever = retriever
+        self.retrieval_k = retrieval_k
+
+    # Built on first use, so constructing a graph never touches the model SDKs.
+    @cached_property
+    def llm(self) -> BaseChatModel:
+        return self.provider.chat_model(self.model)
+
+    @cached_property
+    def worker_llm(self) -> BaseChatModel:
+        return self.provider.chat_model(self.worker_model)
 
     def plan(self, state: AgentState) -> dict[str, Any]:
         """Generate or refine a high-level plan based on memories."""
-        memory_list = state.get("memories", [])
+        if state.get("plan"):
+            return {}
+        memories = state.get("memories") or []
+        retrieved = {}
+        if not memories and self.retriever is not None:
+            memories = self.retriever.retrieve_vanilla(
+                state["task_description"], k=self.retrieval_k
+            )
+            retrieved = {"memories": memories}
+        start = time.perf_counter()
+        prompt = self._plan_prompt(state, memories)
+        response = cached_invoke(self.llm, [prompt], self.provider)
+        return self._parsed_plan(response, start, retrieved)
+
+    async def aplan(self, state: AgentState) -> dict[str, Any]:
+        if state.get("plan"):
+            return {}
+        memories = state.get("memories") or []
+        retrieved = {}
+        if not memories and self.retriever is not None:
+            memories = await self.retriever.aretrieve_vanilla(
+                state["task_description"], k=self.retrieval_k
+            )
+            retrieved = {"memories": memories}
+        start = time.perf_counter()
+        prompt = self._plan_prompt(state, memories)
+        response = await acached_invoke(self.llm, [prompt], self.provider)
+        return self._parsed_plan(response, start, retrieved)
+
+    def _plan_prompt(self, state: AgentState, memories: list[dict[str, Any]]) -> HumanMessage:
+        packed = pack_memories(memories, self.context_budget)
         memory_context = ""
-        for i, m in enumerate(memory_list):
-            m_text = f"Memory {i+1}:\nTask: {m.get('task_description')}\nPlan: {m.get('high_level_plan')}"
-            memory_context += m_text + "\n\n"
+        for i, m_text in enumerate(packed):
+            memory_context += f"Memory {i+1}:\n{m_text}\n\n"
             
         prompt = (
             "You are an orchestrator agent. "
@@ -37,55 +144,215 @@ class Orchestrator:
             "Based on the referencing memories, generate a high-level plan. "
             "CRITICAL: You MUST COPY specific values (names, IDs, codes, years) from the memories into your plan steps. "
             "Do not be generic. usage: 'Verify ID B-99' instead of 'Verify ID'. "
-            "Respond only with a numbered list of subtasks."
+            "Respond only with a numbered list of subtasks. End each subtask with "
+            "[after: N, M] naming the earlier steps whose results it needs, or "
+            "[after: none] if it can start immediately."
         )
-        
-        if not state.get("plan"):
-             response = self.llm.invoke([HumanMessage(content=prompt)])
-             plan = [
-                 s.strip() for s in response.content.split("\n") 
-                 if s.strip() and s[0].isdigit()
-             ]
-             return {"plan": plan, "current_step": 0}
-        return {}
-
-    def delegate(self, state: AgentState) -> dict[str, Any]:
-        """Delegate the current subtask to a task agent."""
-        subtask = state["plan"][state["current_step"]]
+        return HumanMessage(content=prompt)
+
+    @staticmethod
+    def _parsed_plan(response: str, start: float, retrieved: dict[str, Any]) -> dict[str, Any]:
+        lines = [
+            s.strip() for s in response.split("\n")
+            if s.strip() and s.strip()[0].isdigit()
+        ]
+        steps = [parse_plan_step(line, i) for i, line in enumerate(lines)]
+        return {
+            "plan": [text for text, _ in steps],
+            "dependencies": [deps for _, deps in steps],
+            "current_step": 0,
+            "plan_seconds": time.perf_counter() - start,
+            **retrieved
+        }
+
+    def delegate(self, state: StepInput) -> dict[str, Any]:
+        """Delegate one plan step to a task agent; independent steps run concurrently.
+
+        With a replayer, a step matching a stored subtask memory closely enough
+        takes that memory's outcome and skips the worker model.
+        """
+        step = state["step"]
+        if self.replayer is not None:
+            replayed = self.replayer.replay(state["plan"][step])
+            if replayed is not None:
+                return {"step_outcomes": {step: replayed}, "replayed_steps": [step]}
+        start = time.perf_counter()
+        response = cached_invoke(self.worker_llm, [self._step_prompt(state)], self.provider)
+        if self.replayer is not None:
+            self.replayer.record_delegated(time.perf_counter() - start)
+        return {"step_outcomes": {step: response}}
+
+    async def adelegate(self, state: StepInput) -> dict[str, Any]:
+        step = state["step"]
+        if self.replayer is not None:
+            replayed = await self.replayer.areplay(state["plan"][step])
+            if replayed is not None:
+                return {"step_outcomes": {step: replayed}, "replayed_steps": [step]}
+        start = time.perf_counter()
+        response = await acached_invoke(self.worker_llm, [self._step_prompt(state)], self.provider)
+        if self.replayer is not None:
+            self.replayer.record_delegated(time.perf_counter() - start)
+        return {"step_outcomes": {step: response}}
+
+    @staticmethod
+    def _step_prompt(state: StepInput) -> HumanMessage:
+        step = state["step"]
+        subtask = state["plan"][step]
         prompt = f"Execute this subtask: {subtask}\nContext: {state['task_description']}"
-        response = self.worker_llm.invoke([HumanMessage(content=prompt)])
+        prerequisites = [
+            state["step_outcomes"][d] for d in state["dependencies"][step]
+            if d in state["step_outcomes"]
+        ]
+        if prerequisites:
+            prompt += "\nResults of prerequisite steps:\n" + "\n".join(prerequisites)
+        return HumanMessage(content=prompt)
+
+    def collect(self, state: AgentState) -> dict[str, Any]:
+        """Append the outcomes finished in the last wave to `messages`, in plan order."""
+        reported = state.get("reported_steps") or []
+        outcomes = state.get("step_outcomes") or {}
+        new_steps = sorted(set(outcomes) - set(reported))
         return {
-            "messages": [HumanMessage(content=f"Subtask Outcome: {response.content}")],
-            "current_step": state["current_step"] + 1
+            "messages": [
+                HumanMessage(content=f"Subtask Outcome: {outcomes[i]}") for i in new_steps
+            ],
+            "reported_steps": reported + new_steps,
+            "current_step": len(outcomes)
         }
 
+    async def acollect(self, state: AgentState) -> dict[str, Any]:
+        # Pure bookkeeping; kept on the event loop rather than sent to a thread.
+        return self.collect(state)
+
     def summarize(self, state: AgentState) -> dict[str, Any]:
         """Provide a final summary of the completed task."""
+        prompt = self._summary_prompt(state)
+        return {"final_answer": cached_invoke(self.llm, [prompt], self.provider)}
+
+    async def asummarize(self, state: AgentState) -> dict[str, Any]:
+        prompt = self._summary_prompt(state)
+        return {"final_answer": await acached_invoke(self.llm, [prompt], self.provider)}
+
+    @staticmethod
+    def _summary_prompt(state: AgentState) -> HumanMessage:
         messages = state.get("messages", [])
-        history = "\n".join([m.content for m in messages if isinstance(m, HumanMessage)])
+        history = "\n".join([str(m.content) for m in messages if isinstance(m, HumanMessage)])
         final_prompt = (
             f"Task: {state['task_description']}\n"
             f"Work History:\n{history}\n\n"
             "Provide the final success confirmation. Be specific about any IDs, "
             "protocols, or outcomes achieved."
         )
-        response = self.llm.invoke([HumanMessage(content=final_prompt)])
-        return {"final_answer": response.content}
+        return HumanMessage(content=final_prompt)
 
-def create_legomem_graph(orchestrator: Orchestrator):
-    def should_continue(state: AgentState):
+def plan_dependencies(state: AgentState) -> list[list[int]]:
+    """Per-step dependencies, defaulting to a strictly sequential plan."""
+    plan = state.get("plan") or []
+    return state.get("dependencies") or [[i - 1] if i else [] for i in range(len(plan))]
+
+def ready_steps(state: AgentState) -> list[int]:
+    """Plan steps whose dependencies have all completed and that have not run yet."""
+    plan = state.get("plan") or []
+    dependencies = plan_dependencies(state)
+    done = set(state.get("step_outcomes") or {})
+    remaining = [i for i in range(len(plan)) if i not in done]
+    ready = [i for i in remaining if all(d in done for d in dependencies[i])]
+    # Dependencies only ever point backwards, so this is just a safety net.
+    return ready or remaining[:1]
+
+def create_legomem_graph(
+    orchestrator: Orchestrator, checkpointer: BaseCheckpointSaver[Any] | None = None
+) -> Graph:
+    def should_continue(state: AgentState) -> str | list[Send]:
         if state.get("final_answer"):
             return END
-        if state["current_step"] >= len(state.get("plan", [])):
+        steps = ready_steps(state)
+        if not steps:
             return "summarizer"
-        return "delegator"
+        # Fan out every step that is ready; each wave's branches run concurrently.
+        return [
+            Send("delegator", {
+                "task_description": state["task_description"],
+                "plan": state["plan"],
+                "dependencies": plan_dependencies(state),
+                "step_outcomes": state.get("step_outcomes") or {},
+                "step": i
+            })
+            for i in steps
+        ]
+
+    def node(
+        name: str, func: Callable[..., Any], afunc: Callable[..., Any]
+    ) -> RunnableLambda[Any, Any]:
+        # `invoke` runs `func`, `ainvoke` awaits `afunc`, so one compiled graph
+        # serves both thread pools and event loops.
+        return RunnableLambda(
+            traced(f"node.{name}")(func),
+            afunc=traced(f"node.{name}")(afunc),
+            name=name,
+        )
 
     workflow = StateGraph(AgentState)
-    workflow.add_node("planner", orchestrator.plan)
-    workflow.add_node("delegator", orchestrator.delegate)
-    workflow.add_node("summarizer", orchestrator.summarize)
+    workflow.add_node("planner", node("planner", orchestrator.plan, orchestrator.aplan))
+    workflow.add_node(
+        "delegator",
+        node("delegator", orchestrator.delegate, orchestrator.adelegate),
+        input_schema=StepInput,
+    )
+    workflow.add_node("collector", node("collector", orchestrator.collect, orchestrator.acollect))
+    workflow.add_node(
+        "summarizer", node("summarizer", orchestrator.summarize, orchestrator.asummarize)
+    )
 
     workflow.set_entry_point("planner")
-    workflow.add_conditional_edges("planner", should_continue)
-    workflow.add_conditional_edges("delegator", should_continue)
-    return workflow.compile()
+    workflow.add_conditional_edges("planner", should_continue, ["delegator", "summarizer", END])
+    workflow.add_edge("delegator", "collector")
+    workflow.add_conditional_edges("collector", should_continue, ["delegator", "summarizer", END])
+    return workflow.compile(checkpointer=checkpointer)
+
+_graphs: OrderedDict[
+    tuple[Any, ...], tuple[Graph, Provider, SubtaskReplayer | None, BaseCheckpointSaver[Any] | None]
+] = OrderedDict()
+_graphs_lock = threading.Lock()
+
+def get_legomem_graph(
+    model: str = "gpt-4o",
+    worker_model: str | None = None,
+    context_budget: int | None = DEFAULT_CONTEXT_BUDGET,
+    replayer: SubtaskReplayer | None = None,
+    checkpointer: BaseCheckpointSaver[Any] | None = None
+) -> Graph:
+    """Compiled graph shared by every task with the same settings (and replayer).
+
+    With a `checkpointer`, invoke the graph with a `thread_id` to checkpoint it
+    after every node. The `GRAPH_CACHE_SIZE` most recently used graphs are kept.
+    """
+    provider = get_provider()
+    # Objects are keyed by identity; each entry holds them, so no id is reused
+    # while its entry lives, and evicting it lets them go.
+    key = (
+        id(provider), model, worker_model, context_budget, id(replayer), id(checkpointer)
+    )
+    with _graphs_lock:
+        if key in _graphs:
+            _graphs.move_to_end(key)
+            return _graphs[key][0]
+    graph = create_legomem_graph(
+        Orchestrator(
+            model=model,
+            worker_model=worker_model,
+            provider=provider,
+            context_budget=context_budget,
+            replayer=replayer,
+        ),
+        checkpointer=checkpointer,
+    )
+    with _graphs_lock:
+        graph = _graphs.setdefault(key, (graph, provider, replayer, checkpointer))[0]
+        while len(_graphs) > GRAPH_CACHE_SIZE:
+            _graphs.popitem(last=False)
+    return graph
+
+def clear_graph_cache() -> None:
+    with _graphs_lock:
+        _graphs.clear()
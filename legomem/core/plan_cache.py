@@ -0,0 +1,159 @@
+"""Semantic cache of verified plans, so near-repeat tasks can skip the planner.
+
+Entries are keyed on the task embedding (the same vector the task bank search
+uses, so a lookup is served by the embedding cache). A lookup hits when a cached
+task within `max_distance` (squared L2, as `VectorStore.search_many` reports)
+was planned under the same scope and against the same bank version. Plans are
+only stored after the judge verified the task succeeded.
+"""
+import difflib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r"\S+")
+
+
+def adapt_plan(plan: list[str], cached_task: str, new_task: str) -> list[str]:
+    """Carries word-for-word substitutions between the two task descriptions into the plan.
+
+    "Retrieve Bob's ID B-99" -> "Retrieve Alice's ID A-12" rewrites "Bob's" and
+    "B-99" wherever the cached plan mentions them; everything else is reused as is.
+    """
+    old_words = WORD_PATTERN.findall(cached_task)
+    new_words = WORD_PATTERN.findall(new_task)
+    substitutions: dict[str, str] = {}
+    matcher = difflib.SequenceMatcher(a=old_words, b=new_words, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "replace" and i2 - i1 == j2 - j1:
+            for old, new in zip(old_words[i1:i2], new_words[j1:j2], strict=True):
+                old, new = old.strip(".,;:!?'\""), new.strip(".,;:!?'\"")
+                substitutions[old] = new
+                if old.endswith("'s") and new.endswith("'s"):
+                    substitutions.setdefault(old[:-2], new[:-2])
+    substitutions = {old: new for old, new in substitutions.items() if old and old != new}
+    if not substitutions:
+        return list(plan)
+    pattern = re.compile(
+        r"(?<![\w-])(" + "|".join(map(re.escape, sorted(substitutions, key=len, reverse=True)))
+        + r")(?![\w-])"
+    )
+    return [pattern.sub(lambda m: substitutions[m.group(1)], step) for step in plan]
+
+
+class PlanCache:
+    def __init__(
+        self,
+        max_distance: float = 0.1,
+        max_entries: int = 1000,
+        ttl: float | None = 24 * 3600
+    ):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[int, dict[str, Any]] = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.latency_saved = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expire(self, now: float, bank_version: Any) -> None:
+        stale = [
+            key for key, entry in self._entries.items()
+            if entry["bank_version"] != bank_version
+            or (self.ttl is not None and now - entry["created"] > self.ttl)
+        ]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    def lookup(
+        self,
+        vector: np.ndarray,
+        task_description: str,
+        scope: str = "",
+        bank_version: Any = None
+    ) -> dict[str, Any] | None:
+        """The adapted plan of the nearest cached task, or None on a miss.
+
+        Entries planned against another `bank_version` are dropped, since the
+        memories their plans were built from may have changed.
+        """
+        with self._lock:
+            self._expire(time.time(), bank_version)
+            candidates = [
+                (key, entry) for key, entry in self._entries.items() if entry["scope"] == scope
+            ]
+            best = None
+            if candidates:
+                vectors = np.stack([entry["vector"] for _, entry in candidates])
+                distances = ((vectors - vector[None, :]) ** 2).sum(axis=1)
+                nearest = int(np.argmin(distances))
+                if distances[nearest] <= self.max_distance:
+                    best = candidates[nearest]
+            if best is None:
+                self.misses += 1
+                return None
+            key, entry = best
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.latency_saved += entry["planner_seconds"]
+        return {
+            "plan": adapt_plan(entry["plan"], entry["task_description"], task_description),
+            "dependencies": [list(deps) for deps in entry["dependencies"]],
+            "cached_task": entry["task_description"],
+        }
+
+    def store(
+        self,
+        vector: np.ndarray,
+        task_description: str,
+        plan: list[str],
+        dependencies: list[list[int]] | None,
+        planner_seconds: float = 0.0,
+        scope: str = "",
+        bank_version: Any = None
+    ) -> None:
+        """Caches a plan; call only once the task it produced was verified as successful."""
+        with self._lock:
+            self._entries[self._next_id] = {
+                "vector": np.asarray(vector, dtype="float32"),
+                "task_description": task_description,
+                "plan": list(plan),
+                "dependencies": dependencies or [[i - 1] if i else [] for i in range(len(plan))],
+                "planner_seconds": planner_seconds,
+                "scope": scope,
+                "bank_version": bank_version,
+                "created": time.time(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "latency_saved_s": self.latency_saved,
+                "entries": len(self._entries),
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
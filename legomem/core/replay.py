@@ -0,0 +1,71 @@
+"""Replays stored subtask memories instead of calling the worker model.
+
+When the nearest subtask memory for a plan step is within `max_distance`
+(squared L2), the step is a near-verbatim repeat of one already solved: its
+recorded steps and observations become the step's outcome, with differing
+names or IDs substituted from the step text. Anything farther is delegated as usual.
+"""
+import threading
+from typing import TYPE_CHECKING, Any
+
+from .plan_cache import adapt_plan
+
+if TYPE_CHECKING:
+    from ..memory.retrieval import MemoryRetriever
+
+
+class SubtaskReplayer:
+    def __init__(self, retriever: "MemoryRetriever", max_distance: float = 0.05):
+        self.retriever = retriever
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self.replayed = 0
+        self.delegated = 0
+        self.worker_seconds = 0.0
+
+    def replay(self, subtask: str) -> str | None:
+        """The replayed outcome for `subtask`, or None if it must go to the worker."""
+        return self._outcome(subtask, self.retriever.retrieve_dynamic_many([subtask], k=1)[0])
+
+    async def areplay(self, subtask: str) -> str | None:
+        hits = (await self.retriever.aretrieve_dynamic_many([subtask], k=1))[0]
+        return self._outcome(subtask, hits)
+
+    def _outcome(self, subtask: str, hits: list[tuple[dict[str, Any], float]]) -> str | None:
+        if not hits or hits[0][1] > self.max_distance:
+            return None
+        memory = hits[0][0]
+        steps, observations = adapt_plan(
+            [str(memory.get("steps", "")), str(memory.get("observations", ""))],
+            memory.get("description", ""),
+            subtask,
+        )
+        with self._lock:
+            self.replayed += 1
+        return (
+            f"Replayed from memory ({memory.get('agent', 'agent')}): {steps}\n"
+            f"Observations: {observations}"
+        )
+
+    def record_delegated(self, seconds: float) -> None:
+        """Counts a step the worker ran, and its latency (the basis of `latency_saved_s`)."""
+        with self._lock:
+            self.delegated += 1
+            self.worker_seconds += seconds
+
+    def reset(self) -> None:
+        with self._lock:
+            self.replayed = self.delegated = 0
+            self.worker_seconds = 0.0
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            steps = self.replayed + self.delegated
+            mean_worker = self.worker_seconds / self.delegated if self.delegated else 0.0
+            return {
+                "replayed": self.replayed,
+                "delegated": self.delegated,
+                "replay_rate": self.replayed / steps if steps else 0.0,
+                # Estimated: each replayed step would have cost a mean worker call.
+                "latency_saved_s": self.replayed * mean_worker,
+            }
@@ -1,27 +1,62 @@
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
-from langchain_openai import ChatOpenAI
+
+import numpy as np
 from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
 
-from ..core.orchestrator import Orchestrator, create_legomem_graph
+from ..core.orchestrator import DEFAULT_CONTEXT_BUDGET, get_legomem_graph
+from ..core.plan_cache import PlanCache
+from ..core.replay import SubtaskReplayer
+from ..llm_cache import cached_invoke
 from ..memory.retrieval import MemoryRetriever
 from ..memory.vector_store import VectorStore
+from ..monitoring.tracing import Tracer, flatten_rollup, span, tracer_from_env
 from ..monitoring.wandb_logger import WandBLogger
+from ..providers import get_provider
+from .results_store import ResultsStore, results_store_from_env, task_key, task_thread_id
 
 
 class EvaluationPipeline:
-    def __init__(self, task_bank_path: str, subtask_bank_path: str):
+    def __init__(
+        self,
+        task_bank_path: str,
+        subtask_bank_path: str,
+        mmap: bool = True,
+        tracer: Tracer | None = None,
+        plan_cache: PlanCache | None = None,
+        replay_distance: float | None = None,
+        results_store: ResultsStore | None = None
+    ):
+        # Evaluation only reads the banks, so by default they are memory-mapped and
+        # shared through the page cache rather than copied into every worker.
         self.task_bank = VectorStore()
-        self.task_bank.load(task_bank_path)
+        self.task_bank.load(task_bank_path, mmap=mmap)
         
         self.subtask_bank = VectorStore()
-        self.subtask_bank.load(subtask_bank_path)
+        self.subtask_bank.load(subtask_bank_path, mmap=mmap)
+        self.bank_paths = (task_bank_path, subtask_bank_path)
         
         self.retriever = MemoryRetriever(self.task_bank, self.subtask_bank)
         self.logger = WandBLogger()
+        # Disabled unless LEGOMEM_TRACE names a JSONL file, or a tracer is passed in.
+        self.tracer = tracer or tracer_from_env()
+        # Verified plans reused for near-repeat tasks; None always calls the planner.
+        self.plan_cache = plan_cache
+        # Plan steps this close (squared L2) to a subtask memory replay it instead of
+        # calling the worker model; None always delegates.
+        self.replayer = (
+            SubtaskReplayer(self.retriever, replay_distance)
+            if replay_distance is not None else None
+        )
+        # Judged records and graph checkpoints, so an interrupted run can resume.
+        # Disabled unless LEGOMEM_RESULTS names a sqlite file, or a store is passed in.
+        self.results_store = results_store or results_store_from_env()
 
     def _verify_success(self, task: dict[str, Any], result: dict[str, Any], model: str) -> bool:
         """Verify task success using an LLM judge."""
-        llm = ChatOpenAI(model=model, temperature=0)
+        llm = get_provider().chat_model(model)
         
         # Safe access to result outcomes
         actual_output = result.get('final_answer')
@@ -48,45 +83,83 @@ class EvaluationPipeline:
         # To print memories here, they would need to be passed as an argument to this method.
         # For now, we will only add the judge prompt and response debug prints as requested.
         
-        response = llm.invoke([HumanMessage(content=prompt)])
+        with span("judge"):
+            response = cached_invoke(llm, [HumanMessage(content=prompt)])
         print(f"DEBUG: Judge Prompt: {prompt}")
-        print(f"DEBUG: Judge Response: {response.content}")
-        return "YES" in response.content.upper()
+        print(f"DEBUG: Judge Response: {response}")
+        return "YES" in response.upper()
 
-    def run_eval(self, tasks: list[dict[str, Any]], config: dict[str, Any]):
-        self.logger.start_run(config)
-        
-        success_count = 0
-        model = config.get("model", "gpt-4o")
-        
-    def run_single_task(self, task: dict[str, Any], config: dict[str, Any]) -> dict[str, Any]:
-        """Run a single task through the LEGOMem system."""
+    def run_single_task(
+        self,
+        task: dict[str, Any],
+        config: dict[str, Any],
+        cached_plan: dict[str, Any] | None = None,
+        thread_id: str | None = None
+    ) -> dict[str, Any]:
+        """Run a single task through the LEGOMem system.
+
+        A `cached_plan` (from `PlanCache.lookup`) is passed in as the initial plan,
+        so the planner node keeps it instead of calling the model. With a
+        `thread_id` the graph is checkpointed after every node, and a task that
+        already has a checkpoint resumes from it rather than starting over.
+        """
         model = config.get("model", "gpt-4o")
-        
+        worker_model = config.get("worker_model")
+        app = get_legomem_graph(
+            model,
+            worker_model,
+            config.get("context_budget", DEFAULT_CONTEXT_BUDGET),
+            replayer=self.replayer,
+            checkpointer=(
+                self.results_store.checkpointer
+                if thread_id and self.results_store is not None else None
+            ),
+        )
+        graph_config: RunnableConfig | None = (
+            {"configurable": {"thread_id": thread_id}} if thread_id else None
+        )
+        if graph_config:
+            snapshot = app.get_state(graph_config)
+            if snapshot.values:
+                print(f"Resuming task {task.get('id')} from its last checkpoint")
+                # Nothing left to run means the graph finished but was never judged.
+                values: dict[str, Any] = (
+                    app.invoke(None, graph_config) if snapshot.next else snapshot.values
+                )
+                return values
+
         # Retrieval logic
         strategy = config.get("retrieval_strategy", "Vanilla")
         k = config.get("K", 5)
+        # Optional squared-L2 cutoff: K caps the memories, the threshold trims weak ones.
+        max_distance = config.get("max_distance")
         
         if strategy == "Vanilla":
-            memories = self.retriever.retrieve_vanilla(task['description'], k=k)
+            memories = self.retriever.retrieve_vanilla(
+                task['description'], k=k, max_distance=max_distance
+            )
         elif strategy == "QueryRewrite":
             # 1. Retrieve similar tasks context
-            similar_tasks = self.retriever.retrieve_vanilla(task['description'], k=3)
+            similar_tasks = self.retriever.retrieve_vanilla(
+                task['description'], k=3, max_distance=max_distance
+            )
             # 2. Rewrite query into subtasks
             subtasks = self.retriever.rewrite_query(task['description'], similar_tasks)
             # 3. Retrieve dynamic memories for subtasks
-            dynamic_memories = []
-            for st in subtasks:
-                dynamic_memories.extend(self.retriever.retrieve_dynamic(st, k=1))
+            dynamic_memories = [
+                memory
+                for hits in self.retriever.retrieve_dynamic_many(
+                    subtasks, k=1, max_distance=max_distance
+                )
+                for memory, _ in hits
+            ]
             memories = similar_tasks + dynamic_memories
         else:
-            memories = self.retriever.retrieve_vanilla(task['description'], k=k)
+            memories = self.retriever.retrieve_vanilla(
+                task['description'], k=k, max_distance=max_distance
+            )
             
         # Setup State
-        worker_model = config.get("worker_model")
-        orchestrator = Orchestrator(model=model, worker_model=worker_model)
-        app = create_legomem_graph(orchestrator)
-        
         inputs = {
             "task_description": task['description'],
             "memories": memories,
@@ -95,30 +168,181 @@ class EvaluationPipeline:
             "current_step": 0,
             "final_answer": None
         }
+        if cached_plan is not None:
+            inputs["plan"] = cached_plan["plan"]
+            inputs["dependencies"] = cached_plan["dependencies"]
         
         # Run Agent
-        return app.invoke(inputs)
+        result: dict[str, Any] = app.invoke(inputs, graph_config)
+        return result
+
+    def evaluate_task(
+        self, task: dict[str, Any], config: dict[str, Any], run_key: str | None = None
+    ) -> dict[str, Any]:
+        """Run and judge one task; any failure is contained to this task's record."""
+        print(f"Running task: {task['description']}")
+        record = {"id": task.get("id"), "type": task.get("type", "unknown"), "success": False}
+        thread_id = task_thread_id(run_key, task_key(task)) if run_key else None
+        with self.tracer.task(task.get("id")) as trace:
+            try:
+                cache_key = self._plan_cache_key(task, config)
+                cached_plan = None
+                if cache_key and self.plan_cache is not None:
+                    cached_plan = self.plan_cache.lookup(*cache_key)
+                result = self.run_single_task(
+                    task, config, cached_plan=cached_plan, thread_id=thread_id
+                )
+                record["success"] = self._verify_success(
+                    task, result, config.get("model", "gpt-4o")
+                )
+                self._record_outcome(result.get("memories") or [], record["success"])
+                if self.replayer is not None:
+                    record["plan_steps"] = len(result.get("plan") or [])
+                    record["replayed_steps"] = len(result.get("replayed_steps") or [])
+                if cache_key and self.plan_cache is not None:
+                    record["plan_cache_hit"] = cached_plan is not None
+                    if record["success"] and cached_plan is None and result.get("plan"):
+                        vector, description, scope, version = cache_key
+                        self.plan_cache.store(
+                            vector,
+                            description,
+                            result["plan"],
+                            result.get("dependencies"),
+                            planner_seconds=result.get("plan_seconds", 0.0),
+                            scope=scope,
+                            bank_version=version,
+                        )
+            except Exception as e:
+                print(f"Error running task {task.get('id')}: {e}")
+                record["error"] = str(e)
+        if trace is not None:
+            record["trace"] = trace.rollup()
+        return record
+
+    def _record_outcome(self, memories: list[dict[str, Any]], success: bool) -> None:
+        """Credits the memories the task retrieved with its outcome (for "success" eviction)."""
+        tagged = [m for m in memories if "memory_id" in m]
+        task_ids = [m["memory_id"] for m in tagged if "task_description" in m]
+        subtask_ids = [m["memory_id"] for m in tagged if "task_description" not in m]
+        if task_ids:
+            self.task_bank.record_outcome(task_ids, success)
+        if subtask_ids:
+            self.subtask_bank.record_outcome(subtask_ids, success)
 
-    def run_eval(self, tasks: list[dict[str, Any]], config: dict[str, Any]):
+    def _plan_cache_key(
+        self, task: dict[str, Any], config: dict[str, Any]
+    ) -> tuple[np.ndarray, str, str, tuple[int, int]] | None:
+        """(task vector, description, scope, bank version) for `PlanCache`, if enabled."""
+        if self.plan_cache is None:
+            return None
+        # Plans depend on which memories the planner saw, so they are only shared
+        # between tasks run with the same model and retrieval settings.
+        scope = "|".join(
+            str(config.get(key)) for key in (
+                "model", "worker_model", "retrieval_strategy", "K", "max_distance", "context_budget"
+            )
+        )
+        version = (self.task_bank.version, self.subtask_bank.version)
+        vector = self.retriever.embed_task(task["description"])
+        return vector, task["description"], scope, version
+
+    def run_tasks(
+        self,
+        tasks: list[dict[str, Any]],
+        config: dict[str, Any],
+        on_result: Callable[[dict[str, Any]], None] | None = None
+    ) -> list[dict[str, Any]]:
+        """Evaluate tasks with up to `config["max_concurrency"]` in flight.
+
+        Results come back in task order regardless of completion order, and
+        `on_result` is always called from the calling thread, in that same order,
+        so callers can log without synchronising.
+
+        With a results store, tasks this run config already finished are returned
+        from the store without running, and each new record is stored as it lands.
+        """
+        max_concurrency = max(1, config.get("max_concurrency", 1))
+        run_key, done = None, {}
+        if self.results_store is not None:
+            task_bank, subtask_bank = self.bank_paths
+            run_key = self.results_store.start_run(
+                {**config, "task_bank": task_bank, "subtask_bank": subtask_bank}
+            )
+            done = self.results_store.completed(run_key)
+            finished = sum(task_key(task) in done for task in tasks)
+            if finished:
+                print(f"Resuming run {run_key}: {finished}/{len(tasks)} tasks already done")
+
+        def evaluate(task: dict[str, Any]) -> dict[str, Any]:
+            key = task_key(task)
+            if key in done:
+                return done[key]
+            record = self.evaluate_task(task, config, run_key=run_key)
+            # Failed runs (as opposed to failed tasks) are retried on the next start.
+            if self.results_store is not None and run_key is not None and "error" not in record:
+                self.results_store.save(run_key, key, record)
+            return record
+
+        records = []
+        if max_concurrency == 1:
+            for task in tasks:
+                record = evaluate(task)
+                if on_result:
+                    on_result(record)
+                records.append(record)
+        else:
+            with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+                futures = [pool.submit(evaluate, task) for task in tasks]
+                for future in futures:
+                    record = future.result()
+                    if on_result:
+                        on_result(record)
+                    records.append(record)
+        # Shared banks are read-only here; hand their hits and outcomes to the writer.
+        self.task_bank.flush_usage()
+        self.subtask_bank.flush_usage()
+        return records
+
+    def _replay_metrics(self, records: list[dict[str, Any]]) -> dict[str, float]:
+        """Replay stats for the run, and success with vs. without replayed steps."""
+        stats = self.replayer.stats() if self.replayer is not None else {}
+        metrics = {f"replay/{key}": value for key, value in stats.items()}
+        for name, group in (
+            ("with_replay", [r for r in records if r.get("replayed_steps")]),
+            ("without_replay", [r for r in records if not r.get("replayed_steps")]),
+        ):
+            metrics[f"replay/tasks_{name}"] = len(group)
+            if group:
+                metrics[f"replay/success_rate_{name}"] = (
+                    sum(r["success"] for r in group) / len(group)
+                )
+        return metrics
+
+    def run_eval(self, tasks: list[dict[str, Any]], config: dict[str, Any]) -> float:
         self.logger.start_run(config)
-        
-        success_count = 0
-        model = config.get("model", "gpt-4o")
-        
-        for task in tasks:
-            print(f"Running task: {task['description']}")
-            result = self.run_single_task(task, config)
-            
-            # Rigorous Success check
-            is_success = self._verify_success(task, result, model)
-            if is_success:
-                success_count += 1
-            
-            print(f"Task Success: {is_success}")
-            self.logger.log_metrics({"task_success": int(is_success)})
+        if self.replayer is not None:
+            self.replayer.reset()
+
+        def log_result(record: dict[str, Any]) -> None:
+            print(f"Task {record['id']} Success: {record['success']}")
+            metrics: dict[str, float] = {"task_success": int(record["success"])}
+            if "trace" in record:
+                metrics.update(flatten_rollup(record["trace"]))
+            self.logger.log_metrics(metrics)
+
+        records = self.run_tasks(tasks, config, on_result=log_result)
+        success_count = sum(r["success"] for r in records)
 
         success_rate = success_count / len(tasks) if tasks else 0
         self.logger.log_metrics({"total_success_rate": success_rate})
+        if self.tracer.enabled:
+            self.logger.log_metrics(flatten_rollup(self.tracer.finish(), prefix="trace/run"))
+        if self.plan_cache is not None:
+            self.logger.log_metrics({
+                f"plan_cache/{key}": value for key, value in self.plan_cache.stats().items()
+            })
+        if self.replayer is not None:
+            self.logger.log_metrics(self._replay_metrics(records))
         self.logger.finish_run()
         
         return success_rate
@@ -0,0 +1,375 @@
+"""Persistent evaluation results and graph checkpoints, so runs survive restarts.
+
+`ResultsStore` keeps one sqlite file with:
+
+- runs:    one row per distinct run config (`run_key` is a hash of it).
+- results: one judged record per (run_key, task id); a restarted run skips these.
+- graph checkpoints, through `SqliteCheckpointer`, a LangGraph checkpoint saver.
+  Each task's graph runs on thread "<run_key>:<task id>", so a task interrupted
+  mid-graph resumes from its last completed node instead of re-planning.
+
+Finished runs can be aggregated without re-running anything:
+
+    python -m legomem.eval.results_store data/results.sqlite
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+DEFAULT_RESULTS_PATH = "data/results.sqlite"
+# Settings that change how fast a run goes, not what it produces.
+RUNTIME_KEYS = ("max_concurrency",)
+
+
+def run_key(config: dict[str, Any]) -> str:
+    payload = {k: v for k, v in config.items() if k not in RUNTIME_KEYS}
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def task_key(task: dict[str, Any]) -> str:
+    """The task's id, or a hash of its description for datasets without ids."""
+    if task.get("id") is not None:
+        return str(task["id"])
+    return hashlib.sha256(task["description"].encode("utf-8")).hexdigest()[:16]
+
+
+def task_thread_id(key: str, task_id: str) -> str:
+    return f"{key}:{task_id}"
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    return db
+
+
+class SqliteCheckpointer(BaseCheckpointSaver[int]):
+    """LangGraph checkpoint saver on a shared sqlite connection.
+
+    Checkpoints are stored whole (channel values included) with the saver's
+    serializer; pending writes are kept per checkpoint so a crashed super-step
+    only re-runs the branches that had not finished. The async methods run the
+    same queries in a worker thread, so `graph.ainvoke` never blocks its loop.
+    """
+
+    def __init__(self, db: sqlite3.Connection, lock: threading.Lock):
+        super().__init__()
+        self._db = db
+        self._lock = lock
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS graph_checkpoints ("
+                "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, "
+                "checkpoint_id TEXT NOT NULL, parent_id TEXT, type TEXT NOT NULL, "
+                "checkpoint BLOB NOT NULL, metadata_type TEXT NOT NULL, "
+                "metadata BLOB NOT NULL, "
+                "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS graph_writes ("
+                "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, "
+                "checkpoint_id TEXT NOT NULL, task_id TEXT NOT NULL, idx INTEGER NOT NULL, "
+                "channel TEXT NOT NULL, type TEXT NOT NULL, value BLOB NOT NULL, "
+                "task_path TEXT NOT NULL, "
+                "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))"
+            )
+            self._db.commit()
+
+    def _tuple(self, row: tuple[Any, ...]) -> CheckpointTuple:
+        thread_id, ns, checkpoint_id, parent_id, type_, blob, metadata_type, metadata = row
+        with self._lock:
+            writes = self._db.execute(
+                "SELECT task_id, channel, type, value FROM graph_writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+                "ORDER BY task_id, idx",
+                (thread_id, ns, checkpoint_id),
+            ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint_id,
+            }},
+            checkpoint=self.serde.loads_typed((type_, blob)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": parent_id,
+                }}
+                if parent_id else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        configurable = config["configurable"]
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, "
+            "metadata_type, metadata FROM graph_checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params: list[Any] = [configurable["thread_id"], configurable.get("checkpoint_ns", "")]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        # Checkpoint ids are time-ordered, so the largest is the latest.
+        with self._lock:
+            row = self._db.execute(
+                query + " ORDER BY checkpoint_id DESC LIMIT 1", params
+            ).fetchone()
+        return self._tuple(row) if row else None
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, "
+            "metadata_type, metadata FROM graph_checkpoints WHERE 1 = 1"
+        )
+        params: list[Any] = []
+        if config is not None:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if "checkpoint_ns" in config["configurable"]:
+                query += " AND checkpoint_ns = ?"
+                params.append(config["configurable"]["checkpoint_ns"])
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_id)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY checkpoint_id DESC", params).fetchall()
+        yielded = 0
+        for row in rows:
+            checkpoint = self._tuple(row)
+            if filter and any(checkpoint.metadata.get(k) != v for k, v in filter.items()):
+                continue
+            yield checkpoint
+            yielded += 1
+            if limit is not None and yielded >= limit:
+                return
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        ns = configurable.get("checkpoint_ns", "")
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO graph_checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, ns, checkpoint["id"], configurable.get("checkpoint_id"),
+                 type_, blob, metadata_type, metadata_blob),
+            )
+            self._db.commit()
+        return {"configurable": {
+            "thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"],
+        }}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        configurable = config["configurable"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            rows.append((
+                configurable["thread_id"], configurable.get("checkpoint_ns", ""),
+                configurable["checkpoint_id"], task_id, WRITES_IDX_MAP.get(channel, idx),
+                channel, type_, blob, task_path,
+            ))
+        # Special channels (errors, interrupts) are overwritten; regular writes are kept.
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO graph_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows if row[4] >= 0],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO graph_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows if row[4] < 0],
+            )
+            self._db.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM graph_checkpoints WHERE thread_id = ?", (thread_id,))
+            self._db.execute("DELETE FROM graph_writes WHERE thread_id = ?", (thread_id,))
+            self._db.commit()
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+class ResultsStore:
+    def __init__(self, path: str = DEFAULT_RESULTS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = _connect(path)
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "run_key TEXT PRIMARY KEY, config TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "run_key TEXT NOT NULL, task_id TEXT NOT NULL, success INTEGER NOT NULL, "
+                "record TEXT NOT NULL, finished REAL NOT NULL, "
+                "PRIMARY KEY (run_key, task_id))"
+            )
+            self._db.commit()
+        self.checkpointer = SqliteCheckpointer(self._db, self._lock)
+
+    def start_run(self, config: dict[str, Any]) -> str:
+        """Registers `config` (if new) and returns its run key."""
+        key = run_key(config)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO runs VALUES (?, ?, ?)",
+                (key, json.dumps(config, sort_keys=True, default=str), time.time()),
+            )
+            self._db.commit()
+        return key
+
+    def completed(self, key: str) -> dict[str, dict[str, Any]]:
+        """Finished records of a run, by task key."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT task_id, record FROM results WHERE run_key = ?", (key,)
+            ).fetchall()
+        return {task_id: json.loads(record) for task_id, record in rows}
+
+    def save(self, key: str, task_id: str, record: dict[str, Any]) -> None:
+        """Stores a judged record and drops the task's graph checkpoints."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (key, task_id, int(record["success"]),
+                 json.dumps(record, default=str), time.time()),
+            )
+            self._db.commit()
+        self.checkpointer.delete_thread(task_thread_id(key, task_id))
+
+    def summary(self) -> list[dict[str, Any]]:
+        """Per run: its config, finished tasks and success rate, overall and by task type."""
+        with self._lock:
+            runs = self._db.execute("SELECT run_key, config FROM runs ORDER BY created").fetchall()
+        summaries = []
+        for key, config in runs:
+            records = list(self.completed(key).values())
+            by_type: dict[str, list[bool]] = {}
+            for record in records:
+                by_type.setdefault(record.get("type", "unknown"), []).append(record["success"])
+            summaries.append({
+                "run_key": key,
+                "config": json.loads(config),
+                "tasks": len(records),
+                "success_rate": (
+                    sum(r["success"] for r in records) / len(records) if records else 0.0
+                ),
+                "by_type": {t: sum(s) / len(s) for t, s in sorted(by_type.items())},
+            })
+        return summaries
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def results_store_from_env() -> ResultsStore | None:
+    """`LEGOMEM_RESULTS=path.sqlite` persists runs there; unset (or "off") keeps them in memory."""
+    path = os.getenv("LEGOMEM_RESULTS", "")
+    if path in ("", "off"):
+        return None
+    return ResultsStore(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize stored evaluation runs")
+    parser.add_argument("path", nargs="?", default=DEFAULT_RESULTS_PATH)
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON output path")
+
+    args = parser.parse_args()
+    summaries = ResultsStore(args.path).summary()
+    for s in summaries:
+        config = s["config"]
+        label = ", ".join(f"{k}={config[k]}" for k in sorted(config))
+        print(f"{s['run_key']}  {s['tasks']:>5} tasks  {s['success_rate'] * 100:6.2f}%  {label}")
+        for task_type, rate in s["by_type"].items():
+            print(f"{'':>18}{task_type:<12} {rate * 100:6.2f}%")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summaries, f, indent=2)
@@ -0,0 +1,265 @@
+"""Deterministic record/replay cache for temperature-0 LLM calls.
+
+Every chat completion in the package goes through `LLMCache.complete`, keyed by
+(model, normalized messages, params). Modes:
+
+- ``passthrough``: always call the model, store nothing (the default).
+- ``record``: serve stored responses and record every new one.
+- ``replay``: serve stored responses only; a miss raises `LLMCacheMissError`, so a CI
+  replay can never silently hit the network.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any
+
+from .monitoring.tracing import record_usage, span
+from .providers import Provider, get_provider
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+    from langchain_core.messages import BaseMessage
+
+DEFAULT_LLM_CACHE_PATH = "data/cache/llm_responses.sqlite"
+LLM_CACHE_MODES = ("passthrough", "record", "replay")
+
+
+class LLMCacheMissError(LookupError):
+    """Raised in replay mode when a call has no recorded response."""
+
+
+def normalize_messages(messages: list[dict[str, str]]) -> list[dict[str, str]]:
+    """Canonical form for keying: unified newlines and no trailing whitespace."""
+    normalized = []
+    for message in messages:
+        content = message["content"].replace("\r\n", "\n")
+        content = "\n".join(line.rstrip() for line in content.split("\n")).strip()
+        normalized.append({"role": message["role"], "content": content})
+    return normalized
+
+
+class LLMCache:
+    def __init__(self, path: str | None = DEFAULT_LLM_CACHE_PATH, mode: str = "passthrough"):
+        if mode not in LLM_CACHE_MODES:
+            raise ValueError(
+                f"Unknown LLM cache mode {mode!r}; expected one of {LLM_CACHE_MODES}"
+            )
+        self.path = path
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory: dict[str, str] = {}
+        self._db: sqlite3.Connection | None = None
+        if path and mode != "passthrough":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL, "
+                "created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, messages: list[dict[str, str]], params: dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": normalize_messages(messages), "params": params},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def complete(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        params: dict[str, Any],
+        call: Callable[[], str]
+    ) -> str:
+        """Returns the stored response for this request, or runs `call` per the mode."""
+        if self.mode == "passthrough":
+            return call()
+
+        key = self.make_key(model, messages, params)
+        cached = self._serve(key, model)
+        if cached is not None:
+            return cached
+        response = call()
+        self._store(key, model, response)
+        return response
+
+    async def acomplete(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        params: dict[str, Any],
+        call: Callable[[], Awaitable[str]]
+    ) -> str:
+        """`complete` for an async `call`; the SQLite reads and writes run in a thread."""
+        if self.mode == "passthrough":
+            return await call()
+
+        key = self.make_key(model, messages, params)
+        cached = await asyncio.to_thread(self._serve, key, model)
+        if cached is not None:
+            return cached
+        response = await call()
+        await asyncio.to_thread(self._store, key, model, response)
+        return response
+
+    def _serve(self, key: str, model: str) -> str | None:
+        """The stored response, counted as a hit; None (or `LLMCacheMissError`) on a miss."""
+        cached = self._lookup(key)
+        with self._lock:
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+        if self.mode == "replay":
+            raise LLMCacheMissError(f"No recorded response for {model} request {key[:12]}")
+        return None
+
+    def _lookup(self, key: str) -> str | None:
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                response: str = row[0]
+                self._memory[key] = response
+                return response
+        return None
+
+    def _store(self, key: str, model: str, response: str) -> None:
+        with self._lock:
+            self._memory[key] = response
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, created) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, model, response, time.time())
+                )
+                self._db.commit()
+
+
+_shared_cache: LLMCache | None = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Process-wide cache configured by `LEGOMEM_LLM_CACHE_MODE` / `LEGOMEM_LLM_CACHE`."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMCache(
+                path=os.getenv("LEGOMEM_LLM_CACHE", DEFAULT_LLM_CACHE_PATH),
+                mode=os.getenv("LEGOMEM_LLM_CACHE_MODE", "passthrough"),
+            )
+        return _shared_cache
+
+
+def set_llm_cache(cache: LLMCache) -> None:
+    global _shared_cache
+    with _shared_lock:
+        _shared_cache = cache
+
+
+def _chat_role(message: "BaseMessage") -> str:
+    return {"human": "user", "ai": "assistant"}.get(message.type, message.type)
+
+
+def _params(temperature: float | None, provider: Provider) -> dict[str, Any]:
+    """Request parameters that key a call, the same whichever API made it."""
+    return {
+        "temperature": None if temperature is None else float(temperature),
+        "provider": provider.name,
+    }
+
+
+def _cache_request(
+    llm: "BaseChatModel", messages: "list[BaseMessage]", provider: Provider | None
+) -> tuple[str, list[dict[str, str]], dict[str, Any]]:
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", type(llm).__name__)
+    params = _params(getattr(llm, "temperature", None), provider or get_provider())
+    as_dicts = [{"role": _chat_role(m), "content": str(m.content)} for m in messages]
+    return str(model), as_dicts, params
+
+
+def _message_text(message: Any) -> str:
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        record_usage(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+    return str(message.content)
+
+
+def cached_invoke(
+    llm: "BaseChatModel", messages: "list[BaseMessage]", provider: Provider | None = None
+) -> str:
+    """`llm.invoke(messages).content`, routed through the shared LLM cache.
+
+    `provider` is the one that built `llm` (default: the process-wide one); calls
+    are keyed by its name, as `cached_completion` calls are.
+    """
+    def call() -> str:
+        with span("llm", call=True):
+            return _message_text(llm.invoke(messages))
+
+    return get_llm_cache().complete(*_cache_request(llm, messages, provider), call)
+
+
+async def acached_invoke(
+    llm: "BaseChatModel", messages: "list[BaseMessage]", provider: Provider | None = None
+) -> str:
+    """`cached_invoke` through `llm.ainvoke`."""
+    async def call() -> str:
+        with span("llm", call=True):
+            return _message_text(await llm.ainvoke(messages))
+
+    return await get_llm_cache().acomplete(*_cache_request(llm, messages, provider), call)
+
+
+def cached_completion(
+    model: str,
+    messages: list[dict[str, str]],
+    temperature: float = 0,
+    provider: Provider | None = None
+) -> str:
+    """A provider chat completion, routed through the shared LLM cache."""
+    provider = provider or get_provider()
+    params = _params(temperature, provider)
+
+    def call() -> str:
+        with span("llm", call=True):
+            return provider.complete(model, messages, temperature)
+
+    return get_llm_cache().complete(model, messages, params, call)
+
+
+async def acached_completion(
+    model: str,
+    messages: list[dict[str, str]],
+    temperature: float = 0,
+    provider: Provider | None = None
+) -> str:
+    """`cached_completion` through the provider's async client."""
+    provider = provider or get_provider()
+    params = _params(temperature, provider)
+
+    async def call() -> str:
+        with span("llm", call=True):
+            return await provider.acomplete(model, messages, temperature)
+
+    return await get_llm_cache().acomplete(model, messages, params, call)
@@ -0,0 +1,221 @@
+"""Memory-bank server: owns shards of one or more banks behind a small HTTP API.
+
+Each process serves named `VectorStore`s (e.g. one shard of the task bank and one
+of the subtask bank), and `ShardedVectorStore` scatters searches across such
+processes. Queries arrive already embedded, so shards never call the embedding API.
+
+    python -m legomem.memory.bank_server --bank task=data/shards/task_0 \\
+        --bank subtask=data/shards/subtask_0 --partition-key subtask=agent --port 8100
+
+Endpoints (JSON bodies; vectors are base64-encoded float32):
+
+    GET  /banks                      {name: {"ntotal", "dimension", "lexical"}}
+    POST /banks/<name>/search        {"vectors", "k", "nprobe"?, "ef_search"?, "partition"?}
+                                     -> {"results": [[[distance, memory], ...], ...]}
+    POST /banks/<name>/lexical       {"query", "k", "partition"?}
+                                     -> {"results": [[score, memory], ...]}
+    POST /banks/<name>/add           {"contents", "vectors"} -> {"ntotal", "ids"}
+    POST /banks/<name>/update        {"id", "content", "vectors"?} -> {}
+    POST /banks/<name>/delete        {"ids"} -> {"deleted"}
+    POST /banks/<name>/record_outcome {"ids", "success"} -> {}
+    POST /banks/<name>/save          -> {"ntotal"}
+
+Ids are the shard's own; `ShardedVectorStore` maps them to bank-wide ids.
+"""
+import argparse
+import base64
+import contextlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import numpy as np
+
+from .vector_store import VectorStore
+
+
+def encode_vectors(vectors: np.ndarray) -> dict[str, Any]:
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    return {"shape": list(vectors.shape), "data": base64.b64encode(vectors.tobytes()).decode()}
+
+
+def decode_vectors(payload: dict[str, Any]) -> np.ndarray:
+    data = np.frombuffer(base64.b64decode(payload["data"]), dtype="float32")
+    return data.reshape(payload["shape"])
+
+
+class BankServer:
+    def __init__(self, banks: dict[str, VectorStore], host: str = "127.0.0.1", port: int = 0):
+        self.banks = banks
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.socket.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def search(self, name: str, body: dict[str, Any]) -> dict[str, Any]:
+        bank = self.banks[name]
+        results = bank.search_memories(
+            decode_vectors(body["vectors"]),
+            body["k"],
+            nprobe=body.get("nprobe"),
+            ef_search=body.get("ef_search"),
+            partition=body.get("partition"),
+        )
+        return {"results": [[[dist, memory] for memory, dist in hits] for hits in results]}
+
+    def lexical(self, name: str, body: dict[str, Any]) -> dict[str, Any]:
+        hits = self.banks[name].search_lexical_memories(
+            body["query"], body["k"], partition=body.get("partition")
+        )
+        return {"results": [[score, memory] for memory, score in hits]}
+
+    def add(self, name: str, body: dict[str, Any]) -> dict[str, Any]:
+        bank = self.banks[name]
+        ids = bank.add_vectors(body["contents"], decode_vectors(body["vectors"]))
+        return {"ntotal": bank.size, "ids": ids}
+
+    def update(self, name: str, body: dict[str, Any]) -> dict[str, Any]:
+        vectors = decode_vectors(body["vectors"]) if body.get("vectors") else None
+        self.banks[name].update(
+            body["id"], body["content"], vector=None if vectors is None else vectors[0]
+        )
+        return {}
+
+    def delete(self, name: str, body: dict[str, Any]) -> dict[str, Any]:
+        return {"deleted": self.banks[name].delete(body["ids"])}
+
+    def record_outcome(self, name: str, body: dict[str, Any]) -> dict[str, Any]:
+        self.banks[name].record_outcome(body["ids"], bool(body["success"]))
+        return {}
+
+    def save(self, name: str, body: dict[str, Any]) -> dict[str, Any]:
+        bank = self.banks[name]
+        if bank.read_only:
+            raise ValueError(f"Bank {name!r} is served read-only and cannot be saved")
+        if bank.path is None:
+            raise ValueError(f"Bank {name!r} has no path to save to")
+        bank.save(bank.path)
+        return {"ntotal": bank.size}
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+        routes = {
+            "search": server.search,
+            "lexical": server.lexical,
+            "add": server.add,
+            "update": server.update,
+            "delete": server.delete,
+            "record_outcome": server.record_outcome,
+            "save": server.save,
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, payload: dict[str, Any]) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                if self.path.rstrip("/") != "/banks":
+                    self._reply(404, {"error": f"Unknown path {self.path}"})
+                    return
+                self._reply(200, {
+                    name: {
+                        "ntotal": bank.size,
+                        "dimension": bank.dimension,
+                        "lexical": bank.lexical_index is not None,
+                    }
+                    for name, bank in server.banks.items()
+                })
+
+            def do_POST(self) -> None:
+                parts = self.path.strip("/").split("/")
+                if len(parts) != 3 or parts[0] != "banks" or parts[2] not in routes:
+                    self._reply(404, {"error": f"Unknown path {self.path}"})
+                    return
+                if parts[1] not in server.banks:
+                    self._reply(404, {"error": f"Unknown bank {parts[1]!r}"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                    if not isinstance(body, dict):
+                        raise ValueError("Request body must be a JSON object")
+                    reply = routes[parts[2]](parts[1], body)
+                # Malformed bodies (bad JSON, missing fields, vectors of the wrong
+                # shape) surface as any of these from json, numpy or FAISS.
+                except (KeyError, ValueError, TypeError, AssertionError, RuntimeError) as e:
+                    self._reply(400, {"error": f"{type(e).__name__}: {e}"})
+                    return
+                self._reply(200, reply)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def __enter__(self) -> "BankServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        for bank in self.banks.values():
+            bank.close()
+
+
+def _named(values: list[str], flag: str) -> dict[str, str]:
+    pairs = {}
+    for value in values:
+        name, sep, rest = value.partition("=")
+        if not sep:
+            raise SystemExit(f"{flag} expects name=value, got {value!r}")
+        pairs[name] = rest
+    return pairs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve memory-bank shards over HTTP")
+    parser.add_argument("--bank", action="append", default=[], required=True,
+                        help="name=path of a bank shard to serve (repeatable)")
+    parser.add_argument("--partition-key", action="append", default=[],
+                        help="name=key partition key for a new bank (repeatable)")
+    parser.add_argument("--lexical-key", action="append", default=[],
+                        help="name=key BM25 text field for a new bank (repeatable)")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--dimension", type=int, default=3072)
+    parser.add_argument("--index-type", type=str, default="flat")
+    parser.add_argument("--mmap", action="store_true", help="Serve saved shards read-only")
+
+    args = parser.parse_args()
+    partition_keys = _named(args.partition_key, "--partition-key")
+    lexical_keys = _named(args.lexical_key, "--lexical-key")
+    banks = {
+        name: VectorStore.open(
+            path,
+            mmap=args.mmap,
+            dimension=args.dimension,
+            index_type=args.index_type,
+            partition_key=partition_keys.get(name),
+            lexical_key=lexical_keys.get(name),
+        )
+        for name, path in _named(args.bank, "--bank").items()
+    }
+    server = BankServer(banks, host=args.host, port=args.port)
+    print(f"Serving banks {', '.join(banks)} on {server.base_url}", flush=True)
+    with contextlib.suppress(KeyboardInterrupt):
+        server.serve_forever()
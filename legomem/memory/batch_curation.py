@@ -0,0 +1,231 @@
+"""Batch curation of logged trajectories into the task and subtask banks.
+
+Trajectories are streamed from JSONL, one object per line:
+
+    {"id": "T-17", "task_description": "...", "trajectory": "..." | [...]}
+
+and curated with bounded concurrency. Curated memories are added to the banks in
+bulk; once a batch is in the banks' write-ahead logs its IDs are appended to a
+checkpoint file, so a rerun after a crash resumes where the last one stopped.
+Every memory also carries its `trajectory_id`, so trajectories that reached the
+banks before a crash cut their checkpoint short are not added a second time.
+Responses that cannot be parsed go to a dead-letter JSONL file (with the raw
+response and the original record) and are checkpointed as dead rather than
+retried; feed the dead-letter file back in as input to try them again. Any other error
+(e.g. an API failure) leaves the trajectory un-checkpointed for the next run.
+
+    python -m legomem.memory.batch_curation trajectories.jsonl --max-concurrency 16
+"""
+import argparse
+import hashlib
+import json
+import os
+from collections.abc import Iterator
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any
+
+from .curation import CurationError, MemoryCurator
+from .vector_store import VectorStore
+
+
+def trajectory_id(record: dict[str, Any], line: str) -> str:
+    """The record's own ID, or a content hash for records without one."""
+    if record.get("id") is not None:
+        return str(record["id"])
+    return "sha1:" + hashlib.sha1(line.encode("utf-8")).hexdigest()
+
+
+def stream_trajectories(path: str) -> Iterator[tuple[str, dict[str, Any], bool]]:
+    """Yields (id, record, is_retry); dead-letter entries are unwrapped and marked as retries."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "record" in entry and "error" in entry:
+                yield entry["id"], entry["record"], True
+            else:
+                yield trajectory_id(entry, line), entry, False
+
+
+def load_checkpoint(path: str) -> dict[str, str]:
+    """Maps each checkpointed ID to its latest outcome, "curated" or "dead"."""
+    outcomes: dict[str, str] = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                traj_id, _, outcome = line.rstrip("\n").partition("\t")
+                if traj_id:
+                    outcomes[traj_id] = outcome or "curated"
+    return outcomes
+
+
+def banked_trajectories(bank: VectorStore) -> set[str]:
+    """IDs of the trajectories whose memories are already stored in `bank`."""
+    return {
+        str(memory["trajectory_id"])
+        for memory in bank.memories
+        if memory.get("trajectory_id") is not None
+    }
+
+
+def _append_lines(path: str, lines: list[str]) -> None:
+    if not lines:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(line + "\n" for line in lines))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class BatchCurator:
+    def __init__(
+        self,
+        task_bank_path: str,
+        subtask_bank_path: str,
+        curator: MemoryCurator | None = None,
+        checkpoint_path: str | None = None,
+        dead_letter_path: str | None = None,
+        max_concurrency: int = 8,
+        flush_every: int = 256
+    ):
+        self.bank_paths = (task_bank_path, subtask_bank_path)
+        self.task_bank = VectorStore.open(task_bank_path, lexical_key="task_description")
+        self.subtask_bank = VectorStore.open(
+            subtask_bank_path, partition_key="agent", lexical_key="description"
+        )
+        self.curator = curator or MemoryCurator()
+        self.checkpoint_path = checkpoint_path or f"{task_bank_path}.curated"
+        self.dead_letter_path = dead_letter_path or f"{task_bank_path}.dead_letter.jsonl"
+        self.max_concurrency = max(1, max_concurrency)
+        self.flush_every = max(1, flush_every)
+        self.stats = {"curated": 0, "skipped": 0, "dead_lettered": 0, "failed": 0}
+        self._pending: list[tuple[str, dict[str, Any], dict[str, Any]]] = []
+        self._dead: list[tuple[str, str]] = []
+        self._banked_subtasks: set[str] = set()
+
+    def _curate(self, record: dict[str, Any]) -> dict[str, Any]:
+        trajectory = record.get("trajectory", "")
+        if not isinstance(trajectory, str):
+            trajectory = json.dumps(trajectory, ensure_ascii=False)
+        memory = self.curator.curate_trajectory(trajectory, strict=True)
+        task_description = record.get("task_description") or memory.get("task_description")
+        if not task_description:
+            raise CurationError("No task_description in record or curated memory", "")
+        memory["task_description"] = task_description
+        return memory
+
+    def _handle(self, traj_id: str, record: dict[str, Any], future: Future[dict[str, Any]]) -> None:
+        try:
+            memory = future.result()
+        except CurationError as e:
+            self.stats["dead_lettered"] += 1
+            self._dead.append((traj_id, json.dumps({
+                "id": traj_id, "error": str(e), "raw": e.raw, "record": record
+            }, ensure_ascii=False)))
+            return
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"Error curating trajectory {traj_id}: {e}")
+            return
+        self._pending.append((traj_id, record, memory))
+
+    def flush(self) -> None:
+        """Adds the buffered memories to both banks, then checkpoints their IDs.
+
+        Subtasks go in first: a trajectory found in the task bank on resume has all
+        of its memories stored, and one found only in the subtask bank only needs
+        its task memory.
+        """
+        if self._pending:
+            memories = [
+                {**memory, "trajectory_id": traj_id} for traj_id, _, memory in self._pending
+            ]
+            subtasks = [
+                {**subtask, "trajectory_id": traj_id}
+                for traj_id, _, memory in self._pending
+                if traj_id not in self._banked_subtasks
+                for subtask in memory.get("subtasks", [])
+                if isinstance(subtask, dict) and subtask.get("description")
+            ]
+            if subtasks:
+                self.subtask_bank.add_memories(
+                    subtasks, [s["description"] for s in subtasks], show_progress=False
+                )
+            self.task_bank.add_memories(
+                memories, [m["task_description"] for m in memories], show_progress=False
+            )
+        # Dead letters first: an ID is only checkpointed once its outcome is on disk.
+        _append_lines(self.dead_letter_path, [line for _, line in self._dead])
+        _append_lines(
+            self.checkpoint_path,
+            [traj_id for traj_id, _, _ in self._pending]
+            + [f"{traj_id}\tdead" for traj_id, _ in self._dead]
+        )
+        self.stats["curated"] += len(self._pending)
+        self._pending, self._dead = [], []
+
+    def run(self, trajectories_path: str, show_progress: bool = True) -> dict[str, int]:
+        done = load_checkpoint(self.checkpoint_path)
+        # Batches that reached the banks but not the checkpoint before a crash.
+        done.update(dict.fromkeys(banked_trajectories(self.task_bank), "curated"))
+        self._banked_subtasks = banked_trajectories(self.subtask_bank)
+        in_flight: dict[Future[dict[str, Any]], tuple[str, dict[str, Any]]] = {}
+        seen: set[str] = set()
+
+        def drain(return_when: str) -> None:
+            finished, _ = wait(in_flight, return_when=return_when)
+            for future in finished:
+                self._handle(*in_flight.pop(future), future)
+            if len(self._pending) + len(self._dead) >= self.flush_every:
+                self.flush()
+                if show_progress:
+                    print(f"Curated {self.stats['curated']} trajectories "
+                          f"({self.stats['dead_lettered']} dead-lettered, "
+                          f"{self.stats['failed']} failed)")
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            for traj_id, record, is_retry in stream_trajectories(trajectories_path):
+                outcome = done.get(traj_id)
+                if traj_id in seen or outcome == "curated" or (outcome and not is_retry):
+                    self.stats["skipped"] += 1
+                    continue
+                seen.add(traj_id)
+                # Keep a bounded window in flight so huge files are never fully buffered.
+                if len(in_flight) >= 2 * self.max_concurrency:
+                    drain(FIRST_COMPLETED)
+                in_flight[pool.submit(self._curate, record)] = (traj_id, record)
+            if in_flight:
+                drain(ALL_COMPLETED)
+        self.flush()
+        self.task_bank.save(self.bank_paths[0])
+        self.subtask_bank.save(self.bank_paths[1])
+        return dict(self.stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Curate logged trajectories into memory banks")
+    parser.add_argument("trajectories", type=str, help="JSONL file of trajectories")
+    parser.add_argument("--task-bank", type=str, default="data/memory_bank/task_bank")
+    parser.add_argument("--subtask-bank", type=str, default="data/memory_bank/subtask_bank")
+    parser.add_argument("--model", type=str, default="gpt-4o")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--flush-every", type=int, default=256)
+    parser.add_argument("--checkpoint", type=str, default=None)
+    parser.add_argument("--dead-letter", type=str, default=None)
+
+    args = parser.parse_args()
+    batch = BatchCurator(
+        args.task_bank,
+        args.subtask_bank,
+        curator=MemoryCurator(args.model),
+        checkpoint_path=args.checkpoint,
+        dead_letter_path=args.dead_letter,
+        max_concurrency=args.max_concurrency,
+        flush_every=args.flush_every,
+    )
+    stats = batch.run(args.trajectories)
+    print(f"Done: {stats['curated']} curated, {stats['skipped']} already done, "
+          f"{stats['dead_lettered']} dead-lettered, {stats['failed']} failed")
@@ -0,0 +1,82 @@
+"""Fits retrieved memories into a planner prompt under a token budget.
+
+Memories arrive nearest first. `pack_memories` keeps them in that order until
+the budget is spent, skipping any memory whose plan mostly repeats one already
+kept, so the prompt stays bounded however large K or the bank grows.
+
+Tokens are counted with tiktoken when it and its encoding are available, and
+estimated at ~4 characters per token otherwise (e.g. offline, where tiktoken
+cannot download its encoding files).
+"""
+import re
+from collections.abc import Callable
+from functools import cache
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import tiktoken
+
+DEFAULT_ENCODING = "o200k_base"
+WORD_PATTERN = re.compile(r"\w+")
+
+
+@cache
+def _encoder(encoding: str) -> "tiktoken.Encoding | None":
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(encoding)
+    except Exception:  # not installed, or the encoding file cannot be fetched
+        return None
+
+
+def count_tokens(text: str, encoding: str = DEFAULT_ENCODING) -> int:
+    encoder = _encoder(encoding)
+    if encoder is None:
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def render_memory(memory: dict[str, Any]) -> str:
+    """Prompt text for a task memory, or for a subtask memory from the dynamic bank."""
+    if "task_description" in memory:
+        return f"Task: {memory.get('task_description')}\nPlan: {memory.get('high_level_plan')}"
+    return f"Subtask ({memory.get('agent', 'agent')}): {memory.get('description')}"
+
+
+def _plan_words(memory: dict[str, Any]) -> set[str]:
+    plan = memory.get("high_level_plan") or memory.get("description") or ""
+    return set(WORD_PATTERN.findall(str(plan).lower()))
+
+
+def pack_memories(
+    memories: list[dict[str, Any]],
+    token_budget: int | None,
+    render: Callable[[dict[str, Any]], str] = render_memory,
+    max_overlap: float = 0.8,
+    count: Callable[[str], int] = count_tokens
+) -> list[str]:
+    """Rendered memories, in relevance order, that fit in `token_budget` tokens.
+
+    A memory is skipped when the Jaccard overlap of its plan's words with an
+    already kept plan reaches `max_overlap`; one that would overflow the budget
+    is skipped too, leaving room for shorter memories further down.
+    """
+    packed: list[str] = []
+    kept_plans: list[set[str]] = []
+    remaining = token_budget
+    for memory in memories:
+        words = _plan_words(memory)
+        if words and any(
+            len(words & kept) / len(words | kept) >= max_overlap for kept in kept_plans
+        ):
+            continue
+        text = render(memory)
+        if remaining is not None:
+            tokens = count(text)
+            if tokens > remaining:
+                continue
+            remaining -= tokens
+        packed.append(text)
+        kept_plans.append(words)
+    return packed
@@ -1,11 +1,7 @@
 import json
-import os
 from typing import Any
 
-from dotenv import load_dotenv
-from openai import OpenAI
-
-load_dotenv()
+from ..llm_cache import cached_completion
 
 MEMORY_CURATION_PROMPT = (
     "From the following agent trajectory, generate memory "
@@ -44,34 +40,57 @@ MEMORY_CURATION_PROMPT = (
     "Follow JSON format exactly between <start> and <end>."
 )
 
+class CurationError(ValueError):
+    """The curator's response could not be parsed into a memory."""
+
+    def __init__(self, message: str, raw: str):
+        super().__init__(message)
+        self.raw = raw
+
+def parse_curated_memory(content: str) -> dict[str, Any]:
+    """Extracts the JSON memory between <start> and <end>, raising `CurationError`."""
+    if not content:
+        raise CurationError("Empty curator response", content)
+    start_tag = "<start>"
+    end_tag = "<end>"
+    start_idx = content.find(start_tag)
+    start_idx = 0 if start_idx == -1 else start_idx + len(start_tag)
+    end_idx = content.find(end_tag, start_idx)
+    json_str = content[start_idx:None if end_idx == -1 else end_idx].strip()
+    try:
+        memory = json.loads(json_str)
+    except json.JSONDecodeError as e:
+        raise CurationError(f"Invalid memory JSON: {e}", content) from e
+    if not isinstance(memory, dict):
+        raise CurationError("Curated memory is not a JSON object", content)
+    return memory
+
 class MemoryCurator:
     def __init__(self, model: str = "gpt-4o"):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.model = model
 
-    def curate_trajectory(self, trajectory: str) -> dict[str, Any]:
+    def curate_trajectory(self, trajectory: str, strict: bool = False) -> dict[str, Any]:
+        """Distills one trajectory into a memory.
+
+        With `strict=True` an unparseable response raises `CurationError` instead of
+        being printed and returned as `{}`.
+        """
         prompt = MEMORY_CURATION_PROMPT.format(full_trajectory=trajectory)
         
-        response = self.client.chat.completions.create(
+        content = cached_completion(
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
             temperature=0
         )
-        
-        content = response.choices[0].message.content
-        if content:
-            try:
-                # Extract content between <start> and <end>
-                start_tag = "<start>"
-                end_tag = "<end>"
-                start_idx = content.find(start_tag) + len(start_tag)
-                end_idx = content.find(end_tag)
-                json_str = content[start_idx:end_idx].strip()
-                return json.loads(json_str)
-            except Exception as e:
-                print(f"Error parsing curated memory: {e}")
-                print(f"Raw content: {content}")
+        try:
+            return parse_curated_memory(content)
+        except CurationError as e:
+            if strict:
+                raise
+            print(f"Error parsing curated memory: {e}")
+            print(f"Raw content: {content}")
         return {}
 
     def extract_subtasks(self, curated_memory: dict[str, Any]) -> list[dict[str, Any]]:
-        return curated_memory.get("subtasks", [])
+        subtasks: list[dict[str, Any]] = curated_memory.get("subtasks", [])
+        return subtasks
@@ -0,0 +1,233 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = "data/cache/embeddings.sqlite"
+# Disk hits buffer their last-used bumps and write them this many at a time.
+TOUCH_BATCH = 512
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache: in-memory LRU in front of a size-bounded sqlite store.
+
+    Entries are keyed by (model, dimension, sha256(text)), so the same text embedded
+    with a different model or output dimension never collides.
+    """
+
+    def __init__(
+        self,
+        path: str | None = DEFAULT_CACHE_PATH,
+        max_memory_entries: int = 10_000,
+        max_disk_bytes: int = 1 << 30
+    ):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._lru: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._touched: dict[str, float] = {}
+        self._disk_bytes = 0
+
+        self._db: sqlite3.Connection | None = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._disk_bytes = self._stored_bytes()
+
+    @staticmethod
+    def make_key(model: str, dimension: int, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{model}:{dimension}:{digest}"
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss counters; every hit is one embedding the API did not have to compute."""
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._lru),
+        }
+
+    def get_many(self, model: str, dimension: int, texts: list[str]) -> list[np.ndarray | None]:
+        keys = [self.make_key(model, dimension, t) for t in texts]
+        results: list[np.ndarray | None] = [None] * len(keys)
+        with self._lock:
+            disk_lookup: dict[str, list[int]] = {}
+            for i, key in enumerate(keys):
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    results[i] = vector
+                    self.memory_hits += 1
+                else:
+                    disk_lookup.setdefault(key, []).append(i)
+
+            if disk_lookup and self._db is not None:
+                found = self._read_disk(list(disk_lookup))
+                for key, vector in found.items():
+                    for i in disk_lookup.pop(key):
+                        results[i] = vector
+                        self.disk_hits += 1
+                    self._remember(key, vector)
+
+            self.misses += sum(len(idx) for idx in disk_lookup.values())
+        return results
+
+    def put_many(
+        self, model: str, dimension: int, texts: list[str], vectors: np.ndarray
+    ) -> None:
+        rows = []
+        now = time.time()
+        with self._lock:
+            for text, vector in zip(texts, vectors, strict=True):
+                key = self.make_key(model, dimension, text)
+                vector = np.asarray(vector, dtype="float32")
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes(), now))
+            if rows and self._db is not None:
+                self._disk_bytes += sum(len(blob) for _, blob, _ in rows) - self._replaced_bytes(
+                    [key for key, _, _ in rows]
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                    rows
+                )
+                self._write_touches()
+                self._db.commit()
+                self._enforce_disk_bound()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            self._touched.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+                self._disk_bytes = 0
+
+    def flush(self) -> None:
+        """Writes buffered last-used times, which otherwise ride along with the next put."""
+        with self._lock:
+            if self._db is not None and self._touched:
+                self._write_touches()
+                self._db.commit()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_memory_entries:
+            self._lru.popitem(last=False)
+
+    def _read_disk(self, keys: list[str]) -> dict[str, np.ndarray]:
+        assert self._db is not None
+        found: dict[str, np.ndarray] = {}
+        # Stay well below sqlite's bound-parameter limit.
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype="float32")
+        now = time.time()
+        self._touched.update((key, now) for key in found)
+        if len(self._touched) >= TOUCH_BATCH:
+            self._write_touches()
+            self._db.commit()
+        return found
+
+    def _write_touches(self) -> None:
+        """Adds the buffered last-used bumps to the open transaction."""
+        assert self._db is not None
+        if self._touched:
+            self._db.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(now, key) for key, now in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _stored_bytes(self) -> int:
+        assert self._db is not None
+        (size,) = self._db.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+        return int(size)
+
+    def _replaced_bytes(self, keys: list[str]) -> int:
+        """Bytes already stored under `keys`, which an INSERT OR REPLACE frees."""
+        assert self._db is not None
+        size = 0
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            (found,) = self._db.execute(
+                "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings "
+                f"WHERE key IN ({placeholders})",
+                chunk
+            ).fetchone()
+            size += found
+        return int(size)
+
+    def _enforce_disk_bound(self) -> None:
+        assert self._db is not None
+        # The running total misses rows written by other processes sharing the
+        # file, so it is only trusted to say when an exact recount is due.
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        size = self._disk_bytes = self._stored_bytes()
+        if size <= self.max_disk_bytes:
+            return
+        # Evict least-recently-used rows until we are back under 90% of the budget.
+        target = int(self.max_disk_bytes * 0.9)
+        rows = self._db.execute(
+            "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used ASC"
+        )
+        evict = []
+        for key, length in rows:
+            if size <= target:
+                break
+            evict.append((key,))
+            size -= length
+        self._db.executemany("DELETE FROM embeddings WHERE key = ?", evict)
+        self._db.commit()
+        self._disk_bytes = size
+
+
+_shared_cache: EmbeddingCache | None = None
+_shared_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide cache shared by every VectorStore.
+
+    The on-disk location can be overridden with `LEGOMEM_EMBEDDING_CACHE`; set it to
+    `off` to keep the cache in memory only.
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            path: str | None = os.getenv("LEGOMEM_EMBEDDING_CACHE", DEFAULT_CACHE_PATH)
+            if path in ("", "off"):
+                path = None
+            _shared_cache = EmbeddingCache(path)
+        return _shared_cache
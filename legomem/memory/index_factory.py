@@ -0,0 +1,103 @@
+from typing import Any
+
+import faiss
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq_fp16", "sq_int8", "pq")
+
+# Defaults per backend; anything passed in `index_params` overrides these.
+DEFAULT_INDEX_PARAMS: dict[str, dict[str, Any]] = {
+    "flat": {},
+    "ivf_flat": {"nlist": 1024},
+    "ivf_pq": {"nlist": 1024, "pq_m": 64, "pq_bits": 8},
+    "hnsw": {"hnsw_m": 32, "ef_construction": 200},
+    # Exhaustive scans over compressed codes: 2 bytes, 1 byte or pq_m * pq_bits / 8
+    # bytes per vector instead of 4 bytes per dimension.
+    "sq_fp16": {},
+    "sq_int8": {},
+    "pq": {"pq_m": 64, "pq_bits": 8},
+}
+
+
+def resolve_index_params(index_type: str, index_params: dict[str, Any] | None) -> dict[str, Any]:
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+    return {**DEFAULT_INDEX_PARAMS[index_type], **(index_params or {})}
+
+
+def build_index(
+    index_type: str, dimension: int, index_params: dict[str, Any] | None = None
+) -> faiss.Index:
+    """Builds an empty L2 index for the requested backend."""
+    params = resolve_index_params(index_type, index_params)
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dimension)
+    if index_type == "ivf_flat":
+        quantizer = faiss.IndexFlatL2(dimension)
+        return faiss.IndexIVFFlat(quantizer, dimension, params["nlist"], faiss.METRIC_L2)
+    if index_type == "ivf_pq":
+        quantizer = faiss.IndexFlatL2(dimension)
+        return faiss.IndexIVFPQ(
+            quantizer, dimension, params["nlist"], params["pq_m"], params["pq_bits"]
+        )
+    if index_type == "sq_fp16":
+        return faiss.IndexScalarQuantizer(
+            dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2
+        )
+    if index_type == "sq_int8":
+        return faiss.IndexScalarQuantizer(
+            dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2
+        )
+    if index_type == "pq":
+        return faiss.IndexPQ(dimension, params["pq_m"], params["pq_bits"])
+    index = faiss.IndexHNSWFlat(dimension, params["hnsw_m"])
+    index.hnsw.efConstruction = params["ef_construction"]
+    return index
+
+
+def default_train_size(index_type: str, index_params: dict[str, Any] | None = None) -> int:
+    """How many vectors to buffer before training (0 for backends that need no training).
+
+    FAISS warns below ~39 training points per IVF centroid or PQ codeword, so that
+    is the default; int8 scalar quantization only learns per-dimension ranges.
+    """
+    params = resolve_index_params(index_type, index_params)
+    if index_type in ("ivf_flat", "ivf_pq"):
+        return 39 * int(params["nlist"])
+    if index_type == "pq":
+        return int(39 * 2 ** params["pq_bits"])
+    if index_type == "sq_int8":
+        return 1000
+    return 0
+
+
+def search_parameters(
+    index: faiss.Index,
+    nprobe: int | None = None,
+    ef_search: int | None = None,
+    selector: faiss.IDSelector | None = None
+) -> faiss.SearchParameters | None:
+    """Per-query tuning knobs, so concurrent searches never mutate shared index state.
+
+    `selector` restricts the ids a search may return; check `supports_selector` first.
+    """
+    if isinstance(index, faiss.IndexIVF):
+        if nprobe is None and selector is None:
+            return None
+        return faiss.SearchParametersIVF(  # type: ignore[call-arg]
+            nprobe=index.nprobe if nprobe is None else nprobe, sel=selector
+        )
+    if isinstance(index, faiss.IndexHNSW):
+        if ef_search is None and selector is None:
+            return None
+        params: faiss.SearchParameters = faiss.SearchParametersHNSW(  # type: ignore[attr-defined]
+            efSearch=index.hnsw.efSearch if ef_search is None else ef_search, sel=selector
+        )
+        return params
+    if selector is not None:
+        return faiss.SearchParameters(sel=selector)  # type: ignore[call-arg]
+    return None
+
+
+def supports_selector(index: faiss.Index) -> bool:
+    # IndexPQ rejects search parameters altogether.
+    return not isinstance(index, faiss.IndexPQ)
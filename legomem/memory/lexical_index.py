@@ -0,0 +1,163 @@
+"""In-process BM25 inverted index kept alongside a `VectorStore`'s FAISS index.
+
+Postings from the last saved snapshot are held as CSR arrays (term -> slice of doc
+ids and term frequencies); documents added since then go into per-term lists, so
+adds are incremental and a save folds them back into the arrays.
+"""
+import re
+from collections.abc import Iterable
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of",
+    "on", "or", "that", "the", "this", "to", "was", "what", "which", "who", "with",
+})
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens; identifiers like `B-99` are kept whole and also split."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = re.split(r"[-_.]", token)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._terms: dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype="int64")
+        self._doc_ids = np.empty(0, dtype="int64")
+        self._tfs = np.empty(0, dtype="float32")
+        self._added: dict[str, tuple[list[int], list[int]]] = {}
+        self._lengths = np.empty(0, dtype="float32")
+        self._added_lengths: list[int] = []
+        self._added_lengths_array: np.ndarray | None = None
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths) + len(self._added_lengths)
+
+    def add(self, ids: Iterable[int], texts: list[str | None]) -> None:
+        """Indexes `texts` under store ids `ids`, which must continue from `len(self)`."""
+        for doc_id, text in zip(ids, texts, strict=True):
+            doc_id = int(doc_id)
+            if doc_id != len(self):
+                raise ValueError(f"Expected document id {len(self)}, got {doc_id}")
+            tokens = tokenize(text) if text else []
+            counts: dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings = self._added.setdefault(token, ([], []))
+                postings[0].append(doc_id)
+                postings[1].append(count)
+            self._added_lengths.append(len(tokens))
+            self._total_length += len(tokens)
+        self._added_lengths_array = None
+
+    def postings(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        """Doc ids and term frequencies for one term."""
+        ids, tfs = self._doc_ids[:0], self._tfs[:0]
+        row = self._terms.get(term)
+        if row is not None:
+            start, end = self._offsets[row], self._offsets[row + 1]
+            ids, tfs = self._doc_ids[start:end], self._tfs[start:end]
+        added = self._added.get(term)
+        if added:
+            ids = np.concatenate([ids, np.asarray(added[0], dtype="int64")])
+            tfs = np.concatenate([tfs, np.asarray(added[1], dtype="float32")])
+        return ids, tfs
+
+    def _doc_lengths(self, ids: np.ndarray) -> np.ndarray:
+        if self._added_lengths_array is None:
+            self._added_lengths_array = np.asarray(self._added_lengths, dtype="float32")
+        saved = len(self._lengths)
+        lengths = np.empty(len(ids), dtype="float32")
+        in_saved = ids < saved
+        lengths[in_saved] = self._lengths[ids[in_saved]]
+        lengths[~in_saved] = self._added_lengths_array[ids[~in_saved] - saved]
+        return lengths
+
+    def search(
+        self, query: str, k: int, allowed: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Top-`k` (scores, ids) by BM25, best first; `allowed` restricts the doc ids."""
+        n = len(self)
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not n or not terms:
+            return np.empty(0, dtype="float32"), np.empty(0, dtype="int64")
+        avg_length = self._total_length / n or 1.0
+        all_ids, all_scores = [], []
+        for term in terms:
+            ids, tfs = self.postings(term)
+            if not len(ids):
+                continue
+            idf = np.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self._doc_lengths(ids) / avg_length)
+            all_ids.append(ids)
+            all_scores.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+        if not all_ids:
+            return np.empty(0, dtype="float32"), np.empty(0, dtype="int64")
+        ids = np.concatenate(all_ids)
+        unique_ids, inverse = np.unique(ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(all_scores)).astype("float32")
+        if allowed is not None:
+            keep = np.isin(unique_ids, allowed)
+            unique_ids, scores = unique_ids[keep], scores[keep]
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k else np.empty(0, dtype="int64")
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return scores[top], unique_ids[top]
+
+    def save(self, path: str) -> None:
+        """Writes the index, including everything added since the last save, to `path`."""
+        terms = sorted(set(self._terms) | set(self._added))
+        ids_per_term, tfs_per_term = [], []
+        for term in terms:
+            ids, tfs = self.postings(term)
+            ids_per_term.append(ids)
+            tfs_per_term.append(tfs)
+        offsets = np.zeros(len(terms) + 1, dtype="int64")
+        np.cumsum([len(ids) for ids in ids_per_term], out=offsets[1:])
+        lengths = np.concatenate([self._lengths, np.asarray(self._added_lengths, dtype="float32")])
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                terms=np.array(terms, dtype=str),
+                offsets=offsets,
+                doc_ids=np.concatenate(ids_per_term) if terms else self._doc_ids[:0],
+                tfs=np.concatenate(tfs_per_term) if terms else self._tfs[:0],
+                lengths=lengths,
+                params=np.array([self.k1, self.b]),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path) as data:
+            k1, b = data["params"].tolist()
+            index = cls(k1=k1, b=b)
+            index._terms = {term: row for row, term in enumerate(data["terms"].tolist())}
+            index._offsets = data["offsets"]
+            index._doc_ids = data["doc_ids"]
+            index._tfs = data["tfs"]
+            index._lengths = data["lengths"]
+        index._total_length = int(index._lengths.sum())
+        return index
+
+
+def reciprocal_rank_fusion(rankings: list[np.ndarray], k: int = 60) -> np.ndarray:
+    """Fuses ranked id lists by summing 1 / (k + rank); returns ids, best first."""
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking.tolist()):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return np.array(sorted(scores, key=scores.__getitem__, reverse=True), dtype="int64")
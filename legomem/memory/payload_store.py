@@ -0,0 +1,89 @@
+import json
+import mmap
+import os
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, overload
+
+import numpy as np
+
+
+def write_payloads(path: str, memories: Iterable[dict[str, Any]]) -> None:
+    """Writes `{path}.jsonl` plus `{path}.offsets.npy`, the byte offset of every record.
+
+    Record i lives at bytes [offsets[i], offsets[i + 1]), so a reader can decode a
+    single memory without parsing the rest of the file.
+    """
+    # Written beside the target and renamed, so readers that still have the old
+    # files mapped keep a valid view.
+    offsets = [0]
+    with open(f"{path}.jsonl.tmp", "wb") as f:
+        for memory in memories:
+            f.write(json.dumps(memory).encode("utf-8") + b"\n")
+            offsets.append(f.tell())
+    with open(f"{path}.offsets.npy.tmp", "wb") as f:
+        np.save(f, np.array(offsets, dtype="int64"))
+    os.replace(f"{path}.jsonl.tmp", f"{path}.jsonl")
+    os.replace(f"{path}.offsets.npy.tmp", f"{path}.offsets.npy")
+
+
+def read_payloads(path: str) -> list[dict[str, Any]]:
+    with open(f"{path}.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def payloads_exist(path: str) -> bool:
+    return os.path.exists(f"{path}.jsonl") and os.path.exists(f"{path}.offsets.npy")
+
+
+class PayloadFile(Sequence[dict[str, Any]]):
+    """Read-only, memory-mapped view over a payload file that decodes records on access.
+
+    The mapping is backed by the OS page cache, so several processes opening the same
+    bank share one copy. Memories appended after opening are held in memory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offsets = np.load(f"{path}.offsets.npy", mmap_mode="r")
+        self._file = open(f"{path}.jsonl", "rb")  # noqa: SIM115 - lives as long as the mapping
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._stored = len(self._offsets) - 1
+        self._appended: list[dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return self._stored + len(self._appended)
+
+    @overload
+    def __getitem__(self, index: int) -> dict[str, Any]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[dict[str, Any]]: ...
+
+    def __getitem__(self, index: int | slice) -> dict[str, Any] | list[dict[str, Any]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"memory index {index} out of range")
+        if index >= self._stored:
+            return self._appended[index - self._stored]
+        start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+        memory: dict[str, Any] = json.loads(self._data[start:end])
+        return memory
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, memory: dict[str, Any]) -> None:
+        self._appended.append(memory)
+
+    def extend(self, memories: Iterable[dict[str, Any]]) -> None:
+        self._appended.extend(memories)
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
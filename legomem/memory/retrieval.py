@@ -1,12 +1,13 @@
-import os
-from typing import Any
+import asyncio
+from typing import TYPE_CHECKING, Any
 
-from dotenv import load_dotenv
-from openai import OpenAI
+import numpy as np
 
-from .vector_store import VectorStore
+from ..llm_cache import acached_completion, cached_completion
+from ..monitoring.tracing import traced
 
-load_dotenv()
+if TYPE_CHECKING:
+    from .vector_store import VectorStore
 
 QUERY_REWRITE_PROMPT = """Based on the following similar task examples, 
 break down the new task into a step-by-step plan.
@@ -27,46 +28,196 @@ Format your response as a simple numbered list enclosed within ¡start¿ and ¡e
 """
 
 class MemoryRetriever:
-    def __init__(self, task_bank: VectorStore, subtask_bank: VectorStore | None = None):
-        self.task_bank = task_bank
-        self.subtask_bank = subtask_bank
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-    def retrieve_vanilla(self, query: str, k: int = 5) -> list[dict[str, Any]]:
-        """Retrieves full-task memories at inference time."""
-        results = self.task_bank.search(query, k=k)
-        print(f"DEBUG: Retriever found {len(results)} task memories for query: {query}")
-        return results
-
-    def retrieve_dynamic(self, subtask_description: str, k: int = 3) -> list[dict[str, Any]]:
-        """Performs just-in-time, subtask-level retrieval."""
+    def __init__(
+        self,
+        task_bank: "VectorStore | str",
+        subtask_bank: "VectorStore | str | None" = None,
+        max_distance: float | None = None
+    ):
+        # Banks given as paths are opened as shared stores on first retrieval.
+        self._task_bank = task_bank
+        self._subtask_bank = subtask_bank
+        # Hits farther than this (squared L2) are dropped, so weak matches never
+        # reach a prompt and K becomes an upper bound rather than a fixed count.
+        self.max_distance = max_distance
+
+    @property
+    def task_bank(self) -> "VectorStore":
+        if isinstance(self._task_bank, str):
+            from .vector_store import shared_bank
+
+            self._task_bank = shared_bank(self._task_bank)
+        return self._task_bank
+
+    @property
+    def subtask_bank(self) -> "VectorStore | None":
+        if isinstance(self._subtask_bank, str):
+            from .vector_store import shared_bank
+
+            self._subtask_bank = shared_bank(self._subtask_bank)
+        return self._subtask_bank
+
+    async def _atask_bank(self) -> "VectorStore":
+        """`task_bank`, opened in a worker thread on first use so the event loop never waits."""
+        if isinstance(self._task_bank, str):
+            return await asyncio.to_thread(lambda: self.task_bank)
+        return self._task_bank
+
+    async def _asubtask_bank(self) -> "VectorStore | None":
+        if isinstance(self._subtask_bank, str):
+            return await asyncio.to_thread(lambda: self.subtask_bank)
+        return self._subtask_bank
+
+    def _within(
+        self, hits: list[tuple[dict[str, Any], float]], max_distance: float | None
+    ) -> list[tuple[dict[str, Any], float]]:
+        if max_distance is None:
+            max_distance = self.max_distance
+        if max_distance is None:
+            return hits
+        return [(memory, distance) for memory, distance in hits if distance <= max_distance]
+
+    def embed_task(self, task_description: str) -> np.ndarray:
+        """The task-bank embedding of a description (served from the embedding cache)."""
+        return self.task_bank._get_embedding(task_description)
+
+    async def aembed_task(self, task_description: str) -> np.ndarray:
+        bank = await self._atask_bank()
+        embedding: np.ndarray = (await bank._aget_embeddings([task_description]))[0]
+        return embedding
+
+    @traced("retriever.vanilla")
+    def retrieve_vanilla(
+        self, query: str, k: int = 5, max_distance: float | None = None
+    ) -> list[dict[str, Any]]:
+        """Retrieves full-task memories at inference time.
+
+        At most `k` memories are returned; `max_distance` overrides the retriever's
+        threshold for this call.
+        """
+        hits = self._within(self.task_bank.search(query, k=k, with_scores=True), max_distance)
+        print(f"DEBUG: Retriever found {len(hits)} task memories for query: {query}")
+        return [memory for memory, _ in hits]
+
+    @traced("retriever.vanilla")
+    async def aretrieve_vanilla(
+        self, query: str, k: int = 5, max_distance: float | None = None
+    ) -> list[dict[str, Any]]:
+        bank = await self._atask_bank()
+        hits = self._within(await bank.asearch(query, k=k, with_scores=True), max_distance)
+        return [memory for memory, _ in hits]
+
+    @traced("retriever.dynamic")
+    def retrieve_dynamic(
+        self,
+        subtask_description: str,
+        k: int = 3,
+        agent: str | None = None,
+        max_distance: float | None = None
+    ) -> list[dict[str, Any]]:
+        """Performs just-in-time, subtask-level retrieval.
+
+        If `agent` is given, only that role's partition of the subtask bank is searched.
+        """
         if not self.subtask_bank:
             return []
-        return self.subtask_bank.search(subtask_description, k=k)
+        hits = self.subtask_bank.search(
+            subtask_description, k=k, partition=agent, with_scores=True
+        )
+        return [memory for memory, _ in self._within(hits, max_distance)]
+
+    @traced("retriever.dynamic")
+    async def aretrieve_dynamic(
+        self,
+        subtask_description: str,
+        k: int = 3,
+        agent: str | None = None,
+        max_distance: float | None = None
+    ) -> list[dict[str, Any]]:
+        bank = await self._asubtask_bank()
+        if not bank:
+            return []
+        hits = await bank.asearch(subtask_description, k=k, partition=agent, with_scores=True)
+        return [memory for memory, _ in self._within(hits, max_distance)]
+
+    @traced("retriever.dynamic")
+    def retrieve_dynamic_many(
+        self,
+        subtask_descriptions: list[str],
+        k: int = 3,
+        agent: str | None = None,
+        max_distance: float | None = None
+    ) -> list[list[tuple[dict[str, Any], float]]]:
+        """Subtask-level retrieval for many subtasks in one round trip.
 
+        Returns, per subtask, (memory, distance) pairs ordered nearest first.
+        """
+        if not self.subtask_bank:
+            return [[] for _ in subtask_descriptions]
+        return [
+            self._within(hits, max_distance)
+            for hits in self.subtask_bank.search_many(subtask_descriptions, k=k, partition=agent)
+        ]
+
+    @traced("retriever.dynamic")
+    async def aretrieve_dynamic_many(
+        self,
+        subtask_descriptions: list[str],
+        k: int = 3,
+        agent: str | None = None,
+        max_distance: float | None = None
+    ) -> list[list[tuple[dict[str, Any], float]]]:
+        bank = await self._asubtask_bank()
+        if not bank:
+            return [[] for _ in subtask_descriptions]
+        return [
+            self._within(hits, max_distance)
+            for hits in await bank.asearch_many(subtask_descriptions, k=k, partition=agent)
+        ]
+
+    @traced("retriever.rewrite_query")
     def rewrite_query(
         self, 
         task_description: str, 
         similar_tasks: list[dict[str, Any]]
     ) -> list[str]:
         """Uses an LLM to rewrite the task into subtasks before execution."""
+        content = cached_completion(
+            model="gpt-4o",
+            messages=self._rewrite_messages(task_description, similar_tasks),
+            temperature=0
+        )
+        return self._parse_steps(content)
+
+    @traced("retriever.rewrite_query")
+    async def arewrite_query(
+        self,
+        task_description: str,
+        similar_tasks: list[dict[str, Any]]
+    ) -> list[str]:
+        content = await acached_completion(
+            model="gpt-4o",
+            messages=self._rewrite_messages(task_description, similar_tasks),
+            temperature=0
+        )
+        return self._parse_steps(content)
+
+    @staticmethod
+    def _rewrite_messages(
+        task_description: str, similar_tasks: list[dict[str, Any]]
+    ) -> list[dict[str, str]]:
         memory_context = "\n\n".join([
             f"Task: {m.get('task_description', 'N/A')}\nPlan: {m.get('high_level_plan', 'N/A')}"
             for m in similar_tasks
         ])
-        
         prompt = QUERY_REWRITE_PROMPT.format(
             memory_context=memory_context,
             task_description=task_description
         )
-        
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0
-        )
-        
-        content = response.choices[0].message.content
+        return [{"role": "user", "content": prompt}]
+
+    @staticmethod
+    def _parse_steps(content: str) -> list[str]:
         if content:
             try:
                 start_tag = "¡start¿"
@@ -0,0 +1,388 @@
+"""Client for a bank split across `BankServer` processes.
+
+`ShardedVectorStore` offers `VectorStore`'s add, search, update and delete
+interface. Queries are embedded once, locally (through the usual provider and
+embedding cache), then scattered to every shard in parallel. Each shard's top-k
+is merged by L2 distance. New memories are routed to a shard by a hash of their
+content, so re-adding the same memory always lands on the same shard.
+
+Memory ids are bank-wide: shard `s` of `n` reports its own id `i` as `i * n + s`,
+so `update`, `delete` and `record_outcome` go straight to the owning shard.
+
+Hybrid search fuses the shards' merged BM25 hits with the merged dense hits, as a
+local bank does. Each shard scores BM25 against its own statistics, so lexical
+scores are only comparable across shards of similar content.
+"""
+import asyncio
+import json
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Literal, overload
+
+import httpx
+import numpy as np
+
+from ..clients import get_bank_http_client
+from ..providers import Provider
+from .bank_server import encode_vectors
+from .embedding_cache import EmbeddingCache, get_embedding_cache
+from .lexical_index import reciprocal_rank_fusion
+from .vector_store import EmbeddingMixin
+
+
+class BankServerError(RuntimeError):
+    """A shard rejected a request or could not be reached."""
+
+
+class ShardedVectorStore(EmbeddingMixin):
+    def __init__(
+        self,
+        shard_urls: list[str],
+        bank: str,
+        dimension: int = 3072,
+        provider: Provider | None = None,
+        cache: EmbeddingCache | None = None,
+        http_client: httpx.Client | None = None
+    ):
+        if not shard_urls:
+            raise ValueError("ShardedVectorStore needs at least one shard URL")
+        self.shard_urls = [url.rstrip("/") for url in shard_urls]
+        self.bank = bank
+        self.dimension = dimension
+        self.model = "text-embedding-3-large"
+        self._provider = provider
+        self.cache = cache if cache is not None else get_embedding_cache()
+        self._http = http_client or get_bank_http_client()
+        self._pool = ThreadPoolExecutor(max_workers=len(self.shard_urls))
+        self._lexical: bool | None = None
+
+    def _request(self, url: str, method: str, path: str, body: dict[str, Any] | None = None) -> Any:
+        try:
+            response = self._http.request(method, f"{url}{path}", json=body)
+        except httpx.HTTPError as e:
+            raise BankServerError(f"Shard {url} unreachable: {e}") from e
+        if response.status_code != 200:
+            error = response.json().get("error", response.text)
+            raise BankServerError(f"Shard {url} returned {response.status_code}: {error}")
+        return response.json()
+
+    def _scatter(
+        self, method: str, path: str, bodies: dict[int, dict[str, Any] | None]
+    ) -> dict[int, Any]:
+        """Sends one request per shard index in `bodies`, concurrently; results in that order."""
+        futures = {
+            shard: self._pool.submit(self._request, self.shard_urls[shard], method, path, body)
+            for shard, body in bodies.items()
+        }
+        return {shard: future.result() for shard, future in futures.items()}
+
+    def _all_shards(self, body: dict[str, Any] | None = None) -> dict[int, dict[str, Any] | None]:
+        return dict.fromkeys(range(len(self.shard_urls)), body)
+
+    def _stats(self) -> list[dict[str, Any]]:
+        stats = self._scatter("GET", "/banks", self._all_shards())
+        return [s[self.bank] for s in stats.values() if self.bank in s]
+
+    @property
+    def ntotal(self) -> int:
+        return sum(s["ntotal"] for s in self._stats())
+
+    @property
+    def lexical(self) -> bool:
+        """Whether every shard keeps a BM25 index, making hybrid search the default."""
+        if self._lexical is None:
+            stats = self._stats()
+            self._lexical = len(stats) == len(self.shard_urls) and all(
+                s.get("lexical") for s in stats
+            )
+        return self._lexical
+
+    def shard_for(self, content: dict[str, Any]) -> int:
+        key = json.dumps(content, sort_keys=True, default=str).encode("utf-8")
+        return zlib.crc32(key) % len(self.shard_urls)
+
+    def _global_id(self, shard: int, memory_id: int) -> int:
+        return memory_id * len(self.shard_urls) + shard
+
+    def _by_shard(self, ids: list[int]) -> dict[int, list[int]]:
+        """Groups bank-wide ids into each owning shard's own ids."""
+        grouped: dict[int, list[int]] = {}
+        for memory_id in ids:
+            local, shard = divmod(int(memory_id), len(self.shard_urls))
+            grouped.setdefault(shard, []).append(local)
+        return grouped
+
+    def _globalize(self, shard: int, memory: dict[str, Any]) -> dict[str, Any]:
+        if "memory_id" not in memory:
+            return memory
+        return {**memory, "memory_id": self._global_id(shard, memory["memory_id"])}
+
+    def add_vectors(self, contents: list[dict[str, Any]], vectors: np.ndarray) -> list[int]:
+        """Routes each memory to its shard; returns their bank-wide ids."""
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        if len(contents) != len(vectors):
+            raise ValueError(f"Got {len(contents)} memories but {len(vectors)} vectors")
+        by_shard: dict[int, list[int]] = {}
+        for i, content in enumerate(contents):
+            by_shard.setdefault(self.shard_for(content), []).append(i)
+        replies = self._scatter("POST", f"/banks/{self.bank}/add", {
+            shard: {
+                "contents": [contents[i] for i in rows],
+                "vectors": encode_vectors(vectors[rows]),
+            }
+            for shard, rows in by_shard.items()
+        })
+        ids = [0] * len(contents)
+        for shard, rows in by_shard.items():
+            for row, memory_id in zip(rows, replies[shard]["ids"], strict=True):
+                ids[row] = self._global_id(shard, memory_id)
+        return ids
+
+    def update(
+        self,
+        memory_id: int,
+        content: dict[str, Any],
+        text_to_embed: str | None = None,
+        vector: np.ndarray | None = None
+    ) -> None:
+        """Replaces a memory's payload on its shard, as `VectorStore.update` does."""
+        if vector is None and text_to_embed is not None:
+            vector = self._get_embedding(text_to_embed)
+        ((shard, (local,)),) = self._by_shard([memory_id]).items()
+        body: dict[str, Any] = {"id": local, "content": content}
+        if vector is not None:
+            body["vectors"] = encode_vectors(np.asarray(vector)[None, :])
+        self._scatter("POST", f"/banks/{self.bank}/update", {shard: body})
+
+    def delete(self, ids: list[int]) -> int:
+        """Deletes memories by bank-wide id; returns how many were found."""
+        replies = self._scatter("POST", f"/banks/{self.bank}/delete", {
+            shard: {"ids": local} for shard, local in self._by_shard(ids).items()
+        })
+        return sum(reply["deleted"] for reply in replies.values())
+
+    def record_outcome(self, ids: list[int], success: bool) -> None:
+        """Credits memories on their shards with the outcome of a task."""
+        self._scatter("POST", f"/banks/{self.bank}/record_outcome", {
+            shard: {"ids": local, "success": success}
+            for shard, local in self._by_shard(ids).items()
+        })
+
+    def search_with_distances(
+        self,
+        vectors: np.ndarray,
+        k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        partition: str | None = None
+    ) -> list[list[tuple[dict[str, Any], float]]]:
+        """Per query, the global top-`k` (memory, L2 distance) pairs across all shards."""
+        body = {
+            "vectors": encode_vectors(vectors),
+            "k": k,
+            "nprobe": nprobe,
+            "ef_search": ef_search,
+            "partition": partition,
+        }
+        replies = self._scatter("POST", f"/banks/{self.bank}/search", self._all_shards(body))
+        merged = []
+        for q in range(len(vectors)):
+            hits = [
+                (self._globalize(shard, memory), distance)
+                for shard, reply in replies.items()
+                for distance, memory in reply["results"][q]
+            ]
+            hits.sort(key=lambda hit: hit[1])
+            merged.append(hits[:k])
+        return merged
+
+    def search_lexical_memories(
+        self, query: str, k: int = 5, partition: str | None = None
+    ) -> list[tuple[dict[str, Any], float]]:
+        """The top-`k` (memory, BM25 score) pairs across all shards, best first."""
+        body = {"query": query, "k": k, "partition": partition}
+        replies = self._scatter("POST", f"/banks/{self.bank}/lexical", self._all_shards(body))
+        hits = [
+            (self._globalize(shard, memory), score)
+            for shard, reply in replies.items()
+            for score, memory in reply["results"]
+        ]
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return hits[:k]
+
+    def _lexical_candidates(
+        self, query: str, k: int, partition: str | None, lexical_margin: float | None
+    ) -> tuple[list[tuple[dict[str, Any], float]], bool]:
+        """Merged BM25 hits, and whether they settle the search without embedding."""
+        hits = self.search_lexical_memories(query, 2 * k, partition=partition)
+        if lexical_margin is None or len(hits) < k:
+            return hits, False
+        runner_up = hits[1][1] if len(hits) > 1 else 0.0
+        return hits, hits[0][1] > 0 and hits[0][1] >= lexical_margin * runner_up
+
+    def _search_hits(
+        self,
+        k: int,
+        nprobe: int | None,
+        ef_search: int | None,
+        partition: str | None,
+        lexical: list[tuple[dict[str, Any], float]] | None,
+        vector: np.ndarray | None
+    ) -> list[tuple[dict[str, Any], float]]:
+        """Dense hits for `vector`, fused with the `lexical` hits of a hybrid search.
+
+        Without `vector` the lexical hits were decisive and are returned alone;
+        as in `VectorStore.search`, hits found only by BM25 report distance 0.0.
+        """
+        if vector is None:
+            return [(memory, 0.0) for memory, _ in (lexical or [])[:k]]
+        dense = self.search_with_distances(
+            vector, 2 * k if lexical is not None else k, nprobe, ef_search, partition
+        )[0]
+        if lexical is None:
+            return dense
+        memories = {m["memory_id"]: m for m, _ in lexical} | {m["memory_id"]: m for m, _ in dense}
+        distances = {memory["memory_id"]: distance for memory, distance in dense}
+        ids = reciprocal_rank_fusion([
+            np.array([m["memory_id"] for m, _ in dense], dtype="int64"),
+            np.array([m["memory_id"] for m, _ in lexical], dtype="int64"),
+        ])[:k]
+        return [(memories[i], distances.get(i, 0.0)) for i in ids.tolist()]
+
+    @overload
+    def search(
+        self,
+        query: str,
+        k: int = ...,
+        nprobe: int | None = ...,
+        ef_search: int | None = ...,
+        partition: str | None = ...,
+        hybrid: bool | None = ...,
+        lexical_margin: float | None = ...,
+        with_scores: Literal[False] = ...
+    ) -> list[dict[str, Any]]: ...
+
+    @overload
+    def search(
+        self,
+        query: str,
+        k: int = ...,
+        nprobe: int | None = ...,
+        ef_search: int | None = ...,
+        partition: str | None = ...,
+        hybrid: bool | None = ...,
+        lexical_margin: float | None = ...,
+        *,
+        with_scores: Literal[True]
+    ) -> list[tuple[dict[str, Any], float]]: ...
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        partition: str | None = None,
+        hybrid: bool | None = None,
+        lexical_margin: float | None = 2.0,
+        with_scores: bool = False
+    ) -> list[dict[str, Any]] | list[tuple[dict[str, Any], float]]:
+        """Top-`k` memories across all shards; see `VectorStore.search`."""
+        if hybrid is None:
+            hybrid = self.lexical
+        lexical, decisive = None, False
+        if hybrid:
+            lexical, decisive = self._lexical_candidates(query, k, partition, lexical_margin)
+        vector = None if decisive else self._get_embedding(query)[None, :]
+        hits = self._search_hits(k, nprobe, ef_search, partition, lexical, vector)
+        if with_scores:
+            return hits
+        return [memory for memory, _ in hits]
+
+    @overload
+    async def asearch(
+        self,
+        query: str,
+        k: int = ...,
+        nprobe: int | None = ...,
+        ef_search: int | None = ...,
+        partition: str | None = ...,
+        hybrid: bool | None = ...,
+        lexical_margin: float | None = ...,
+        with_scores: Literal[False] = ...
+    ) -> list[dict[str, Any]]: ...
+
+    @overload
+    async def asearch(
+        self,
+        query: str,
+        k: int = ...,
+        nprobe: int | None = ...,
+        ef_search: int | None = ...,
+        partition: str | None = ...,
+        hybrid: bool | None = ...,
+        lexical_margin: float | None = ...,
+        *,
+        with_scores: Literal[True]
+    ) -> list[tuple[dict[str, Any], float]]: ...
+
+    async def asearch(
+        self,
+        query: str,
+        k: int = 5,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        partition: str | None = None,
+        hybrid: bool | None = None,
+        lexical_margin: float | None = 2.0,
+        with_scores: bool = False
+    ) -> list[dict[str, Any]] | list[tuple[dict[str, Any], float]]:
+        if hybrid is None:
+            hybrid = await asyncio.to_thread(lambda: self.lexical)
+        lexical, decisive = None, False
+        if hybrid:
+            lexical, decisive = await asyncio.to_thread(
+                self._lexical_candidates, query, k, partition, lexical_margin
+            )
+        vector = None if decisive else await self._aget_embeddings([query])
+        hits = await asyncio.to_thread(
+            self._search_hits, k, nprobe, ef_search, partition, lexical, vector
+        )
+        if with_scores:
+            return hits
+        return [memory for memory, _ in hits]
+
+    def search_many(
+        self,
+        queries: list[str],
+        k: int = 5,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        partition: str | None = None
+    ) -> list[list[tuple[dict[str, Any], float]]]:
+        if not queries:
+            return []
+        vectors = self._get_embeddings(queries)
+        return self.search_with_distances(vectors, k, nprobe, ef_search, partition)
+
+    async def asearch_many(
+        self,
+        queries: list[str],
+        k: int = 5,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        partition: str | None = None
+    ) -> list[list[tuple[dict[str, Any], float]]]:
+        if not queries:
+            return []
+        vectors = await self._aget_embeddings(queries)
+        return await asyncio.to_thread(
+            self.search_with_distances, vectors, k, nprobe, ef_search, partition
+        )
+
+    def save(self) -> None:
+        """Asks every shard to snapshot its part of the bank."""
+        self._scatter("POST", f"/banks/{self.bank}/save", self._all_shards())
+
+    def close(self) -> None:
+        self._pool.shutdown()
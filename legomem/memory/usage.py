@@ -0,0 +1,246 @@
+"""Per-memory bookkeeping kept alongside a `VectorStore`'s rows.
+
+Row `i` of every column describes the memory at store position `i`: its stable
+id (which survives compaction and updates, unlike the position), whether it is
+still live, how often searches returned it and when last, and how the tasks it
+was retrieved for turned out. Columns grow geometrically, so appending one
+memory at a time stays amortized O(1).
+
+Read-only (memory-mapped) banks cannot write a snapshot, so they also append
+their hits and outcomes to a `UsageLog`, which the bank's writer folds in.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Any
+
+import numpy as np
+
+EVICTION_POLICIES = ("lru", "lfu", "success")
+# Buffered log records before a `UsageLog` appends them to its file.
+USAGE_LOG_FLUSH = 1000
+_COLUMNS = {
+    "ids": "int64",
+    "live": "bool",
+    "hits": "int64",
+    "last_used": "float64",
+    "successes": "int64",
+    "failures": "int64",
+}
+
+
+class MemoryUsage:
+    def __init__(self) -> None:
+        self._size = 0
+        self._columns = {name: np.empty(0, dtype=dtype) for name, dtype in _COLUMNS.items()}
+        self._lock = threading.Lock()
+        self.n_deleted = 0
+        # Live id -> position, built on the first lookup and kept current after.
+        self._positions: dict[int, int] | None = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def column(self, name: str) -> np.ndarray:
+        return self._columns[name][:self._size]
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.column("ids")
+
+    @property
+    def live(self) -> np.ndarray:
+        return self.column("live")
+
+    def append(self, ids: np.ndarray, now: float | None = None) -> None:
+        """Adds rows for newly stored memories; they count as used when added."""
+        ids = np.asarray(ids, dtype="int64")
+        with self._lock:
+            end = self._size + len(ids)
+            if end > len(self._columns["ids"]):
+                capacity = max(end, 2 * len(self._columns["ids"]), 1024)
+                for name, values in self._columns.items():
+                    grown = np.zeros(capacity, dtype=values.dtype)
+                    grown[:self._size] = values[:self._size]
+                    self._columns[name] = grown
+            rows = slice(self._size, end)
+            self._columns["ids"][rows] = ids
+            self._columns["live"][rows] = True
+            self._columns["last_used"][rows] = time.time() if now is None else now
+            for name in ("hits", "successes", "failures"):
+                self._columns[name][rows] = 0
+            if self._positions is not None:
+                # A re-added id now resolves to its new row; `kill` leaves that entry alone.
+                self._positions.update(zip(ids.tolist(), range(rows.start, end), strict=True))
+            self._size = end
+
+    def positions_of(self, ids: list[int] | np.ndarray) -> np.ndarray:
+        """Positions of the live memories with these stable ids, in ascending order."""
+        with self._lock:
+            if self._positions is None:
+                live = np.flatnonzero(self.live)
+                self._positions = dict(zip(self.ids[live].tolist(), live.tolist(), strict=True))
+            positions = self._positions
+            ids = np.asarray(ids, dtype="int64").tolist()
+            found = {positions[memory_id] for memory_id in ids if memory_id in positions}
+        return np.array(sorted(found), dtype="int64")
+
+    def kill(self, positions: np.ndarray) -> int:
+        with self._lock:
+            positions = np.unique(positions)
+            alive = positions[self._columns["live"][positions]]
+            self._columns["live"][alive] = False
+            self.n_deleted += len(alive)
+            if self._positions is not None:
+                for memory_id, position in zip(
+                    self._columns["ids"][alive].tolist(), alive.tolist(), strict=True
+                ):
+                    if self._positions.get(memory_id) == position:
+                        del self._positions[memory_id]
+            return len(alive)
+
+    def inherit(self, old: np.ndarray, new: np.ndarray) -> None:
+        """Carries counters from replaced rows over to their replacements."""
+        with self._lock:
+            for name in ("hits", "last_used", "successes", "failures"):
+                self._columns[name][new] = self._columns[name][old]
+
+    def touch(self, positions: np.ndarray, now: float | None = None) -> None:
+        """Counts one search hit for each position."""
+        if not len(positions):
+            return
+        with self._lock:
+            np.add.at(self._columns["hits"], positions, 1)
+            last_used = self._columns["last_used"]
+            # Logged hits can be older than ones this process already counted.
+            last_used[positions] = np.maximum(
+                last_used[positions], time.time() if now is None else now
+            )
+
+    def record_outcome(self, positions: np.ndarray, success: bool) -> None:
+        with self._lock:
+            np.add.at(self._columns["successes" if success else "failures"], positions, 1)
+
+    def eviction_order(self, policy: str, protect: np.ndarray | None = None) -> np.ndarray:
+        """Live positions, first to evict first; `protect`ed positions go last.
+
+        "lru" evicts the least recently returned memory, "lfu" the least often
+        returned one, and "success" the one whose retrievals least often led to
+        a successful task (Laplace-smoothed, so unjudged memories score 0.5).
+        Ties fall back to recency.
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {policy!r}; expected {EVICTION_POLICIES}")
+        with self._lock:
+            positions = np.flatnonzero(self.live)
+            last_used = self.column("last_used")[positions]
+            keys = [last_used]
+            if policy == "lfu":
+                keys.append(self.column("hits")[positions])
+            elif policy == "success":
+                successes = self.column("successes")[positions]
+                judged = successes + self.column("failures")[positions]
+                keys.append((successes + 1) / (judged + 2))
+            protected = np.zeros(len(positions), dtype=bool)
+            if protect is not None:
+                protected = np.isin(positions, protect)
+            keys.append(protected)
+        return positions[np.lexsort(keys)]
+
+    def take(self, positions: np.ndarray) -> "MemoryUsage":
+        """A new table holding just these rows, in this order."""
+        usage = MemoryUsage()
+        with self._lock:
+            usage._columns = {name: self.column(name)[positions] for name in _COLUMNS}
+        usage._size = len(positions)
+        usage.n_deleted = int(len(positions) - usage.live.sum())
+        return usage
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            live = self.live
+            hits = self.column("hits")[live]
+            return {
+                "live": int(live.sum()),
+                "deleted": self.n_deleted,
+                "hits": int(hits.sum()),
+                "never_hit": int((hits == 0).sum()),
+            }
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            columns: dict[str, Any] = {name: self.column(name) for name in _COLUMNS}
+            np.savez(path, **columns)
+
+    @classmethod
+    def load(cls, path: str) -> "MemoryUsage":
+        with np.load(path) as data:
+            usage = cls()
+            usage._columns = {name: data[name].astype(dtype) for name, dtype in _COLUMNS.items()}
+        usage._size = len(usage._columns["ids"])
+        usage.n_deleted = int(usage._size - usage.live.sum())
+        return usage
+
+
+class UsageLog:
+    """Hits and outcomes counted by a read-only bank, for its writer to fold in.
+
+    Records are buffered and appended to `path` as JSON lines every
+    `USAGE_LOG_FLUSH` records, on `flush()`, and at exit. `apply` replays them
+    into a `MemoryUsage` by stable id, so compaction in between does not matter.
+    Appends from several processes may interleave; a torn line is skipped.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._records: list[str] = []
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def hits(self, ids: np.ndarray, now: float | None = None) -> None:
+        if len(ids):
+            self._append({"hits": np.asarray(ids).tolist(), "at": now or time.time()})
+
+    def outcome(self, ids: list[int], success: bool) -> None:
+        if ids:
+            self._append({"outcome": list(ids), "success": success})
+
+    def _append(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            self._records.append(json.dumps(record) + "\n")
+            full = len(self._records) >= USAGE_LOG_FLUSH
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            records, self._records = self._records, []
+        if records:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(records))
+
+    @staticmethod
+    def apply(path: str, usage: MemoryUsage, offset: int = 0) -> int:
+        """Replays the log from byte `offset` into `usage`; returns the offset read up to.
+
+        A trailing line without its newline may still be being written, so it is
+        left for the next call.
+        """
+        if not os.path.exists(path):
+            return offset
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "hits" in record:
+                usage.touch(usage.positions_of(record["hits"]), now=record["at"])
+            elif "outcome" in record:
+                usage.record_outcome(usage.positions_of(record["outcome"]), record["success"])
+        return offset + end
@@ -1,56 +1,1347 @@
+import asyncio
+import json
 import os
-from typing import Any
+import shutil
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import cache
+from typing import Any, Literal, NamedTuple, overload
 
 import faiss
 import numpy as np
-from dotenv import load_dotenv
-from openai import OpenAI
 
-load_dotenv()
+from ..monitoring.tracing import span
+from ..providers import Provider, get_provider
+from .embedding_cache import EmbeddingCache, get_embedding_cache
+from .index_factory import (
+    build_index,
+    default_train_size,
+    resolve_index_params,
+    search_parameters,
+    supports_selector,
+)
+from .lexical_index import BM25Index, reciprocal_rank_fusion
+from .payload_store import PayloadFile, payloads_exist, read_payloads, write_payloads
+from .usage import MemoryUsage, UsageLog
+from .wal import WriteAheadLog
 
-class VectorStore:
-    def __init__(self, dimension: int = 3072): # 3072 for text-embedding-3-large
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.index = faiss.IndexFlatL2(dimension)
-        self.memories: list[dict[str, Any]] = []
 
-    def _get_embedding(self, text: str) -> list[float]:
-        response = self.client.embeddings.create(
-            input=[text],
-            model="text-embedding-3-large"
+class _ReadWriteLock:
+    """Many concurrent searches, or one writer; waiting writers hold back new readers.
+
+    Both sides are reentrant per thread, and a writer may also read.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer: int | None = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        me = threading.get_ident()
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0 and self._writer != me:
+            with self._cond:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+                self._readers += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if depth == 0 and self._writer != me:
+                with self._cond:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me:
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._waiting_writers -= 1
+                self._writer = me
+            self._write_depth += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._write_depth -= 1
+                if not self._write_depth:
+                    self._writer = None
+                    self._cond.notify_all()
+
+
+class _RowFilter(NamedTuple):
+    """Rows a search may return.
+
+    `mask` covers every row, `selector` the index's rows, of which `in_index` pass.
+    """
+
+    mask: np.ndarray
+    selector: faiss.IDSelector | None
+    in_index: int
+
+
+class _LexicalCandidates(NamedTuple):
+    """BM25 row positions for a hybrid search, found before the dense search runs.
+
+    `decisive` means they settle the search without embedding the query;
+    `compactions` stamps the row layout the positions refer to.
+    """
+
+    ids: np.ndarray
+    decisive: bool
+    compactions: int
+
+
+class EmbeddingMixin:
+    """Embedding and batched ingestion shared by local and sharded banks.
+
+    Subclasses provide `model`, `dimension`, `cache`, `_provider` and `add_vectors`.
+    """
+
+    model: str
+    dimension: int
+    cache: EmbeddingCache
+    _provider: Provider | None
+    add_vectors: Callable[[list[dict[str, Any]], np.ndarray], list[int]]
+
+    @property
+    def provider(self) -> Provider:
+        return self._provider or get_provider()
+
+    def _get_embedding(self, text: str) -> np.ndarray:
+        embedding: np.ndarray = self._get_embeddings([text])[0]
+        return embedding
+
+    def _get_embeddings(self, texts: list[str]) -> np.ndarray:
+        """Embeds many texts, serving repeats from the cache and the rest in one API request."""
+        provider = self.provider
+        cache_model = f"{provider.name}/{self.model}"
+        cached = self.cache.get_many(cache_model, self.dimension, texts)
+        missing = _missing_texts(texts, cached)
+        if not missing:
+            return np.ascontiguousarray(cached, dtype="float32")
+        with span("embedding", call=True):
+            fresh = provider.embed(missing, self.model, self.dimension)
+        self.cache.put_many(cache_model, self.dimension, missing, fresh)
+        return _fill_missing(texts, cached, missing, fresh)
+
+    async def _aget_embeddings(self, texts: list[str]) -> np.ndarray:
+        """`_get_embeddings` with the API request awaited and cache I/O off the event loop."""
+        provider = self.provider
+        cache_model = f"{provider.name}/{self.model}"
+        cached = await asyncio.to_thread(self.cache.get_many, cache_model, self.dimension, texts)
+        missing = _missing_texts(texts, cached)
+        if not missing:
+            return np.ascontiguousarray(cached, dtype="float32")
+        with span("embedding", call=True):
+            fresh = await provider.aembed(missing, self.model, self.dimension)
+        await asyncio.to_thread(self.cache.put_many, cache_model, self.dimension, missing, fresh)
+        return _fill_missing(texts, cached, missing, fresh)
+
+    def add_memory(self, content: dict[str, Any], text_to_embed: str) -> int:
+        return self.add_vectors([content], self._get_embedding(text_to_embed)[None, :])[0]
+
+    async def aadd_memory(self, content: dict[str, Any], text_to_embed: str) -> int:
+        """`add_memory` for event loops: the embedding is awaited, the index write threaded."""
+        vectors = await self._aget_embeddings([text_to_embed])
+        return (await asyncio.to_thread(self.add_vectors, [content], vectors))[0]
+
+    def add_memories(
+        self,
+        contents: list[dict[str, Any]],
+        texts: list[str],
+        batch_size: int = 256,
+        show_progress: bool = True
+    ) -> list[int]:
+        """Bulk ingestion: one embeddings request and one index.add per batch."""
+        if len(contents) != len(texts):
+            raise ValueError(
+                f"Got {len(contents)} memories but {len(texts)} texts to embed"
+            )
+        total = len(texts)
+        ids = []
+        for start in range(0, total, batch_size):
+            batch_texts = texts[start:start + batch_size]
+            vectors = self._get_embeddings(batch_texts)
+            ids.extend(self.add_vectors(contents[start:start + batch_size], vectors))
+            if show_progress:
+                done = min(start + batch_size, total)
+                print(f"Ingested {done}/{total} memories")
+        return ids
+
+
+class VectorStore(EmbeddingMixin):
+    def __init__(
+        self,
+        dimension: int = 3072, # 3072 for text-embedding-3-large
+        provider: Provider | None = None,
+        cache: EmbeddingCache | None = None,
+        index_type: str = "flat",
+        index_params: dict[str, Any] | None = None,
+        train_size: int | None = None,
+        compact_every: int | None = 10_000,
+        partition_key: str | None = None,
+        rerank: int = 0,
+        lexical_key: str | None = None,
+        capacity: int | None = None,
+        eviction: str = "lru",
+        max_deleted_fraction: float = 0.2
+    ):
+        # None follows the process-wide provider, including later `set_provider` calls.
+        self._provider = provider
+        self.cache = cache if cache is not None else get_embedding_cache()
+        self.model = "text-embedding-3-large"
+        self.dimension = dimension
+        # Memories are grouped by the value of this field (e.g. "agent"), and a search
+        # restricted to one partition skips every other row of the shared index.
+        self.partition_key = partition_key
+        # With a compressed index (sq_*, pq, ivf_pq) and rerank > 0, the float32 vectors
+        # are also kept (memory-mapped from `.vectors.npy` once saved), and searches
+        # re-score `rerank * k` candidates at full precision.
+        self.rerank = rerank
+        # This field of every memory (e.g. "task_description") is also indexed with
+        # BM25, and `search` fuses lexical and dense results.
+        self.lexical_key = lexical_key
+        # Adding past `capacity` live memories evicts the lowest ranked ones under the
+        # `eviction` policy ("lru", "lfu" or "success"; see MemoryUsage.eviction_order).
+        self.capacity = capacity
+        self.eviction = eviction
+        # Deleted memories are tombstoned and filtered out of searches; once they make
+        # up this fraction of the rows, a background `compact` drops them for good.
+        self.max_deleted_fraction = max_deleted_fraction
+        self.evictions = 0
+        self.compactions = 0
+        self._configure_index(index_type, index_params, train_size)
+        self.memories: list[dict[str, Any]] | PayloadFile = []
+        self.read_only = False
+        # Once saved to or loaded from a path, new memories are appended to that bank's
+        # WAL and folded into a fresh snapshot every `compact_every` records.
+        self.path: str | None = None
+        self.compact_every = compact_every
+        self._wal: WriteAheadLog | None = None
+        # Bumped whenever the bank's contents change, so caches built on it can tell.
+        self.version = 0
+        # FAISS indexes cannot be searched while they are being added to, so adds,
+        # deletes and compaction's swap exclude searches (which run concurrently).
+        self._lock = _ReadWriteLock()
+        self._compact_lock = threading.Lock()
+        self._compactor: threading.Thread | None = None
+
+    def _configure_index(
+        self, index_type: str, index_params: dict[str, Any] | None, train_size: int | None
+    ) -> None:
+        self.index_type = index_type
+        self.index_params = resolve_index_params(index_type, index_params)
+        self.index = build_index(index_type, self.dimension, self.index_params)
+        self.train_size = (
+            train_size if train_size is not None
+            else default_train_size(index_type, self.index_params)
         )
-        return response.data[0].embedding
+        # Vectors not in the FAISS index: buffered until there are enough to train on,
+        # or replayed from the WAL on top of a read-only mapped index. Searched exactly.
+        self._pending = np.empty((0, self.dimension), dtype="float32")
+        # Row positions per partition value.
+        self._partition_ids: dict[str, np.ndarray] = {}
+        # Full-precision copies for re-ranking: the saved snapshot plus what was added since.
+        self._full_vectors = np.empty((0, self.dimension), dtype="float32")
+        self._full_chunks: list[np.ndarray] = []
+        self.lexical_index = BM25Index() if self.lexical_key else None
+        # Stable ids, liveness and usage counters, one row per stored vector.
+        self.usage = MemoryUsage()
+        # Read-only banks log their usage here for the writer; the writer tracks how
+        # far into the claimed log (see `_fold_usage_log`) it has applied.
+        self._usage_log: UsageLog | None = None
+        self._usage_folded = ("", 0)
+        self._next_id = 0
+        # Row masks and FAISS selectors per partition (None: the whole bank), reused
+        # until rows are added, deleted or compacted.
+        self._filter_cache: dict[str | None, tuple[tuple[Any, ...], _RowFilter]] = {}
 
-    def add_memory(self, content: dict[str, Any], text_to_embed: str):
-        embedding = self._get_embedding(text_to_embed)
-        vector = np.array([embedding]).astype("float32")
-        self.index.add(vector)
-        self.memories.append(content)
+    @property
+    def ntotal(self) -> int:
+        """Stored rows, including deleted memories not yet compacted away."""
+        return self.index.ntotal + len(self._pending)
 
-    def search(self, query: str, k: int = 5) -> list[dict[str, Any]]:
-        if self.index.ntotal == 0:
-            return []
-        
-        query_embedding = self._get_embedding(query)
-        vector = np.array([query_embedding]).astype("float32")
-        _, indices = self.index.search(vector, min(k, self.index.ntotal))
-        
+    @property
+    def size(self) -> int:
+        """Live memories."""
+        return self.ntotal - self.usage.n_deleted
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise RuntimeError("This VectorStore was loaded with mmap=True and is read-only")
+
+    def add_vectors(self, contents: list[dict[str, Any]], vectors: np.ndarray) -> list[int]:
+        """Adds precomputed embeddings and returns the new memories' stable ids.
+
+        Trainable backends train once `train_size` is reached. With a `capacity`,
+        memories beyond it are evicted, never the ones being added unless the
+        batch alone exceeds it.
+        """
+        self._check_writable()
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        if len(contents) != len(vectors):
+            raise ValueError(f"Got {len(contents)} memories but {len(vectors)} vectors")
+        with self._lock.write():
+            ids = np.arange(self._next_id, self._next_id + len(contents), dtype="int64")
+            if self._wal is not None:
+                self._wal.append(contents, vectors, ids)
+            start = self.ntotal
+            self._insert(contents, vectors, ids)
+            self._evict(protect=np.arange(start, self.ntotal))
+        self._after_write()
+        return ids.tolist()
+
+    def update(
+        self,
+        memory_id: int,
+        content: dict[str, Any],
+        text_to_embed: str | None = None,
+        vector: np.ndarray | None = None
+    ) -> None:
+        """Replaces a memory's payload, keeping its id and usage counters.
+
+        The memory is re-embedded from `text_to_embed` (or takes `vector`);
+        with neither, it keeps its current vector.
+        """
+        self._check_writable()
+        if vector is None and text_to_embed is not None:
+            vector = self._get_embedding(text_to_embed)
+        with self._lock.write():
+            positions = self.usage.positions_of([memory_id])
+            if not len(positions):
+                raise KeyError(f"No memory with id {memory_id}")
+            if vector is None:
+                vector = self._vectors_at(positions)[0]
+            vectors = np.ascontiguousarray(np.asarray(vector)[None, :], dtype="float32")
+            ids = np.array([memory_id], dtype="int64")
+            if self._wal is not None:
+                self._wal.append([content], vectors, ids)
+            self._insert([content], vectors, ids)
+        self._after_write()
+
+    def delete(self, ids: list[int]) -> int:
+        """Deletes memories by stable id; returns how many were found.
+
+        They drop out of searches at once, and out of the index at the next
+        compaction (see `max_deleted_fraction`) or save.
+        """
+        self._check_writable()
+        with self._lock.write():
+            positions = self.usage.positions_of(ids)
+            if not len(positions):
+                return 0
+            if self._wal is not None:
+                self._wal.append_delete(self.usage.ids[positions])
+            deleted = self._kill(positions)
+        self._after_write()
+        return deleted
+
+    def record_outcome(self, ids: list[int], success: bool) -> None:
+        """Credits memories with the outcome of a task they were retrieved for.
+
+        Feeds the "success" eviction policy. Like the hit counters, outcomes are
+        kept in memory and persisted with the next snapshot; a read-only bank
+        logs them for the writer instead.
+        """
+        self.usage.record_outcome(self.usage.positions_of(ids), success)
+        if self._usage_log is not None:
+            self._usage_log.outcome(ids, success)
+
+    def flush_usage(self) -> None:
+        """Appends the usage a read-only bank has buffered to its log now."""
+        if self._usage_log is not None:
+            self._usage_log.flush()
+
+    def usage_stats(self) -> dict[str, int | None]:
+        return {
+            **self.usage.stats(),
+            "capacity": self.capacity,
+            "evictions": self.evictions,
+            "compactions": self.compactions,
+        }
+
+    def _insert(self, contents: list[dict[str, Any]], vectors: np.ndarray, ids: np.ndarray) -> None:
+        """Applies adds; an id that is already live is replaced, as `update` does."""
+        replaced = np.empty(0, dtype="int64")
+        if len(ids) and ids.min() < self._next_id:
+            replaced = self.usage.positions_of(ids)
+        start = self.ntotal
+        self._apply(contents, vectors)
+        self.usage.append(ids)
+        if len(replaced):
+            new_positions = {int(memory_id): start + i for i, memory_id in enumerate(ids)}
+            self.usage.inherit(
+                replaced,
+                np.array([new_positions[int(i)] for i in self.usage.ids[replaced]], dtype="int64")
+            )
+            self._kill(replaced)
+        if len(ids):
+            self._next_id = max(self._next_id, int(ids.max()) + 1)
+
+    def _kill(self, positions: np.ndarray) -> int:
+        killed = self.usage.kill(positions)
+        self.version += 1
+        return killed
+
+    def _evict(self, protect: np.ndarray) -> None:
+        if self.capacity is None or self.size <= self.capacity:
+            return
+        victims = self.usage.eviction_order(self.eviction, protect=protect)
+        victims = victims[:self.size - self.capacity]
+        if self._wal is not None:
+            self._wal.append_delete(self.usage.ids[victims])
+        self.evictions += self._kill(victims)
+
+    def _after_write(self) -> None:
+        if (
+            self._wal is not None and self.path is not None and self.compact_every
+            and self._wal.records >= self.compact_every
+        ):
+            self.save(self.path)
+        elif self.usage.n_deleted > self.max_deleted_fraction * self.ntotal:
+            with self._lock.write():
+                if self._compactor is None or not self._compactor.is_alive():
+                    self._compactor = threading.Thread(target=self.compact, daemon=True)
+                    self._compactor.start()
+
+    def compact(self) -> None:
+        """Drops deleted memories from the index, payloads and side indexes.
+
+        Stable ids are kept; positions change. The index is refilled from a reset
+        copy of the trained one, so nothing is retrained. Rows are read and the
+        result swapped in under the store lock, but the rebuild in between runs
+        without it, and memories added meanwhile are carried over.
+        """
+        self._check_writable()
+        with self._compact_lock:
+            while not self._compact_once():
+                pass
+
+    def _compact_once(self) -> bool:
+        """One compaction pass; False if it must be redone because the index trained.
+
+        Adds that reach `train_size` during the rebuild move every buffered row into
+        the live index, which an untrained rebuild (kept rows left pending) cannot
+        be swapped over.
+        """
+        with self._lock.write():
+            if not self.usage.n_deleted:
+                return True
+            cutoff = self.ntotal
+            keep = np.flatnonzero(self.usage.live)
+            vectors = self._vectors_at(keep)
+            contents = [self.memories[position] for position in keep.tolist()]
+            trained = self.index.is_trained
+            index = faiss.clone_index(self.index) if trained else None
+        if index is not None:
+            index.reset()
+            index.add(vectors)
+        lexical_index = None
+        if self.lexical_index is not None:
+            lexical_index = BM25Index()
+            lexical_index.add(
+                range(len(contents)), [self._lexical_text(content) for content in contents]
+            )
+
+        with self._lock.write():
+            if self.index.is_trained != trained:
+                return False
+            tail = np.arange(cutoff, self.ntotal)
+            tail_vectors = self._vectors_at(tail)
+            tail_contents = [self.memories[position] for position in tail.tolist()]
+            self.usage = self.usage.take(np.concatenate([keep, tail]))
+            if index is not None:
+                self.index = index
+                self._pending = np.empty((0, self.dimension), dtype="float32")
+            else:
+                self._pending = vectors
+            self.memories = contents
+            self.lexical_index = lexical_index
+            if self.rerank:
+                self._full_vectors, self._full_chunks = vectors, []
+            self._partition_ids = {}
+            if self.partition_key is not None:
+                self._add_to_partitions(
+                    [content.get(self.partition_key) for content in contents],
+                    np.arange(len(contents))
+                )
+            if len(tail):
+                self._apply(tail_contents, tail_vectors)
+            self.compactions += 1
+        return True
+
+    def _apply(self, contents: list[dict[str, Any]], vectors: np.ndarray) -> None:
+        if self.rerank:
+            self._full_chunks.append(vectors.copy())
+        if self.lexical_index is not None:
+            self.lexical_index.add(
+                range(self.ntotal, self.ntotal + len(contents)),
+                [self._lexical_text(content) for content in contents]
+            )
+        if self.partition_key is not None:
+            ids = np.arange(self.ntotal, self.ntotal + len(vectors))
+            keys = [content.get(self.partition_key) for content in contents]
+            self._add_to_partitions(keys, ids)
+        if self.index.is_trained and not self.read_only:
+            self.index.add(vectors)
+        else:
+            self._pending = np.concatenate([self._pending, vectors])
+            if not self.read_only and len(self._pending) >= self.train_size:
+                self.train()
+        self.memories.extend(contents)
+        self.version += 1
+
+    def _lexical_text(self, content: dict[str, Any]) -> str | None:
+        if self.lexical_key is None:
+            return None
+        value = content.get(self.lexical_key)
+        return None if value is None else str(value)
+
+    def _add_to_partitions(self, keys: list[Any], ids: np.ndarray) -> None:
+        keys_arr = np.array([str(key) for key in keys])
+        for key in dict.fromkeys(k for k in keys if k is not None):
+            mask = keys_arr == str(key)
+            key = str(key)
+            existing = self._partition_ids.get(key, np.empty(0, dtype="int64"))
+            self._partition_ids[key] = np.concatenate([existing, ids[mask]])
+
+    def _rebuild_partitions(self, assignments: dict[str, list[int]] | None = None) -> None:
+        """Rebuilds the row positions of every partition.
+
+        `assignments` (partition -> memory ids) is read from the snapshot so that a
+        lazily loaded bank does not have to decode every memory to find its key.
+        """
+        self._partition_ids = {}
+        if self.partition_key is None or self.ntotal == 0:
+            return
+        if assignments is None:
+            assignments = {}
+            for i, memory in enumerate(self.memories):
+                key = memory.get(self.partition_key)
+                if key is not None:
+                    assignments.setdefault(str(key), []).append(i)
+        self._partition_ids = {
+            key: np.asarray(ids, dtype="int64") for key, ids in assignments.items()
+        }
+
+    def _stored_vectors(self) -> tuple[np.ndarray, np.ndarray]:
+        """The kept full-precision vectors as (snapshot part, part added since)."""
+        if len(self._full_chunks) > 1:
+            self._full_chunks = [np.concatenate(self._full_chunks)]
+        added = self._full_chunks[0] if self._full_chunks else self._full_vectors[:0]
+        return self._full_vectors, added
+
+    def _full_precision(self, ids: np.ndarray) -> np.ndarray:
+        saved, added = self._stored_vectors()
+        ids = np.clip(ids, 0, None)
+        from_saved = ids < len(saved)
+        out = np.empty((*ids.shape, self.dimension), dtype="float32")
+        # Fancy indexing needs sorted, unique rows to read a memmap efficiently.
+        rows, inverse = np.unique(ids[from_saved], return_inverse=True)
+        out[from_saved] = np.asarray(saved[rows])[inverse]
+        out[~from_saved] = added[ids[~from_saved] - len(saved)]
+        return out
+
+    def _vectors_at(self, positions: np.ndarray) -> np.ndarray:
+        positions = np.asarray(positions, dtype="int64")
+        if self.rerank:
+            return self._full_precision(positions)
+        out = np.empty((len(positions), self.dimension), dtype="float32")
+        in_index = positions < self.index.ntotal
+        if in_index.any():
+            ivf = faiss.try_extract_index_ivf(self.index)
+            if ivf is not None and ivf.direct_map.no():
+                ivf.make_direct_map()
+            out[in_index] = self.index.reconstruct_batch(positions[in_index])
+        out[~in_index] = self._pending[positions[~in_index] - self.index.ntotal]
+        return out
+
+    def partitions(self) -> dict[str, int]:
+        """Size of every partition, keyed by partition value."""
+        return {key: len(ids) for key, ids in self._partition_ids.items()}
+
+    def train(self) -> None:
+        """Trains the index on the buffered vectors and moves them into it."""
+        if self.index.is_trained or len(self._pending) == 0:
+            return
+        self.index.train(self._pending)
+        self.index.add(self._pending)
+        self._pending = np.empty((0, self.dimension), dtype="float32")
+
+    def search_vectors(
+        self,
+        vectors: np.ndarray,
+        k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        partition: str | None = None,
+        rerank: int | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Raw k-NN over the bank; returns FAISS-style (distances, indices) matrices.
+
+        Indices are row positions, which compaction reassigns; deleted memories are
+        skipped. `rerank` overrides the store's re-rank factor for this call (0
+        disables it). A `partition` search runs on the bank's own index, skipping
+        rows outside the partition.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        with self._lock.read():
+            rows = self._row_filter(partition)
+            if rows is None:
+                return self._search_positions(vectors, k, nprobe, ef_search, rerank, None)
+            if partition is not None and not supports_selector(self.index):
+                # IndexPQ takes no selector: scan the partition's rows directly.
+                distances, indices = self._search_rows(vectors, k, np.flatnonzero(rows.mask))
+            else:
+                # Indexes that take an id selector skip filtered rows as they search;
+                # the others are over-fetched by the number of tombstones instead.
+                fetch = k
+                if not supports_selector(self.index):
+                    fetch += self.usage.n_deleted
+                if partition is not None:
+                    nprobe = self._partition_nprobe(nprobe, rows)
+                distances, indices = self._search_positions(
+                    vectors, fetch, nprobe, ef_search, rerank, rows
+                )
+            allowed = rows.mask[np.clip(indices, 0, None)]
+        dead = (indices == -1) | ~allowed
+        distances = np.where(dead, np.inf, distances).astype("float32")
+        indices = np.where(dead, -1, indices)
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, order, 1), np.take_along_axis(indices, order, 1)
+
+    def _search_positions(
+        self,
+        vectors: np.ndarray,
+        k: int,
+        nprobe: int | None,
+        ef_search: int | None,
+        rerank: int | None,
+        rows: _RowFilter | None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        factor = self.rerank if rerank is None else rerank
+        if not (factor and self.rerank):
+            return self._search_all(vectors, k, nprobe, ef_search, rows)
+
+        k = min(k, self.ntotal)
+        _, candidates = self._search_all(vectors, k * factor, nprobe, ef_search, rows)
+        candidate_vectors = self._full_precision(candidates)
+        distances = ((candidate_vectors - vectors[:, None, :]) ** 2).sum(axis=2)
+        distances[candidates == -1] = np.inf
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return (
+            np.take_along_axis(distances, order, 1).astype("float32"),
+            np.take_along_axis(candidates, order, 1)
+        )
+
+    def _search_all(
+        self,
+        vectors: np.ndarray,
+        k: int,
+        nprobe: int | None,
+        ef_search: int | None,
+        rows: _RowFilter | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        k = min(k, self.ntotal)
         results = []
-        for idx in indices[0]:
-            if idx != -1:
-                results.append(self.memories[idx])
-        return results
-
-    def save(self, path: str):
-        faiss.write_index(self.index, f"{path}.index")
-        import json
-        with open(f"{path}.json", "w") as f:
-            json.dump(self.memories, f)
-
-    def load(self, path: str):
-        if os.path.exists(f"{path}.index"):
-            self.index = faiss.read_index(f"{path}.index")
-        if os.path.exists(f"{path}.json"):
-            import json
-            with open(f"{path}.json") as f:
+        if self.index.ntotal:
+            selector = rows.selector if rows is not None else None
+            params = search_parameters(self.index, nprobe, ef_search, selector)
+            results.append(self.index.search(vectors, k, params=params))
+        if len(self._pending):
+            pending = np.arange(len(self._pending))
+            if rows is not None:
+                pending = np.flatnonzero(rows.mask[self.index.ntotal:])
+            if len(pending):
+                distances, local = faiss.knn(
+                    vectors, self._pending[pending], min(k, len(pending))
+                )
+                results.append((distances, pending[local] + self.index.ntotal))
+        if not results:
+            empty = np.empty((len(vectors), 0))
+            return empty.astype("float32"), empty.astype("int64")
+        if len(results) == 1:
+            return results[0]
+        # Merge the index hits with the exact hits over the buffered vectors.
+        distances = np.concatenate([d for d, _ in results], axis=1)
+        indices = np.concatenate([i for _, i in results], axis=1)
+        distances[indices == -1] = np.inf
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, order, 1), np.take_along_axis(indices, order, 1)
+
+    def _search_rows(
+        self, vectors: np.ndarray, k: int, rows: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Exact k-NN over just these rows, decoded (or full precision, with rerank)."""
+        if not len(rows):
+            empty = np.empty((len(vectors), 0))
+            return empty.astype("float32"), empty.astype("int64")
+        distances, local = faiss.knn(vectors, self._vectors_at(rows), min(k, len(rows)))
+        return distances, np.where(local == -1, -1, rows[np.clip(local, 0, None)])
+
+    def _partition_nprobe(self, nprobe: int | None, rows: _RowFilter) -> int | None:
+        """Widens an IVF search by the share of rows a partition filter keeps.
+
+        The filtered search then sees about as many candidates as an unfiltered one.
+        """
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is None or not rows.in_index:
+            return nprobe
+        nprobe = ivf.nprobe if nprobe is None else nprobe
+        share = rows.in_index / self.index.ntotal
+        return min(ivf.nlist, int(np.ceil(nprobe / share)))
+
+    def _row_filter(self, partition: str | None) -> _RowFilter | None:
+        """The rows a search may return, or None when that is every row."""
+        if partition is not None and self.partition_key is None:
+            raise ValueError("This VectorStore was not created with a partition_key")
+        if partition is None and not self.usage.n_deleted:
+            return None
+        key = (self.usage, self.ntotal, self.index.ntotal, self.usage.n_deleted)
+        cached = self._filter_cache.get(partition)
+        if cached is None or cached[0] != key:
+            mask = self.usage.live.copy()
+            if partition is not None:
+                in_partition = np.zeros(self.ntotal, dtype=bool)
+                in_partition[self._partition_ids.get(partition, np.empty(0, dtype="int64"))] = True
+                mask &= in_partition
+            selector = None
+            if self.index.ntotal and supports_selector(self.index):
+                selector = _bitmap_selector(mask[:self.index.ntotal])
+            in_index = int(mask[:self.index.ntotal].sum())
+            cached = self._filter_cache[partition] = (
+                key, _RowFilter(mask, selector, in_index)
+            )
+        return cached[1]
+
+    @overload
+    def search(
+        self,
+        query: str,
+        k: int = ...,
+        nprobe: int | None = ...,
+        ef_search: int | None = ...,
+        partition: str | None = ...,
+        hybrid: bool | None = ...,
+        lexical_margin: float | None = ...,
+        with_scores: Literal[False] = ...
+    ) -> list[dict[str, Any]]: ...
+
+    @overload
+    def search(
+        self,
+        query: str,
+        k: int = ...,
+        nprobe: int | None = ...,
+        ef_search: int | None = ...,
+        partition: str | None = ...,
+        hybrid: bool | None = ...,
+        lexical_margin: float | None = ...,
+        *,
+        with_scores: Literal[True]
+    ) -> list[tuple[dict[str, Any], float]]: ...
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        partition: str | None = None,
+        hybrid: bool | None = None,
+        lexical_margin: float | None = 2.0,
+        with_scores: bool = False
+    ) -> list[dict[str, Any]] | list[tuple[dict[str, Any], float]]:
+        """Top-`k` memories for `query`.
+
+        Stores with a `lexical_key` default to hybrid search: BM25 and dense results
+        are fused by reciprocal rank. When the best lexical hit outscores the
+        runner-up by `lexical_margin` (e.g. an exact ID like "B-99"), the lexical
+        results are returned without embedding the query at all; pass None to
+        always fuse.
+
+        With `with_scores`, returns (memory, L2 distance) pairs as `search_many`
+        does. Hybrid hits found only by BM25 have no dense distance and report 0.0,
+        so a distance threshold never drops an exact identifier match.
+
+        Returned memories carry their stable id as "memory_id".
+        """
+        if self.size == 0:
+            return []
+        if hybrid is None:
+            hybrid = self.lexical_index is not None
+        lexical = (
+            self._lexical_candidates(query, k, partition, lexical_margin) if hybrid else None
+        )
+        # Embedded before taking the read lock, so a waiting writer never holds
+        # every new search behind an API round trip.
+        vector = None
+        if lexical is None or not lexical.decisive:
+            vector = self._get_embedding(query)[None, :]
+        hits = self._search_hits(query, k, nprobe, ef_search, partition, lexical, vector)
+        if with_scores:
+            return hits
+        return [memory for memory, _ in hits]
+
+    @overload
+    async def asearch(
+        self,
+        query: str,
+        k: int = ...,
+        nprobe: int | None = ...,
+        ef_search: int | None = ...,
+        partition: str | None = ...,
+        hybrid: bool | None = ...,
+        lexical_margin: float | None = ...,
+        with_scores: Literal[False] = ...
+    ) -> list[dict[str, Any]]: ...
+
+    @overload
+    async def asearch(
+        self,
+        query: str,
+        k: int = ...,
+        nprobe: int | None = ...,
+        ef_search: int | None = ...,
+        partition: str | None = ...,
+        hybrid: bool | None = ...,
+        lexical_margin: float | None = ...,
+        *,
+        with_scores: Literal[True]
+    ) -> list[tuple[dict[str, Any], float]]: ...
+
+    async def asearch(
+        self,
+        query: str,
+        k: int = 5,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        partition: str | None = None,
+        hybrid: bool | None = None,
+        lexical_margin: float | None = 2.0,
+        with_scores: bool = False
+    ) -> list[dict[str, Any]] | list[tuple[dict[str, Any], float]]:
+        """`search` for event loops.
+
+        The query is embedded with the provider's async client, and the FAISS and
+        BM25 work runs in a worker thread, so concurrent searches never block the loop.
+        """
+        if self.size == 0:
+            return []
+        if hybrid is None:
+            hybrid = self.lexical_index is not None
+        lexical = None
+        if hybrid:
+            lexical = await asyncio.to_thread(
+                self._lexical_candidates, query, k, partition, lexical_margin
+            )
+        vector = None
+        if lexical is None or not lexical.decisive:
+            vector = await self._aget_embeddings([query])
+        hits = await asyncio.to_thread(
+            self._search_hits, query, k, nprobe, ef_search, partition, lexical, vector
+        )
+        if with_scores:
+            return hits
+        return [memory for memory, _ in hits]
+
+    def _search_hits(
+        self,
+        query: str,
+        k: int,
+        nprobe: int | None,
+        ef_search: int | None,
+        partition: str | None,
+        lexical: _LexicalCandidates | None,
+        vector: np.ndarray | None
+    ) -> list[tuple[dict[str, Any], float]]:
+        """Dense hits for `vector`, fused with `lexical` candidates for hybrid searches.
+
+        The query is embedded by the caller; `vector` is None only when the lexical
+        candidates are decisive.
+        """
+        with self._lock.read():
+            if lexical is not None:
+                ids, distances = self._hybrid_search(
+                    query, k, nprobe, ef_search, partition, lexical, vector
+                )
+            else:
+                assert vector is not None
+                distances, ids = self.search_vectors(
+                    vector, k, nprobe=nprobe, ef_search=ef_search, partition=partition
+                )
+                ids, distances = ids[0], distances[0]
+            return self._resolve(ids, distances)
+
+    def search_lexical(
+        self, query: str, k: int = 5, partition: str | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """BM25 (scores, ids) for `query`, best first."""
+        if self.lexical_index is None:
+            raise ValueError("This VectorStore was not created with a lexical_key")
+        allowed = None
+        if partition is not None:
+            if self.partition_key is None:
+                raise ValueError("This VectorStore was not created with a partition_key")
+            allowed = self._partition_ids.get(partition, np.empty(0, dtype="int64"))
+        with self._lock.read():
+            deleted = self.usage.n_deleted
+            scores, ids = self.lexical_index.search(query, k + deleted, allowed=allowed)
+            if deleted:
+                live = self.usage.live[ids]
+                scores, ids = scores[live][:k], ids[live][:k]
+        return scores, ids
+
+    def search_lexical_memories(
+        self, query: str, k: int = 5, partition: str | None = None
+    ) -> list[tuple[dict[str, Any], float]]:
+        """`search_lexical`, resolved to (memory, BM25 score) pairs."""
+        with self._lock.read():
+            scores, ids = self.search_lexical(query, k, partition=partition)
+            return self._resolve(ids, scores)
+
+    def _hybrid_search(
+        self,
+        query: str,
+        k: int,
+        nprobe: int | None,
+        ef_search: int | None,
+        partition: str | None,
+        lexical: _LexicalCandidates,
+        vector: np.ndarray | None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Fused (ids, L2 distances); lexical-only hits get distance 0.
+
+        Runs under the read lock. Candidates found before a compaction moved the
+        rows are searched again; ones deleted since are dropped.
+        """
+        if lexical.compactions == self.compactions:
+            lexical_ids = lexical.ids[self.usage.live[lexical.ids]]
+        else:
+            lexical_ids = self.search_lexical(query, 2 * k, partition=partition)[1]
+        if vector is None:
+            ids = lexical_ids[:k]
+            return ids, np.zeros(len(ids), dtype="float32")
+        dense_distances, dense_ids = self.search_vectors(
+            vector, 2 * k, nprobe=nprobe, ef_search=ef_search, partition=partition
+        )
+        found = dense_ids[0] != -1
+        dense_ids, dense_distances = dense_ids[0][found], dense_distances[0][found]
+        dense = dict(zip(dense_ids.tolist(), dense_distances.tolist(), strict=True))
+        ids = reciprocal_rank_fusion([dense_ids, lexical_ids])[:k]
+        return ids, np.array([dense.get(int(idx), 0.0) for idx in ids], dtype="float32")
+
+    def _lexical_candidates(
+        self, query: str, k: int, partition: str | None, lexical_margin: float | None
+    ) -> _LexicalCandidates:
+        """BM25 candidates for a hybrid search, and whether they settle it without embedding."""
+        with self._lock.read():
+            compactions = self.compactions
+            scores, lexical_ids = self.search_lexical(query, 2 * k, partition=partition)
+            ntotal = self.ntotal
+        if lexical_margin is None or len(scores) < min(k, ntotal):
+            return _LexicalCandidates(lexical_ids, False, compactions)
+        runner_up = scores[1] if len(scores) > 1 else 0.0
+        decisive = bool(scores[0] > 0 and scores[0] >= lexical_margin * runner_up)
+        return _LexicalCandidates(lexical_ids, decisive, compactions)
+
+    def search_many(
+        self,
+        queries: list[str],
+        k: int = 5,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        partition: str | None = None
+    ) -> list[list[tuple[dict[str, Any], float]]]:
+        """Embeds all queries in one request and runs one matrix search.
+
+        Returns, per query, (memory, L2 distance) pairs ordered nearest first.
+        """
+        if not queries:
+            return []
+        if self.size == 0:
+            return [[] for _ in queries]
+        return self.search_memories(
+            self._get_embeddings(queries), k, nprobe=nprobe, ef_search=ef_search,
+            partition=partition
+        )
+
+    async def asearch_many(
+        self,
+        queries: list[str],
+        k: int = 5,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        partition: str | None = None
+    ) -> list[list[tuple[dict[str, Any], float]]]:
+        """`search_many` with the embedding request awaited and the search threaded."""
+        if not queries:
+            return []
+        if self.size == 0:
+            return [[] for _ in queries]
+        vectors = await self._aget_embeddings(queries)
+        return await asyncio.to_thread(
+            self.search_memories, vectors, k, nprobe=nprobe, ef_search=ef_search,
+            partition=partition
+        )
+
+    def search_memories(
+        self,
+        vectors: np.ndarray,
+        k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        partition: str | None = None
+    ) -> list[list[tuple[dict[str, Any], float]]]:
+        """`search_vectors`, resolved to (memory, L2 distance) pairs per query row."""
+        if self.size == 0:
+            return [[] for _ in vectors]
+        with self._lock.read():
+            distances, indices = self.search_vectors(
+                vectors, k, nprobe=nprobe, ef_search=ef_search, partition=partition
+            )
+            return [
+                self._resolve(row_indices, row_distances)
+                for row_indices, row_distances in zip(indices, distances, strict=True)
+            ]
+
+    def _resolve(
+        self, indices: np.ndarray, distances: np.ndarray
+    ) -> list[tuple[dict[str, Any], float]]:
+        """Memories for one row of hits, tagged with their ids; counts the hits."""
+        found = np.asarray(indices) != -1
+        positions = np.asarray(indices, dtype="int64")[found]
+        self.usage.touch(positions)
+        ids = self.usage.ids[positions]
+        if self._usage_log is not None:
+            self._usage_log.hits(ids)
+        return [
+            ({**self.memories[position], "memory_id": int(memory_id)}, float(dist))
+            for position, memory_id, dist in zip(
+                positions, ids, np.asarray(distances)[found], strict=True
+            )
+        ]
+
+    @staticmethod
+    def _read_manifest(path: str) -> dict[str, Any]:
+        if not os.path.exists(f"{path}.meta.json"):
+            return {}
+        with open(f"{path}.meta.json") as f:
+            manifest: dict[str, Any] = json.load(f)
+        return manifest
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """True if a bank has been saved at `path`, in either the current or legacy layout."""
+        return os.path.exists(f"{path}.meta.json") or os.path.exists(f"{path}.index")
+
+    @classmethod
+    def open(cls, path: str, mmap: bool = False, **kwargs: Any) -> "VectorStore":
+        """Loads the bank at `path`, or creates and saves an empty one there.
+
+        Either way the store is bound to `path`, so its adds go through the WAL.
+        `kwargs` configure a new bank; a saved bank's manifest takes precedence.
+        """
+        store = cls(**kwargs)
+        if cls.exists(path):
+            store.load(path, mmap=mmap)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            store.save(path)
+        return store
+
+    @staticmethod
+    def _snapshot_path(path: str, generation: int | None) -> str:
+        # Banks saved before snapshots were versioned keep their files directly at `path`.
+        return f"{path}.g{generation}" if generation else path
+
+    def save(self, path: str) -> None:
+        """Writes a full snapshot and starts an empty WAL on top of it.
+
+        The snapshot goes to new generation-stamped files and only becomes visible
+        when the manifest `{path}.meta.json` is atomically replaced, so a crash at
+        any point leaves the previous snapshot and its WAL intact. Deleted memories
+        are compacted away first.
+        """
+        self._check_writable()
+        if self._compactor is not None:
+            self._compactor.join()
+        if self.usage.n_deleted:
+            self.compact()
+        with self._lock.write():
+            if path == self.path:
+                generation = self._read_manifest(path).get("generation")
+                self._fold_usage_log(path, self._snapshot_path(path, generation))
+            self._save(path)
+
+    def _save(self, path: str) -> None:
+        old_generation = self._read_manifest(path).get("generation")
+        generation = (old_generation or 0) + 1
+        snapshot = self._snapshot_path(path, generation)
+
+        faiss.write_index(self.index, f"{snapshot}.index")
+        np.save(f"{snapshot}.pending.npy", self._pending)
+        write_payloads(snapshot, self.memories)
+        with open(f"{snapshot}.partitions.json", "w") as f:
+            json.dump({key: ids.tolist() for key, ids in self._partition_ids.items()}, f)
+        self.usage.save(f"{snapshot}.usage.npz")
+        suffixes = [
+            ".index", ".pending.npy", ".jsonl", ".offsets.npy", ".partitions.json", ".usage.npz"
+        ]
+        if self.lexical_index is not None:
+            self.lexical_index.save(f"{snapshot}.lexical.npz")
+            suffixes.append(".lexical.npz")
+        if self.rerank:
+            saved, added = self._stored_vectors()
+            # Written in place, so a mapped snapshot is never copied into RAM whole.
+            out = np.lib.format.open_memmap(
+                f"{snapshot}.vectors.npy", mode="w+", dtype="float32",
+                shape=(len(saved) + len(added), self.dimension)
+            )
+            out[:len(saved)] = saved
+            out[len(saved):] = added
+            out.flush()
+            del out
+            suffixes.append(".vectors.npy")
+        for suffix in suffixes:
+            _fsync_path(f"{snapshot}{suffix}")
+
+        with open(f"{path}.meta.json.tmp", "w") as f:
+            json.dump({
+                "index_type": self.index_type,
+                "index_params": self.index_params,
+                "train_size": self.train_size,
+                "dimension": self.dimension,
+                "model": self.model,
+                "partition_key": self.partition_key,
+                "rerank": self.rerank,
+                "lexical_key": self.lexical_key,
+                "generation": generation,
+                "ntotal": self.ntotal,
+                "next_id": self._next_id,
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{path}.meta.json.tmp", f"{path}.meta.json")
+
+        # The new snapshot is committed; everything belonging to the old one can go.
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        old_snapshot = self._snapshot_path(path, old_generation)
+        for suffix in (
+            ".index", ".pending.npy", ".jsonl", ".offsets.npy", ".partitions.json",
+            ".vectors.npy", ".lexical.npz", ".usage.npz", ".json", ".wal", ".usage.claimed"
+        ):
+            if os.path.exists(f"{old_snapshot}{suffix}"):
+                os.remove(f"{old_snapshot}{suffix}")
+        self._usage_folded = ("", 0)
+
+        self.path = path
+        if not self.read_only:
+            self._wal = WriteAheadLog(f"{snapshot}.wal", self.dimension)
+
+    def load(self, path: str, mmap: bool = False) -> None:
+        """Loads the latest snapshot at `path` and replays its WAL.
+
+        With `mmap=True` the index and payloads are memory-mapped rather than read
+        into RAM: only the memories `search` returns are decoded, worker processes
+        on one host share the page cache, and the store becomes read-only.
+        """
+        manifest = self._read_manifest(path)
+        if manifest:
+            self.dimension = manifest["dimension"]
+            self.model = manifest.get("model", self.model)
+            self.partition_key = manifest.get("partition_key") or self.partition_key
+            self.rerank = manifest.get("rerank", 0)
+            self.lexical_key = manifest.get("lexical_key") or self.lexical_key
+            self._configure_index(
+                manifest["index_type"], manifest["index_params"], manifest["train_size"]
+            )
+        generation = manifest.get("generation")
+        snapshot = self._snapshot_path(path, generation)
+
+        if os.path.exists(f"{snapshot}.index"):
+            if mmap:
+                self.index = faiss.read_index(
+                    f"{snapshot}.index", faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+                )
+            else:
+                self.index = faiss.read_index(f"{snapshot}.index")
+        if os.path.exists(f"{snapshot}.pending.npy"):
+            self._pending = np.load(f"{snapshot}.pending.npy")
+        if self.rerank and os.path.exists(f"{snapshot}.vectors.npy"):
+            self._full_vectors = np.load(f"{snapshot}.vectors.npy", mmap_mode="r" if mmap else None)
+        if payloads_exist(snapshot):
+            self.memories = PayloadFile(snapshot) if mmap else read_payloads(snapshot)
+        elif os.path.exists(f"{snapshot}.json"):
+            # Banks saved before payloads moved to the offset-indexed format.
+            with open(f"{snapshot}.json") as f:
                 self.memories = json.load(f)
+        self.read_only = mmap
+        if os.path.exists(f"{snapshot}.usage.npz"):
+            self.usage = MemoryUsage.load(f"{snapshot}.usage.npz")
+        else:
+            # Banks saved before memories had ids: number them by position.
+            self.usage = MemoryUsage()
+            self.usage.append(np.arange(len(self.memories)))
+        self._next_id = manifest.get("next_id", len(self.memories))
+
+        assignments = None
+        partitioned_by = manifest.get("partition_key")
+        if partitioned_by == self.partition_key and os.path.exists(f"{snapshot}.partitions.json"):
+            with open(f"{snapshot}.partitions.json") as f:
+                assignments = json.load(f)
+        self._rebuild_partitions(assignments)
+        if self.lexical_key is not None:
+            lexical_path = f"{snapshot}.lexical.npz"
+            if manifest.get("lexical_key") == self.lexical_key and os.path.exists(lexical_path):
+                self.lexical_index = BM25Index.load(lexical_path)
+            else:
+                self.lexical_index = BM25Index()
+                self.lexical_index.add(
+                    range(len(self.memories)),
+                    [self._lexical_text(memory) for memory in self.memories]
+                )
+
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        replayed = 0
+        if generation:
+            # Only a writable load owns the log; a mapped reader must not cut a
+            # record the writer is still appending.
+            records = list(
+                WriteAheadLog.replay(f"{snapshot}.wal", self.dimension, truncate=not mmap)
+            )
+            self._replay(records)
+            replayed = len(records)
+
+        if not self.ntotal == len(self.memories) == len(self.usage):
+            raise ValueError(
+                f"Bank {path} is inconsistent: {self.ntotal} vectors "
+                f"but {len(self.memories)} memories"
+            )
+        self.path = path
+        self.version += 1
+        if mmap:
+            self._usage_log = UsageLog(f"{path}.usage.log")
+        else:
+            self._fold_usage_log(path, snapshot)
+        if generation and not mmap:
+            self._wal = WriteAheadLog(f"{snapshot}.wal", self.dimension)
+            self._wal.records = replayed
+
+    def _fold_usage_log(self, path: str, snapshot: str) -> None:
+        """Applies the usage read-only processes have logged for the bank at `path`.
+
+        The shared log is claimed by moving its records into a file beside the
+        current snapshot. A save persists the counters and deletes that file with
+        the old snapshot; if the process dies first, the next load applies it again.
+        """
+        shared, claimed = f"{path}.usage.log", f"{snapshot}.usage.claimed"
+        moved = f"{claimed}.new"
+        if os.path.exists(shared) and not os.path.exists(moved):
+            os.replace(shared, moved)
+        if os.path.exists(moved):
+            with open(moved, "rb") as f, open(claimed, "ab") as out:
+                shutil.copyfileobj(f, out)
+            os.remove(moved)
+        folded, offset = self._usage_folded
+        self._usage_folded = (
+            claimed, UsageLog.apply(claimed, self.usage, offset if folded == claimed else 0)
+        )
+
+    def _replay(self, records: list[tuple[dict[str, Any], np.ndarray]]) -> None:
+        """Re-applies WAL records in order; consecutive adds are applied as one batch."""
+        batch: list[tuple[dict[str, Any], np.ndarray, int]] = []
+
+        def flush() -> None:
+            if batch:
+                self._insert(
+                    [content for content, _, _ in batch],
+                    np.stack([vector for _, vector, _ in batch]),
+                    np.array([memory_id for _, _, memory_id in batch], dtype="int64")
+                )
+                batch.clear()
+
+        for record, vector in records:
+            if "$delete" in record:
+                flush()
+                self._kill(self.usage.positions_of(record["$delete"]))
+                continue
+            if "$id" in record:
+                memory_id, content = record["$id"], record["memory"]
+            else:
+                memory_id, content = self._next_id + len(batch), record
+            if any(memory_id == queued for _, _, queued in batch):
+                flush()  # a repeated id replaces the first add, so it cannot share its batch
+            batch.append((content, vector, memory_id))
+        flush()
+
+    def close(self) -> None:
+        if self._compactor is not None:
+            self._compactor.join()
+        self.flush_usage()
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+
+
+_shared_lock = threading.Lock()
+
+
+@cache
+def _load_shared(path: str, mmap: bool) -> VectorStore:
+    store = VectorStore()
+    if VectorStore.exists(path):
+        store.load(path, mmap=mmap)
+    return store
+
+
+def shared_bank(path: str, mmap: bool = True) -> VectorStore:
+    """The process-wide store for the bank at `path`, loaded on first use.
+
+    Every caller gets the same instance, so a bank is read (or memory-mapped)
+    once per process. A path with no saved bank gives an empty store.
+    """
+    with _shared_lock:
+        return _load_shared(path, mmap)
+
+
+def _missing_texts(texts: list[str], cached: list[np.ndarray | None]) -> list[str]:
+    return list(dict.fromkeys(t for t, v in zip(texts, cached, strict=True) if v is None))
+
+
+def _fill_missing(
+    texts: list[str], cached: list[np.ndarray | None], missing: list[str], fresh: np.ndarray
+) -> np.ndarray:
+    by_text = dict(zip(missing, fresh, strict=True))
+    filled = [v if v is not None else by_text[t] for t, v in zip(texts, cached, strict=True)]
+    return np.ascontiguousarray(filled, dtype="float32")
+
+
+def _bitmap_selector(mask: np.ndarray) -> faiss.IDSelector:
+    bits = np.packbits(mask, bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(bits), faiss.swig_ptr(bits))
+    selector.bits = bits  # type: ignore[attr-defined]  # FAISS only keeps a pointer; the bitmap must outlive the selector
+    return selector
+
+
+def _fsync_path(path: str) -> None:
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
@@ -0,0 +1,109 @@
+import json
+import os
+import struct
+import threading
+import zlib
+from collections.abc import Iterator
+from typing import Any
+
+import numpy as np
+
+# Record layout: <payload_len:u32><crc32:u32><n_json:u32><json bytes><float32 vector>.
+# The checksum covers everything after the header, so a torn append is detected on replay.
+_HEADER = struct.Struct("<II")
+_JSON_LEN = struct.Struct("<I")
+
+
+class WriteAheadLog:
+    """Append-only log of (memory, vector) records sitting on top of a bank snapshot.
+
+    Each record carries both the payload and its embedding, so replay can never
+    produce an index and a memory list that disagree. A record is written with a
+    single `write` and fsynced; a partially written tail is skipped on replay, and
+    cut off by the process that goes on to own the log.
+
+    Adds logged with stable ids are stored as `{"$id": id, "memory": content}`
+    (an id that is already live replaces that memory), and deletions as
+    `{"$delete": [ids]}` with an empty vector. Plain payloads are adds from
+    banks written before memories had ids.
+    """
+
+    def __init__(self, path: str, dimension: int, fsync: bool = True):
+        self.path = path
+        self.dimension = dimension
+        self.fsync = fsync
+        self.records = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")  # noqa: SIM115 - held open for appends
+
+    def append(
+        self,
+        contents: list[dict[str, Any]],
+        vectors: np.ndarray,
+        ids: list[int] | np.ndarray | None = None
+    ) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        if ids is not None:
+            contents = [
+                {"$id": int(memory_id), "memory": content}
+                for memory_id, content in zip(ids, contents, strict=True)
+            ]
+        self._write([
+            _record(content, vector) for content, vector in zip(contents, vectors, strict=True)
+        ])
+
+    def append_delete(self, ids: list[int] | np.ndarray) -> None:
+        self._write([_record({"$delete": [int(memory_id) for memory_id in ids]}, None)])
+
+    def _write(self, chunks: list[bytes]) -> None:
+        with self._lock:
+            self._file.write(b"".join(chunks))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.records += len(chunks)
+
+    def close(self) -> None:
+        self._file.close()
+
+    @staticmethod
+    def replay(
+        path: str, dimension: int, truncate: bool = False
+    ) -> Iterator[tuple[dict[str, Any], np.ndarray]]:
+        """Yields every intact record, stopping at the first torn or partial one.
+
+        With `truncate`, that tail is cut off so new appends follow intact records.
+        Only the log's writer may do this: to a reader, a record the writer is still
+        appending looks torn. Delete records come with an empty vector.
+        """
+        if not os.path.exists(path):
+            return
+        vector_bytes = dimension * 4
+        good_offset = 0
+        with open(path, "rb") as f:
+            data = f.read()
+        while good_offset + _HEADER.size <= len(data):
+            length, crc = _HEADER.unpack_from(data, good_offset)
+            start = good_offset + _HEADER.size
+            body = data[start:start + length]
+            if len(body) < length or zlib.crc32(body) != crc:
+                break
+            (n_json,) = _JSON_LEN.unpack_from(body)
+            payload = body[_JSON_LEN.size:_JSON_LEN.size + n_json]
+            vector = np.frombuffer(body[_JSON_LEN.size + n_json:], dtype="float32")
+            if len(vector) * 4 not in (vector_bytes, 0):
+                break
+            yield json.loads(payload), vector
+            good_offset = start + length
+        if truncate and good_offset < len(data):
+            print(f"Truncating {len(data) - good_offset} bytes of torn WAL tail in {path}")
+            with open(path, "r+b") as f:
+                f.truncate(good_offset)
+
+
+def _record(content: dict[str, Any], vector: np.ndarray | None) -> bytes:
+    payload = json.dumps(content).encode("utf-8")
+    body = _JSON_LEN.pack(len(payload)) + payload
+    if vector is not None:
+        body += vector.tobytes()
+    return _HEADER.pack(len(body), zlib.crc32(body)) + body
@@ -0,0 +1,251 @@
+"""Per-task tracing of graph nodes, retrieval, embedding and LLM calls.
+
+Spans record wall time, prompt/completion tokens and retried HTTP requests, and
+fold their counters into their parent span, so a node's numbers include the LLM
+calls made inside it. Spans only exist inside `Tracer.task(...)`; everywhere else
+`span()` returns a shared no-op, which keeps the cost of disabled tracing to one
+context-variable lookup per call site.
+
+    tracer = Tracer(sinks=[JsonlTraceSink("data/traces/run.jsonl")])
+    with tracer.task("T-1") as trace:
+        ...
+    trace.rollup()     # per-span-name wall time, tokens, retries
+    tracer.summary()   # the same, accumulated over every task in the run
+"""
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Protocol, TypeVar, cast
+
+_current_trace: ContextVar["TaskTrace | None"] = ContextVar("legomem_trace", default=None)
+_current_span: ContextVar["Span | None"] = ContextVar("legomem_span", default=None)
+_NOOP: nullcontext[None] = nullcontext()
+F = TypeVar("F", bound=Callable[..., Any])
+
+COUNTERS = ("calls", "seconds", "prompt_tokens", "completion_tokens", "retries")
+
+
+class Span:
+    """One timed unit of work. `call=True` marks a single API call, whose extra
+    HTTP requests beyond the first are counted as retries."""
+
+    __slots__ = (
+        "_token", "call", "completion_tokens", "name", "parent", "prompt_tokens",
+        "requests", "retries", "seconds", "start", "trace"
+    )
+
+    def __init__(self, name: str, trace: "TaskTrace", call: bool = False):
+        self.name = name
+        self.call = call
+        self.trace = trace
+        self.parent: Span | None = None
+        self.seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.requests = 0
+        self.retries = 0
+
+    def __enter__(self) -> "Span":
+        self.parent = _current_span.get()
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.seconds = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if self.call:
+            self.retries += max(0, self.requests - 1)
+        parent = self.parent
+        if parent is not None:
+            # Sibling spans running on other threads may share this parent.
+            with self.trace.lock:
+                parent.prompt_tokens += self.prompt_tokens
+                parent.completion_tokens += self.completion_tokens
+                parent.retries += self.retries
+        self.trace.record(self)
+
+
+class TaskTrace:
+    """Every span recorded while running one task, and their roll-up."""
+
+    def __init__(self, task_id: Any):
+        self.task_id = task_id
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        self._rollup: dict[str, dict[str, float]] = {}
+        self._totals = dict.fromkeys(COUNTERS[2:], 0)
+
+    def record(self, span: Span) -> None:
+        with self.lock:
+            entry = self._rollup.setdefault(span.name, dict.fromkeys(COUNTERS, 0))
+            entry["calls"] += 1
+            entry["seconds"] += span.seconds
+            entry["prompt_tokens"] += span.prompt_tokens
+            entry["completion_tokens"] += span.completion_tokens
+            entry["retries"] += span.retries
+            if span.parent is None:
+                for key in self._totals:
+                    self._totals[key] += getattr(span, key)
+
+    def rollup(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "task_id": self.task_id,
+                "seconds": self.seconds or time.perf_counter() - self.start,
+                **self._totals,
+                "spans": {name: dict(entry) for name, entry in self._rollup.items()},
+            }
+
+
+class TraceSink(Protocol):
+    def write(self, record: dict[str, Any]) -> None: ...
+
+
+class JsonlTraceSink:
+    """Appends one JSON line per finished task (and one for the run summary)."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def flatten_rollup(rollup: dict[str, Any], prefix: str = "trace") -> dict[str, float]:
+    """Flat `prefix/span/counter` metrics, as `WandBLogger.log_metrics` expects."""
+    metrics = {
+        f"{prefix}/{key}": value for key, value in rollup.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+    for name, entry in rollup.get("spans", {}).items():
+        for key, value in entry.items():
+            metrics[f"{prefix}/{name}/{key}"] = value
+    return metrics
+
+
+class Tracer:
+    """Collects a `TaskTrace` per task, forwards each to the sinks and keeps run totals."""
+
+    def __init__(self, sinks: list[TraceSink] | None = None, enabled: bool = True):
+        self.sinks = list(sinks or [])
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._tasks = 0
+        self._run: dict[str, Any] = {
+            "seconds": 0.0, **dict.fromkeys(COUNTERS[2:], 0), "spans": {}
+        }
+
+    @contextmanager
+    def task(self, task_id: Any) -> Iterator[TaskTrace | None]:
+        if not self.enabled:
+            yield None
+            return
+        trace = TaskTrace(task_id)
+        token = _current_trace.set(trace)
+        span_token = _current_span.set(None)
+        try:
+            yield trace
+        finally:
+            _current_span.reset(span_token)
+            _current_trace.reset(token)
+            trace.seconds = time.perf_counter() - trace.start
+            rollup = trace.rollup()
+            self._accumulate(rollup)
+            for sink in self.sinks:
+                sink.write({"type": "task", **rollup})
+
+    def _accumulate(self, rollup: dict[str, Any]) -> None:
+        with self._lock:
+            self._tasks += 1
+            for key in ("seconds", *COUNTERS[2:]):
+                self._run[key] += rollup[key]
+            for name, entry in rollup["spans"].items():
+                total = self._run["spans"].setdefault(name, dict.fromkeys(COUNTERS, 0))
+                for key, value in entry.items():
+                    total[key] += value
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "tasks": self._tasks,
+                **{k: v for k, v in self._run.items() if k != "spans"},
+                "spans": {name: dict(entry) for name, entry in self._run["spans"].items()},
+            }
+
+    def finish(self) -> dict[str, Any]:
+        """Writes the run summary to every sink and returns it."""
+        summary = self.summary()
+        for sink in self.sinks:
+            sink.write({"type": "run", **summary})
+        return summary
+
+
+def tracer_from_env() -> Tracer:
+    """`LEGOMEM_TRACE=path.jsonl` traces to that file; unset (or "off") disables tracing."""
+    path = os.getenv("LEGOMEM_TRACE", "")
+    if path in ("", "off"):
+        return Tracer(enabled=False)
+    return Tracer(sinks=[JsonlTraceSink(path)])
+
+
+def span(name: str, call: bool = False) -> Span | nullcontext[None]:
+    """Times the enclosed block inside the current task's trace, if there is one."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP
+    return Span(name, trace, call)
+
+
+def traced(name: str, call: bool = False) -> Callable[[F], F]:
+    """Decorator form of `span`; coroutine functions are timed until they complete."""
+    def decorator(fn: F) -> F:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                trace = _current_trace.get()
+                if trace is None:
+                    return await fn(*args, **kwargs)
+                with Span(name, trace, call):
+                    return await fn(*args, **kwargs)
+            return cast(F, async_wrapper)
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            trace = _current_trace.get()
+            if trace is None:
+                return fn(*args, **kwargs)
+            with Span(name, trace, call):
+                return fn(*args, **kwargs)
+        return cast(F, wrapper)
+    return decorator
+
+
+def record_usage(prompt_tokens: int, completion_tokens: int) -> None:
+    current = _current_span.get()
+    if current is not None:
+        current.prompt_tokens += prompt_tokens
+        current.completion_tokens += completion_tokens
+
+
+def record_request(*_: object) -> None:
+    """httpx request hook: counts HTTP attempts so API-call spans can report retries."""
+    current = _current_span.get()
+    if current is not None:
+        current.requests += 1
+
+
+async def arecord_request(*_: object) -> None:
+    """`record_request` for async httpx clients, which await their hooks."""
+    record_request()
@@ -1,18 +1,16 @@
 import os
 from typing import Any
 
-import wandb
-from dotenv import load_dotenv
-
-load_dotenv()
 
 class WandBLogger:
     def __init__(self, project: str = "legomem", entity: str | None = None):
         self.project = project
         self.entity = entity
-        self.run = None
+        self.run: Any = None
+
+    def start_run(self, config: dict[str, Any], name: str | None = None) -> None:
+        import wandb  # slow to import, and only needed once a run is logged
 
-    def start_run(self, config: dict[str, Any], name: str | None = None):
         wandb_api_key = os.getenv("WANDB_API_KEY")
         if wandb_api_key:
             wandb.login(key=wandb_api_key)
@@ -24,17 +22,19 @@ class WandBLogger:
             name=name
         )
 
-    def log_metrics(self, metrics: dict[str, Any]):
+    def log_metrics(self, metrics: dict[str, Any]) -> None:
         if self.run:
             self.run.log(metrics)
 
-    def log_prompt(self, prompt_name: str, prompt_text: str, hyperparameters: dict[str, Any]):
+    def log_prompt(
+        self, prompt_name: str, prompt_text: str, hyperparameters: dict[str, Any]
+    ) -> None:
         if self.run:
             # We can log prompts as artifacts or just config
             self.run.config.update({f"prompt_{prompt_name}": prompt_text})
             self.run.config.update({f"hparams_{prompt_name}": hyperparameters})
 
-    def finish_run(self):
+    def finish_run(self) -> None:
         if self.run:
             self.run.finish()
             self.run = None
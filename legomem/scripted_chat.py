@@ -0,0 +1,70 @@
+"""LangChain chat model behind `FakeProvider.chat_model`.
+
+Kept out of `providers` so that importing the package does not load
+`langchain_core.language_models`; it is imported when the first fake model is built.
+"""
+import asyncio
+import random
+import time
+from collections.abc import Callable
+from typing import Any
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from .providers import default_script
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that answers from a script after a simulated, jittered latency."""
+
+    model_name: str = "fake-chat"
+    temperature: float = 0
+    script: Callable[[str], str] = default_script
+    latency: float = 0.0
+    jitter: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def _reply(self, messages: list[BaseMessage]) -> tuple[AIMessage, float]:
+        prompt = "\n".join(str(m.content) for m in messages)
+        reply = self.script(prompt)
+        delay = max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        message = AIMessage(
+            content=reply,
+            usage_metadata={
+                "input_tokens": len(prompt) // 4,
+                "output_tokens": len(reply) // 4,
+                "total_tokens": len(prompt) // 4 + len(reply) // 4,
+            },
+        )
+        return message, delay
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message, delay = self._reply(messages)
+        time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message, delay = self._reply(messages)
+        await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
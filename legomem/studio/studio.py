@@ -1,22 +1,21 @@
-import os
+"""Entry point for LangGraph Studio: `langgraph dev --local legomem/studio/studio.py`.
 
-from legomem.core.orchestrator import Orchestrator, create_legomem_graph
-from legomem.memory.vector_store import VectorStore
+Importing this module only compiles the graph. The chat models are created on
+the first call and the memory banks are opened (memory-mapped, once per process)
+on the first query, so a studio reload stays fast.
+"""
+from legomem.core.orchestrator import Graph, Orchestrator, create_legomem_graph
+from legomem.memory.retrieval import MemoryRetriever
+
+TASK_BANK_PATH = "data/memory_bank/task_bank"
+SUBTASK_BANK_PATH = "data/memory_bank/subtask_bank"
 
 
 # Configuration for Studio
-def get_graph(model: str = "gpt-4o", k: int = 5):
-    # Load default memory banks if they exist
-    task_bank = VectorStore()
-    if os.path.exists("data/memory_bank/task_bank.index"):
-        task_bank.load("data/memory_bank/task_bank")
-        
-    subtask_bank = VectorStore()
-    if os.path.exists("data/memory_bank/subtask_bank.index"):
-        subtask_bank.load("data/memory_bank/subtask_bank")
-        
-    orchestrator = Orchestrator(model=model)
-    return create_legomem_graph(orchestrator)
+def get_graph(model: str = "gpt-4o", k: int = 5) -> Graph:
+    # Paths, not stores: the retriever opens the shared banks on first retrieval.
+    retriever = MemoryRetriever(TASK_BANK_PATH, SUBTASK_BANK_PATH)
+    return create_legomem_graph(Orchestrator(model=model, retriever=retriever, retrieval_k=k))
 
 # This is the entry point for LangGraph Studio
 graph = get_graph()
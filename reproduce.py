@@ -1,11 +1,15 @@
 import os
 
-from dotenv import load_dotenv
-
 from legomem.eval.evaluator import EvaluationPipeline
+from legomem.llm_cache import get_llm_cache
+from legomem.memory.embedding_cache import get_embedding_cache
 from legomem.memory.vector_store import VectorStore
 
-load_dotenv()
+MAX_CONCURRENCY = int(os.getenv("LEGOMEM_MAX_CONCURRENCY", "4"))
+
+def print_result(record):
+    status = "SUCCESS" if record["success"] else "FAILURE"
+    print(f"Task {record['id']} ({record['type']}): {status}")
 
 def reproduce():
     print("Starting LEGOMem Reproduction...")
@@ -31,21 +35,13 @@ def reproduce():
         "K": 5,
         "temperature": 0,
         "retrieval_strategy": "Vanilla",
-        "mode": "LEGOMem"
+        "mode": "LEGOMem",
+        "max_concurrency": MAX_CONCURRENCY
     }
     
     # Run evaluation manually to track split metrics
     print(f"Running LEGOMem evaluation on {len(test_tasks)} tasks...")
-    lego_results = []
-    for task in test_tasks:
-        result = eval_pipeline.run_single_task(task, config)
-        is_success = eval_pipeline._verify_success(task, result, config["model"])
-        lego_results.append({
-            "id": task["id"],
-            "type": task.get("type", "unknown"),
-            "success": is_success
-        })
-        print(f"Task {task['id']} ({task.get('type')}): {'SUCCESS' if is_success else 'FAILURE'}")
+    lego_results = eval_pipeline.run_tasks(test_tasks, config, on_result=print_result)
 
     # 3. Run Evaluation (Baseline - No Memory)
     print("\n--- Evaluating WITHOUT Memory (Baseline) ---")
@@ -57,19 +53,13 @@ def reproduce():
         "K": 0,
         "temperature": 0,
         "retrieval_strategy": "Vanilla",
-        "mode": "Baseline"
+        "mode": "Baseline",
+        "max_concurrency": MAX_CONCURRENCY
     }
     
-    baseline_results = []
-    for task in test_tasks:
-        result = eval_pipeline_baseline.run_single_task(task, config_baseline)
-        is_success = eval_pipeline_baseline._verify_success(task, result, config_baseline["model"])
-        baseline_results.append({
-            "id": task["id"],
-            "type": task.get("type", "unknown"),
-            "success": is_success
-        })
-        print(f"Task {task['id']} ({task.get('type')}): {'SUCCESS' if is_success else 'FAILURE'}")
+    baseline_results = eval_pipeline_baseline.run_tasks(
+        test_tasks, config_baseline, on_result=print_result
+    )
 
     # Calculate Metrics
     def calc_metrics(results):
@@ -102,24 +92,11 @@ def reproduce():
         "K": 5,
         "temperature": 0,
         "retrieval_strategy": "QueryRewrite",
-        "mode": "Hybrid"
+        "mode": "Hybrid",
+        "max_concurrency": MAX_CONCURRENCY
     }
     
-    hybrid_results = []
-    for task in test_tasks:
-        try:
-            result = eval_pipeline.run_single_task(task, config_hybrid)
-            is_success = eval_pipeline._verify_success(task, result, config_hybrid["model"])
-        except Exception as e:
-            print(f"Error running hybrid task {task['id']}: {e}")
-            is_success = False
-            
-        hybrid_results.append({
-            "id": task["id"],
-            "type": task.get("type", "unknown"),
-            "success": is_success
-        })
-        print(f"Task {task['id']} ({task.get('type')}): {'SUCCESS' if is_success else 'FAILURE'}")
+    hybrid_results = eval_pipeline.run_tasks(test_tasks, config_hybrid, on_result=print_result)
 
     hybrid_metrics = calc_metrics(hybrid_results)
     
@@ -128,5 +105,13 @@ def reproduce():
     print(f"Procedural (Mem): {hybrid_metrics['procedural']:.1f}%")
     print(f"General (Reasoning): {hybrid_metrics['general']:.1f}%")
 
+    cache_stats = get_embedding_cache().stats()
+    print("\n--- Embedding Cache ---")
+    print(f"API calls saved: {cache_stats['hits']} (misses: {cache_stats['misses']})")
+
+    llm_stats = get_llm_cache().stats()
+    print(f"\n--- LLM Response Cache ({get_llm_cache().mode}) ---")
+    print(f"Responses served from cache: {llm_stats['hits']} (misses: {llm_stats['misses']})")
+
 if __name__ == "__main__":
     reproduce()
@@ -1,15 +1,12 @@
 import os
 from legomem.memory.vector_store import VectorStore
-from dotenv import load_dotenv
-
-load_dotenv()
 
 def seed_bench_memories():
     print("Seeding Scaled Benchmark Memories...")
     os.makedirs("data/memory_bank", exist_ok=True)
     
-    task_bank = VectorStore()
-    subtask_bank = VectorStore()
+    task_bank = VectorStore(lexical_key="task_description")
+    subtask_bank = VectorStore(partition_key="agent", lexical_key="description")
     
     memories = [
         {
@@ -39,10 +36,9 @@ def seed_bench_memories():
         }
     ]
     
-    for m in memories:
-        task_bank.add_memory(m, m["task_description"])
-        for st in m["subtasks"]:
-            subtask_bank.add_memory(st, st["description"])
+    subtasks = [st for m in memories for st in m["subtasks"]]
+    task_bank.add_memories(memories, [m["task_description"] for m in memories])
+    subtask_bank.add_memories(subtasks, [st["description"] for st in subtasks])
             
     task_bank.save("data/memory_bank/task_bank")
     subtask_bank.save("data/memory_bank/subtask_bank")
@@ -0,0 +1,86 @@
+import os
+import re
+
+import pytest
+
+from legomem.core.orchestrator import clear_graph_cache
+from legomem.memory.embedding_cache import EmbeddingCache
+from legomem.memory.vector_store import VectorStore
+from legomem.providers import FakeProvider, default_script, set_provider
+
+# Keep embeddings in memory rather than in the repo's data/ directory.
+os.environ.setdefault("LEGOMEM_EMBEDDING_CACHE", "off")
+
+DIMENSION = 8
+# Names and IDs ("Bob's", "B-99") are masked before embedding, so tasks that differ
+# only in them embed identically and anything else lands far away.
+SPECIFICS = re.compile(r"[A-Z][\w'-]*|\S*\d\S*")
+
+
+class ScriptedProvider(FakeProvider):
+    """Fake provider that records prompts and plans the task it is given verbatim."""
+
+    name = "fake-scripted"
+
+    def __init__(self):
+        super().__init__(script=self.reply)
+        self.prompts: list[str] = []
+        # Prompts containing every one of these strings raise, simulating a crash.
+        self.fail_on: tuple[str, ...] = ()
+
+    def reply(self, prompt: str) -> str:
+        if self.fail_on and all(marker in prompt for marker in self.fail_on):
+            raise RuntimeError("simulated crash")
+        self.prompts.append(prompt)
+        if "orchestrator agent" in prompt:
+            task = re.search(r"Solve the task: (.*)", prompt).group(1)
+            return f"1. {task} [after: none]\n2. Compose the final answer [after: 1]"
+        return default_script(prompt)
+
+    def calls(self, marker: str) -> list[str]:
+        return [prompt for prompt in self.prompts if marker in prompt]
+
+    def embed(self, texts, model, dimension):
+        return super().embed([SPECIFICS.sub("X", text) for text in texts], model, dimension)
+
+    async def aembed(self, texts, model, dimension):
+        return await super().aembed([SPECIFICS.sub("X", t) for t in texts], model, dimension)
+
+
+@pytest.fixture
+def fake_provider():
+    provider = FakeProvider()
+    set_provider(provider)
+    yield provider
+    set_provider(None)
+
+
+@pytest.fixture
+def scripted_provider():
+    provider = ScriptedProvider()
+    set_provider(provider)
+    clear_graph_cache()
+    yield provider
+    set_provider(None)
+    clear_graph_cache()
+
+
+@pytest.fixture
+def bank_paths(tmp_path, scripted_provider):
+    """A saved task bank and subtask bank holding one solved lookup task."""
+    task_bank = VectorStore(dimension=DIMENSION, cache=EmbeddingCache(None))
+    task_bank.add_memory({
+        "task_description": "Retrieve Bob's ID B-99 from the HR sheet",
+        "high_level_plan": "1. Open the HR sheet. 2. Read Bob's row.",
+    }, "Retrieve Bob's ID B-99 from the HR sheet")
+    subtask_bank = VectorStore(dimension=DIMENSION, cache=EmbeddingCache(None))
+    subtask_bank.add_memory({
+        "agent": "office_agent",
+        "description": "Retrieve Bob's ID B-99 from the HR sheet",
+        "steps": "¡action¿read_sheet('HR', 'Bob's')¡/action¿",
+        "observations": "Bob's ID is B-99",
+    }, "Retrieve Bob's ID B-99 from the HR sheet")
+    paths = str(tmp_path / "task_bank"), str(tmp_path / "subtask_bank")
+    task_bank.save(paths[0])
+    subtask_bank.save(paths[1])
+    return paths
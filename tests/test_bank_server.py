@@ -0,0 +1,52 @@
+import base64
+
+import httpx
+import numpy as np
+import pytest
+
+from legomem.memory.bank_server import BankServer, encode_vectors
+from legomem.memory.embedding_cache import EmbeddingCache
+from legomem.memory.vector_store import VectorStore
+
+DIMENSION = 8
+
+
+@pytest.fixture
+def server():
+    bank = VectorStore(dimension=DIMENSION, cache=EmbeddingCache(None))
+    bank.add_vectors([{"n": i} for i in range(4)], np.eye(4, DIMENSION, dtype="float32"))
+    with BankServer({"task": bank}) as server, httpx.Client(base_url=server.base_url) as client:
+        yield client
+
+
+def test_search_round_trip(server):
+    response = server.post("/banks/task/search", json={
+        "vectors": encode_vectors(np.eye(1, DIMENSION, 2, dtype="float32")), "k": 1
+    })
+    assert response.status_code == 200
+    [[[distance, memory]]] = response.json()["results"]
+    assert memory == {"n": 2, "memory_id": 2}
+    assert distance == 0.0
+
+
+@pytest.mark.parametrize("body", [
+    b"{not json",
+    b"[1, 2]",
+    b'{"k": 1}',
+    b'{"vectors": {"shape": [3, 5], "data": "AAAA"}, "k": 1}',
+    b'{"vectors": {"shape": [1, 8], "data": "not base64!"}, "k": 1}',
+])
+def test_malformed_search_bodies_are_rejected(server, body):
+    response = server.post("/banks/task/search", content=body)
+    assert response.status_code == 400
+    assert response.json()["error"]
+
+
+def test_wrong_dimension_is_rejected_and_the_server_keeps_serving(server):
+    wrong = {"shape": [1, 4], "data": base64.b64encode(np.zeros(4, "float32").tobytes()).decode()}
+    response = server.post("/banks/task/search", json={"vectors": wrong, "k": 1})
+    assert response.status_code == 400
+    response = server.post("/banks/task/add", json={"contents": [{"n": 9}], "vectors": wrong})
+    assert response.status_code == 400
+
+    assert server.get("/banks").json()["task"]["ntotal"] == 4
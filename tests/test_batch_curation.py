@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from legomem.memory import batch_curation
+from legomem.memory.batch_curation import BatchCurator
+from legomem.memory.vector_store import VectorStore
+
+
+def write_trajectories(path, ids):
+    with open(path, "w") as f:
+        for traj_id in ids:
+            f.write(json.dumps({
+                "id": traj_id,
+                "task_description": f"Task {traj_id}",
+                "trajectory": f"steps for {traj_id}",
+            }) + "\n")
+
+
+def curator(directory):
+    return BatchCurator(
+        str(directory / "task_bank"), str(directory / "subtask_bank"), flush_every=2
+    )
+
+
+def trajectory_ids(path):
+    return sorted(memory["trajectory_id"] for memory in VectorStore.open(path).memories)
+
+
+def test_rerun_after_crash_before_checkpoint_adds_nothing_twice(
+    tmp_path, monkeypatch, fake_provider
+):
+    trajectories = tmp_path / "trajectories.jsonl"
+    write_trajectories(trajectories, ["T-1", "T-2", "T-3"])
+    append_lines = batch_curation._append_lines
+
+    def crash_on_checkpoint(path, lines):
+        if path.endswith(".curated") and lines:
+            raise OSError("crashed before checkpointing")
+        append_lines(path, lines)
+
+    monkeypatch.setattr(batch_curation, "_append_lines", crash_on_checkpoint)
+    with pytest.raises(OSError):
+        curator(tmp_path).run(str(trajectories), show_progress=False)
+    monkeypatch.undo()
+    # The first batch reached both banks' WALs; the checkpoint is still empty.
+    banked = trajectory_ids(str(tmp_path / "task_bank"))
+    assert banked
+
+    stats = curator(tmp_path).run(str(trajectories), show_progress=False)
+    assert stats["curated"] == 3 - len(banked)
+    assert stats["skipped"] == len(banked)
+    assert trajectory_ids(str(tmp_path / "task_bank")) == ["T-1", "T-2", "T-3"]
+    assert trajectory_ids(str(tmp_path / "subtask_bank")) == ["T-1", "T-2", "T-3"]
+
+    # Everything is checkpointed or banked now, so a third run is a no-op.
+    stats = curator(tmp_path).run(str(trajectories), show_progress=False)
+    assert stats["curated"] == 0
+    assert stats["skipped"] == 3
+
+
+def test_task_memory_is_added_once_its_subtasks_are_banked(tmp_path, monkeypatch, fake_provider):
+    trajectories = tmp_path / "trajectories.jsonl"
+    write_trajectories(trajectories, ["T-1", "T-2"])
+
+    def crash_on_task_bank(*args, **kwargs):
+        raise OSError("crashed between the subtask and task banks")
+
+    batch = curator(tmp_path)
+    monkeypatch.setattr(batch.task_bank, "add_memories", crash_on_task_bank)
+    with pytest.raises(OSError):
+        batch.run(str(trajectories), show_progress=False)
+    assert trajectory_ids(str(tmp_path / "subtask_bank")) == ["T-1", "T-2"]
+
+    curator(tmp_path).run(str(trajectories), show_progress=False)
+    assert trajectory_ids(str(tmp_path / "task_bank")) == ["T-1", "T-2"]
+    assert trajectory_ids(str(tmp_path / "subtask_bank")) == ["T-1", "T-2"]
@@ -0,0 +1,34 @@
+from legomem.core.orchestrator import parse_plan_step, ready_steps
+
+
+def test_parse_plan_step_reads_dependencies():
+    assert parse_plan_step("1. Open the sheet [after: none]", 0) == ("Open the sheet", [])
+    assert parse_plan_step("2) Read the totals", 1) == ("Read the totals", [0])
+    assert parse_plan_step("3. Email both [After: 1, 2]", 2) == ("Email both", [0, 1])
+    # Forward and self references are dropped, so plans can never cycle.
+    assert parse_plan_step("2. Draft [after: 2, 3]", 1) == ("Draft", [])
+    assert parse_plan_step("1. Start", 0) == ("Start", [])
+
+
+def test_ready_steps_runs_independent_steps_in_waves():
+    lines = [
+        "1. Look up the customer [after: none]",
+        "2. Look up the order [after: none]",
+        "3. Join them [after: 1, 2]",
+        "4. Send the report [after: 3]",
+    ]
+    plan, dependencies = zip(
+        *(parse_plan_step(line, i) for i, line in enumerate(lines)), strict=True
+    )
+    state = {"plan": list(plan), "dependencies": list(dependencies), "step_outcomes": {}}
+
+    waves = []
+    while ready := ready_steps(state):
+        waves.append(ready)
+        state["step_outcomes"] = {**state["step_outcomes"], **dict.fromkeys(ready, "done")}
+    assert waves == [[0, 1], [2], [3]]
+
+
+def test_ready_steps_defaults_to_sequential_plans():
+    state = {"plan": ["a", "b", "c"], "step_outcomes": {0: "done"}}
+    assert ready_steps(state) == [1]
@@ -0,0 +1,47 @@
+from legomem.core.plan_cache import PlanCache, adapt_plan
+from legomem.eval.evaluator import EvaluationPipeline
+
+CONFIG = {"model": "gpt-4o", "retrieval_strategy": "Vanilla", "K": 1}
+
+
+def test_adapt_plan_substitutes_differing_names_and_ids():
+    plan = ["Open Bob's row in the HR sheet", "Report ID B-99 for Bob"]
+    adapted = adapt_plan(
+        plan,
+        "Retrieve Bob's ID B-99 from the HR sheet",
+        "Retrieve Alice's ID A-12 from the HR sheet",
+    )
+    assert adapted == ["Open Alice's row in the HR sheet", "Report ID A-12 for Alice"]
+
+
+def test_near_duplicate_task_reuses_the_adapted_plan(bank_paths, scripted_provider):
+    pipeline = EvaluationPipeline(*bank_paths, plan_cache=PlanCache(max_distance=0.1))
+    first = pipeline.evaluate_task(
+        {"id": 1, "description": "Retrieve Carol's ID C-7 from the HR sheet"}, CONFIG
+    )
+    assert first["success"] and not first["plan_cache_hit"]
+    assert len(scripted_provider.calls("orchestrator agent")) == 1
+
+    repeat = pipeline.evaluate_task(
+        {"id": 2, "description": "Retrieve Dave's ID D-8 from the HR sheet"}, CONFIG
+    )
+    assert repeat["plan_cache_hit"]
+    assert len(scripted_provider.calls("orchestrator agent")) == 1
+    # The cached plan was rewritten for the new task before the worker saw it.
+    steps = scripted_provider.calls("Execute this subtask: Retrieve Dave's ID D-8")
+    assert steps
+    assert not any("C-7" in prompt for prompt in steps)
+
+
+def test_dissimilar_task_calls_the_planner(bank_paths, scripted_provider):
+    pipeline = EvaluationPipeline(*bank_paths, plan_cache=PlanCache(max_distance=0.1))
+    pipeline.evaluate_task(
+        {"id": 1, "description": "Retrieve Carol's ID C-7 from the HR sheet"}, CONFIG
+    )
+
+    other = pipeline.evaluate_task(
+        {"id": 2, "description": "Summarize the quarterly budget for finance"}, CONFIG
+    )
+    assert not other["plan_cache_hit"]
+    assert len(scripted_provider.calls("orchestrator agent")) == 2
+    assert pipeline.plan_cache.stats()["hits"] == 0
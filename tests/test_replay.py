@@ -0,0 +1,33 @@
+from legomem.eval.evaluator import EvaluationPipeline
+
+CONFIG = {"model": "gpt-4o", "retrieval_strategy": "Vanilla", "K": 1}
+
+
+def test_replayed_subtask_skips_the_worker(bank_paths, scripted_provider):
+    pipeline = EvaluationPipeline(*bank_paths, replay_distance=0.05)
+    result = pipeline.run_single_task(
+        {"id": 1, "description": "Retrieve Alice's ID A-12 from the HR sheet"}, CONFIG
+    )
+
+    # Step 0 repeats the stored subtask with other specifics; step 1 matches nothing.
+    assert result["replayed_steps"] == [0]
+    outcome = result["step_outcomes"][0]
+    assert outcome.startswith("Replayed from memory (office_agent)")
+    assert "A-12" in outcome and "B-99" not in outcome
+    workers = scripted_provider.calls("Execute this subtask:")
+    assert [prompt.splitlines()[0] for prompt in workers] == [
+        "Execute this subtask: Compose the final answer"
+    ]
+    assert pipeline.replayer.stats()["replayed"] == 1
+    assert pipeline.replayer.stats()["delegated"] == 1
+
+
+def test_distant_subtasks_are_delegated(bank_paths, scripted_provider):
+    pipeline = EvaluationPipeline(*bank_paths, replay_distance=0.05)
+    result = pipeline.run_single_task(
+        {"id": 1, "description": "Summarize the quarterly budget for finance"}, CONFIG
+    )
+
+    assert not result.get("replayed_steps")
+    assert len(scripted_provider.calls("Execute this subtask:")) == 2
+    assert pipeline.replayer.stats()["replayed"] == 0
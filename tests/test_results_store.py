@@ -0,0 +1,74 @@
+import asyncio
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from legomem.eval.evaluator import EvaluationPipeline
+from legomem.eval.results_store import ResultsStore
+
+CONFIG = {"model": "gpt-4o", "retrieval_strategy": "Vanilla", "K": 1}
+TASKS = [
+    {"id": "t1", "description": "Retrieve Bob's ID B-99 from the HR sheet"},
+    {"id": "t2", "description": "Summarize the quarterly budget for finance"},
+    {"id": "t3", "description": "Email the weekly report to the sales team"},
+]
+
+
+def test_restarted_run_skips_finished_tasks_and_resumes_the_rest(
+    tmp_path, bank_paths, scripted_provider
+):
+    path = str(tmp_path / "results.sqlite")
+    # t2 dies in its second wave, after its plan and first step were checkpointed.
+    scripted_provider.fail_on = ("Compose the final answer", "quarterly budget")
+    records = EvaluationPipeline(*bank_paths, results_store=ResultsStore(path)).run_tasks(
+        TASKS, CONFIG
+    )
+    assert [bool(r.get("error")) for r in records] == [False, True, False]
+    first_run = len(scripted_provider.prompts)
+
+    scripted_provider.fail_on = ()
+    records = EvaluationPipeline(*bank_paths, results_store=ResultsStore(path)).run_tasks(
+        TASKS, CONFIG
+    )
+    assert [r["success"] for r in records] == [True, True, True]
+    resumed = scripted_provider.prompts[first_run:]
+    # t1 and t3 came from the store; t2 picked up at its failed step.
+    assert not any("Bob's" in p or "weekly report" in p for p in resumed)
+    assert not any("orchestrator agent" in p for p in resumed)
+    assert [p.splitlines()[0] for p in resumed if "Execute this subtask" in p] == [
+        "Execute this subtask: Compose the final answer"
+    ]
+    store = ResultsStore(path)
+    key = store.start_run({**CONFIG, "task_bank": bank_paths[0], "subtask_bank": bank_paths[1]})
+    assert set(store.completed(key)) == {"t1", "t2", "t3"}
+
+
+def test_checkpoints_and_pending_writes_round_trip(tmp_path):
+    saver = ResultsStore(str(tmp_path / "results.sqlite")).checkpointer
+    config = {"configurable": {"thread_id": "run:t1", "checkpoint_ns": ""}}
+    first = empty_checkpoint()
+    first["channel_values"] = {"plan": ["Open the sheet"]}
+    first_config = saver.put(config, first, {"source": "loop", "step": 0}, {})
+    second = {**empty_checkpoint(), "channel_values": {"plan": ["Open the sheet"], "step": 1}}
+    second_config = saver.put(first_config, second, {"source": "loop", "step": 1}, {})
+    saver.put_writes(second_config, [("step_outcomes", {0: "done"}), ("messages", [])], "task-a")
+
+    latest = saver.get_tuple(config)
+    assert latest.config == second_config
+    assert latest.checkpoint["channel_values"] == second["channel_values"]
+    assert latest.metadata["step"] == 1
+    assert latest.parent_config == first_config
+    assert latest.pending_writes == [
+        ("task-a", "step_outcomes", {0: "done"}), ("task-a", "messages", [])
+    ]
+    assert saver.get_tuple(first_config).checkpoint["id"] == first["id"]
+    assert asyncio.run(saver.aget_tuple(config)) == latest
+
+    async def listed():
+        return [c.config async for c in saver.alist(config)]
+
+    assert [c.config for c in saver.list(config)] == [second_config, first_config]
+    assert asyncio.run(listed()) == [second_config, first_config]
+    assert [c.config for c in saver.list(config, filter={"step": 0})] == [first_config]
+
+    asyncio.run(saver.adelete_thread("run:t1"))
+    assert saver.get_tuple(config) is None
@@ -0,0 +1,75 @@
+from contextlib import ExitStack
+
+import pytest
+
+from legomem.memory.bank_server import BankServer
+from legomem.memory.embedding_cache import EmbeddingCache
+from legomem.memory.sharded_store import ShardedVectorStore
+from legomem.memory.vector_store import VectorStore
+
+DIMENSION = 8
+N_SHARDS = 3
+
+
+@pytest.fixture
+def shards(fake_provider):
+    banks = [
+        VectorStore(dimension=DIMENSION, cache=EmbeddingCache(None), lexical_key="text")
+        for _ in range(N_SHARDS)
+    ]
+    with ExitStack() as stack:
+        servers = [stack.enter_context(BankServer({"task": bank})) for bank in banks]
+        store = ShardedVectorStore(
+            [server.base_url for server in servers], "task",
+            dimension=DIMENSION, cache=EmbeddingCache(None)
+        )
+        yield store, banks
+        store.close()
+
+
+def add(store, n):
+    contents = [{"text": f"memory {i} about record R-{i}"} for i in range(n)]
+    return store.add_memories(contents, [c["text"] for c in contents], show_progress=False)
+
+
+def test_ids_are_bank_wide_and_route_to_their_shard(shards):
+    store, banks = shards
+    ids = add(store, 30)
+    assert len(set(ids)) == 30
+    assert sum(bank.size for bank in banks) == 30
+    assert all(bank.size for bank in banks)
+
+    hits = store.search("memory 7 about record R-7", k=3, hybrid=False, with_scores=True)
+    memory, distance = hits[0]
+    assert memory["text"] == "memory 7 about record R-7"
+    assert distance == pytest.approx(0.0, abs=1e-5)
+    assert memory["memory_id"] == ids[7]
+
+    store.record_outcome([ids[7]], success=True)
+    shard, local = ids[7] % N_SHARDS, ids[7] // N_SHARDS
+    positions = banks[shard].usage.positions_of([local])
+    assert banks[shard].usage.column("successes")[positions].tolist() == [1]
+
+    store.update(ids[7], {"text": "rewritten"})
+    assert store.search("memory 7 about record R-7", k=1, hybrid=False)[0]["text"] == "rewritten"
+
+    assert store.delete([ids[7], ids[8]]) == 2
+    assert sum(bank.size for bank in banks) == 28
+    assert ids[7] not in [m["memory_id"] for m in store.search("rewritten", k=30, hybrid=False)]
+
+
+def test_hybrid_search_is_the_default_for_lexical_shards(shards, fake_provider):
+    store, _ = shards
+    ids = add(store, 30)
+    assert store.lexical
+
+    fused = store.search("memory 3 about record", k=5)
+    assert len({m["memory_id"] for m in fused}) == 5
+
+    def no_embedding(*args):
+        raise AssertionError("the lexical hits should have been decisive")
+
+    # An exact identifier is answered from the merged BM25 hits without embedding.
+    fake_provider.embed = no_embedding
+    hits = store.search("R-12", k=3, with_scores=True)
+    assert hits[0] == ({"text": "memory 12 about record R-12", "memory_id": ids[12]}, 0.0)
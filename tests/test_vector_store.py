@@ -0,0 +1,133 @@
+import asyncio
+
+import numpy as np
+
+from legomem.memory.embedding_cache import EmbeddingCache
+from legomem.memory.vector_store import VectorStore
+
+DIMENSION = 8
+
+
+class RacingStore(VectorStore):
+    """Adds `late` vectors while `compact` rebuilds its copy without the store lock."""
+
+    late: np.ndarray | None = None
+
+    def _lexical_text(self, content):
+        late, self.late = self.late, None
+        if late is not None:
+            self.add_vectors([{"text": f"late {i}"} for i in range(len(late))], late)
+        return super()._lexical_text(content)
+
+
+def random_vectors(n, seed):
+    return np.random.default_rng(seed).standard_normal((n, DIMENSION)).astype("float32")
+
+
+def test_compact_restarts_when_index_trains_during_rebuild():
+    store = RacingStore(
+        dimension=DIMENSION,
+        cache=EmbeddingCache(None),
+        index_type="ivf_flat",
+        index_params={"nlist": 2},
+        train_size=64,
+        lexical_key="text",
+        max_deleted_fraction=1.0,
+    )
+    early, late = random_vectors(40, 0), random_vectors(40, 1)
+    ids = store.add_vectors([{"text": f"early {i}"} for i in range(40)], early)
+    store.delete(ids[:10])
+    assert not store.index.is_trained
+
+    store.late = late  # pushes the bank past train_size mid-compaction
+    store.compact()
+
+    assert store.index.is_trained
+    assert store.ntotal == len(store.memories) == len(store.usage) == store.size == 70
+    vectors = np.concatenate([early[10:], late])
+    texts = [f"early {i}" for i in range(10, 40)] + [f"late {i}" for i in range(40)]
+    hits = store.search_memories(vectors, 1, nprobe=2)
+    assert [row[0][0]["text"] for row in hits] == texts
+
+
+def test_read_only_usage_is_folded_into_the_writer(tmp_path):
+    path = str(tmp_path / "bank")
+    writer = VectorStore(dimension=DIMENSION, cache=EmbeddingCache(None))
+    vectors = random_vectors(20, 2)
+    ids = writer.add_vectors([{"n": i} for i in range(20)], vectors)
+    writer.save(path)
+
+    reader = VectorStore(dimension=DIMENSION, cache=EmbeddingCache(None))
+    reader.load(path, mmap=True)
+    reader.search_memories(vectors[:3], 1)
+    reader.record_outcome(ids[:2], success=True)
+    reader.close()
+
+    writer.load(path)
+    positions = writer.usage.positions_of(ids[:3])
+    assert writer.usage.column("hits")[positions].tolist() == [1, 1, 1]
+    assert writer.usage.column("successes")[positions].tolist() == [1, 1, 0]
+
+    # Saved counters survive a reload and are not applied twice.
+    writer.save(path)
+    writer.load(path)
+    positions = writer.usage.positions_of(ids[:3])
+    assert writer.usage.column("hits")[positions].tolist() == [1, 1, 1]
+
+
+def hybrid_store(n=40):
+    store = VectorStore(dimension=DIMENSION, cache=EmbeddingCache(None), lexical_key="text")
+    texts = [f"memory {i} about record R-{i}" for i in range(n)]
+    store.add_memories([{"text": text} for text in texts], texts, show_progress=False)
+    return store
+
+
+def test_hybrid_search_embeds_outside_the_lock(fake_provider):
+    store = hybrid_store()
+    held = []
+
+    def lock_state():
+        held.append((store._lock._readers, store._lock._writer))
+
+    embed, aembed = fake_provider.embed, fake_provider.aembed
+
+    def checked_embed(texts, model, dimension):
+        lock_state()
+        return embed(texts, model, dimension)
+
+    async def checked_aembed(texts, model, dimension):
+        lock_state()
+        return await aembed(texts, model, dimension)
+
+    fake_provider.embed, fake_provider.aembed = checked_embed, checked_aembed
+    # No lexical match, so neither search is settled before the query is embedded.
+    assert store.search("unrelated words", k=3)
+    assert asyncio.run(store.asearch("other unrelated words", k=3))
+    assert held == [(0, None), (0, None)]
+
+
+def test_async_hybrid_search_runs_bm25_once(fake_provider):
+    store = hybrid_store()
+    searches = []
+    search = store.lexical_index.search
+
+    def counted(*args, **kwargs):
+        searches.append(args[0])
+        return search(*args, **kwargs)
+
+    store.lexical_index.search = counted
+    asyncio.run(store.asearch("memory 5 about record", k=3))
+    asyncio.run(store.asearch("R-7", k=3))
+    store.search("memory 9 about record", k=3)
+    assert searches == ["memory 5 about record", "R-7", "memory 9 about record"]
+
+
+def test_hybrid_candidates_survive_a_compaction(fake_provider):
+    store = hybrid_store()
+    lexical = store._lexical_candidates("R-30", 3, None, 2.0)
+    assert lexical.decisive
+    store.delete(list(range(10)))
+    store.compact()
+
+    hits = store._search_hits("R-30", 3, None, None, None, lexical, None)
+    assert hits[0][0]["text"] == "memory 30 about record R-30"
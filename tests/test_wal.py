@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pytest
+
+from legomem.memory.embedding_cache import EmbeddingCache
+from legomem.memory.vector_store import VectorStore
+from legomem.memory.wal import WriteAheadLog
+
+DIMENSION = 8
+
+
+def random_vectors(n, seed):
+    return np.random.default_rng(seed).standard_normal((n, DIMENSION)).astype("float32")
+
+
+def new_store():
+    return VectorStore(dimension=DIMENSION, cache=EmbeddingCache(None))
+
+
+def loaded(path):
+    store = new_store()
+    store.load(path)
+    return store
+
+
+def wal_path(path):
+    generation = VectorStore._read_manifest(path)["generation"]
+    return f"{path}.g{generation}.wal"
+
+
+def test_reload_replays_adds_and_deletes(tmp_path):
+    path = str(tmp_path / "bank")
+    store = new_store()
+    ids = store.add_vectors([{"n": i} for i in range(5)], random_vectors(5, 0))
+    store.save(path)
+    ids += store.add_vectors([{"n": i} for i in range(5, 8)], random_vectors(3, 1))
+    store.delete([ids[1], ids[6]])
+    store.close()
+
+    reloaded = loaded(path)
+    assert reloaded.size == 6
+    live = zip(reloaded.memories, reloaded.usage.live, strict=True)
+    assert [memory["n"] for memory, alive in live if alive] == [0, 2, 3, 4, 5, 7]
+    # Replayed ids stay stable, so a reloaded bank keeps numbering after them.
+    assert reloaded.add_vectors([{"n": 8}], random_vectors(1, 2)) == [ids[-1] + 1]
+
+
+def test_torn_tail_is_dropped_and_truncated(tmp_path):
+    path = str(tmp_path / "bank")
+    store = new_store()
+    store.save(path)
+    store.add_vectors([{"n": i} for i in range(3)], random_vectors(3, 0))
+    store.close()
+
+    log = wal_path(path)
+    size = os.path.getsize(log)
+    with open(log, "r+b") as f:
+        f.truncate(size - 5)  # the last record lost its final bytes
+    assert [record["memory"]["n"] for record, _ in WriteAheadLog.replay(log, DIMENSION)] == [0, 1]
+
+    reloaded = loaded(path)
+    assert [m["n"] for m in reloaded.memories] == [0, 1]
+    # The writer cut the torn tail off, so its next append replays cleanly.
+    reloaded.add_vectors([{"n": 3}], random_vectors(1, 1))
+    reloaded.close()
+    assert [m["n"] for m in loaded(path).memories] == [0, 1, 3]
+
+
+def test_failed_save_keeps_the_old_generation(tmp_path, monkeypatch):
+    path = str(tmp_path / "bank")
+    store = new_store()
+    store.add_vectors([{"n": i} for i in range(4)], random_vectors(4, 0))
+    store.save(path)
+    store.add_vectors([{"n": 4}], random_vectors(1, 1))
+
+    def crash(src, dst):
+        raise OSError("crashed before the manifest was replaced")
+
+    # The new snapshot files are written, but the manifest still names the old ones.
+    monkeypatch.setattr(os, "replace", crash)
+    with pytest.raises(OSError):
+        store.save(path)
+    monkeypatch.undo()
+
+    assert VectorStore._read_manifest(path)["generation"] == 1
+    reloaded = loaded(path)
+    assert [m["n"] for m in reloaded.memories] == [0, 1, 2, 3, 4]